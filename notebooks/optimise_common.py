@@ -1,6 +1,7 @@
 import datetime 
 import backtrader as bt
 from strategies.base_strategy import BaseStrategy
+from strategies.numpy_data import NumpyData
 import yfinance as yf
 
 tech_stock = [ 'AMZN', 'MSFT', 'AAPL', 'GOOG', 'NVDA', 'META', 'ORCL', 'NFLX', 'ADBE', 'AVGO', 'CRM']
@@ -29,8 +30,13 @@ def add_data_feed(cerebro, tickers, warmup_date, start_date, end_date):
     print(f"tickers: {tickers}")
     print(f"time window = warmup-date: {warmup_date}, start-date: {start_date}, end-data: {end_date}")
     for ticker in tickers:
-        data = bt.feeds.PandasData(dataname=yf.download(ticker, warmup_date, end_date))
-        cerebro.adddata(data=data, name=ticker)
+        cerebro.adddata(data=NumpyData(dataname=download_price_data(ticker, warmup_date, end_date)), name=ticker)
+
+def download_price_data(ticker, warmup_date, end_date):
+    """ Downloads prices as numpy columns (see NumpyData), to be reused across Cerebro runs """
+    prices = yf.download(ticker, warmup_date, end_date)
+    return {'date': prices.index.values.astype('datetime64[D]'),
+            **{column: prices[column.capitalize()].to_numpy(dtype='float64').ravel() for column in NumpyData.COLUMNS}}
         
 def set_cash(cerebro, initial_cash):
     cerebro.broker.setcash(initial_cash)
@@ -1,17 +1,26 @@
 import click
 import datetime
 from repositories.closed_position_repository import ClosedPositionRepository
+from repositories.exchange_rate_store_repository import ExchangeRateStoreRepository
 from repositories.open_position_repository import OpenPositionRepository
+from repositories.optimisation_result_repository import OptimisationResultRepository
 from repositories.selected_tickers_repository import SelectedTickersRepository
+from repositories.user_bundle_repository import UserBundleRepository
 from repositories.user_repository import UserRepository
+from services.dataroma_service import DataromaService
 from services.exchange_rate_service import ExchangeRateService
+from services.multi_user_trade_today_service import MultiUserTradeTodayService
 from services.stock_compute_service import StockComputeService
 from services.open_position_service import OpenPositionService
+from services.portfolio_valuation_service import PortfolioValuationService
+from services.runtime_stock_stats_service import RuntimeStockStatsService
+from services.optimiser_service import OptimiserService
+from services.replay_service import ReplayService
 from services.trade_today_reporting_service import TradeTodayReportingService
-from services.whatsup_notification_service import WhatsappNotificationService
 from services.email_notification_service import EmailNotificationService
 import os
 
+from services.utils_service import parse_date
 from services.yfinance_data_service import YfinanceDataService
 
 
@@ -60,7 +69,9 @@ def trade_today(tickers, today, no_pos, context, position, output, user, rapid,
         pass
         # Get user info
         users_s3_path = f'{s3_bucket}/users/users.csv'
-        user_info = UserRepository(users_s3_path).get_by_id(user)
+        # user data packed by upload (CSV files are read when missing)
+        bundle = UserBundleRepository(f'{s3_bucket}/users/{user}/{UserBundleRepository.FILE_NAME}')
+        user_info = UserRepository(users_s3_path, bundle).get_by_id(user)
         #print(user_info)
         if user_info is not None:
             email_receiver = user_info.email
@@ -69,13 +80,13 @@ def trade_today(tickers, today, no_pos, context, position, output, user, rapid,
                 open_positions = []
             else:
                 open_positions_s3_path = f'{s3_bucket}/users/{user}/open_positions.csv'
-                open_positions = OpenPositionRepository(open_positions_s3_path).get_all()
+                open_positions = OpenPositionRepository(open_positions_s3_path, bundle).get_all()
             # Get selected_tickers
             selected_tickers_s3_path = f'{s3_bucket}/users/{user}/selected_tickers.csv'
-            tickers = ",".join(SelectedTickersRepository(selected_tickers_s3_path).get_all_as_list())
+            tickers = ",".join(SelectedTickersRepository(selected_tickers_s3_path, bundle).get_all_as_list())
             # Get closed_positions
             closed_positions_s3_path = f'{s3_bucket}/users/{user}/closed_positions.csv'
-            closed_positions = ClosedPositionRepository(closed_positions_s3_path).get_all()
+            closed_positions = ClosedPositionRepository(closed_positions_s3_path, bundle).get_all()
         else:
             raise click.UsageError(f"user {user} not found")
     else: 
@@ -97,31 +108,157 @@ def trade_today(tickers, today, no_pos, context, position, output, user, rapid,
             else:
                 supplied_ticker_list = tickers.split(',')
                 tickers = ','.join(list(set(position_ticker_list + supplied_ticker_list)))
-    if skip_currency_conversion:
-        # Initialize ExchangeRateService with a stub for testing if skip_currency_conversion is True
-        exchange_rate_service = ExchangeRateService(stub={'*': {'rates': {'USD': 1.00, 'CHF': 1.00}}})
-    else:
-        # Initialize ExchangeRateService
-        s3_prefix = get_s3_prefix()
-        exchange_rate_service = ExchangeRateService(path=f"{s3_prefix}/services/exchange_rate_service/exchange_rate_cache.json")
+    exchange_rate_service = get_exchange_rate_service(skip_currency_conversion)
+    dataroma_service = DataromaService(path=get_service_cache_path('dataroma_service', 'dataroma_cache.json'))
+    runtime_stock_stats_service = None
+    if not rapid:
+        runtime_stock_stats_service = RuntimeStockStatsService(tickers.split(','),
+                                                               path=get_service_cache_path('runtime_stock_stats_service', 'fundamentals_cache.json'))
     rep_svc = TradeTodayReportingService(today, tickers, open_positions, closed_positions, context, user, rapid=rapid, 
-                                         exchange_rate_service=exchange_rate_service)
+                                         exchange_rate_service=exchange_rate_service,
+                                         dataroma_service=dataroma_service,
+                                         runtime_stock_stats_service=runtime_stock_stats_service)
     # Update ExchangeRateCache with retrived dates (to avoid uneccessary API calls)
     if not skip_currency_conversion:
         exchange_rate_service.save_exchange_rate_cache()
-    print(rep_svc.console_report())
-    if 'whatsapp' in output:
-        WhatsappNotificationService().send_message(rep_svc.whatsapp_report())
-        print("Whatsapp report sent")
-    elif 'email' in output:
-        subject, body = rep_svc.email_html_report()
-        EmailNotificationService(email_receiver=email_receiver).send_email(subject, body)
-        print("Email report sent")
-    elif 'file' in output:
-        subject, body = rep_svc.email_html_report(simulation=True)
-        print("Email report written to file")
+    dataroma_service.save_cache()
+    if runtime_stock_stats_service is not None:
+        runtime_stock_stats_service.save_cache()
+    rep_svc.send_report(output, email_receiver)
     
             
+@click.command()
+@click.option('--users', '-u',
+              help='users provided as CSV (e.g. alice,bob), defaults to all users',
+              default=None)
+@click.option('--output', '-o',
+              help='Output to either `console` (default),  `email` or `file` (e.g. --output=email)',
+              default='console')
+@click.option('--rapid', '-r',
+              help='skip long operations (e.g. retrieve extra information from external apis)',
+              is_flag=True)
+@click.option('--skip-currency-conversion',
+              help='skip currency conversions (Will assume 1 US is worth 1 EURO)',
+              is_flag=True)
+@click.option('--today',
+              help='mock today\'s date for testing in yyyy-mm-dd format (e.g. --today=2024-07-14)',
+              default=str(datetime.datetime.today().date()))
+@click.option('--no-pos', '-n',
+              help='do not use open positions for testing',
+              is_flag=True)
+@click.option('--engine',
+              help='strategy engine, `vectorized` (default) or `backtrader`',
+              type=click.Choice(StockComputeService.ENGINES),
+              default='vectorized')
+@click.option('--workers', '-w',
+              help='number of users reported concurrently',
+              show_default=True,
+              default=4)
+@click.option('--incremental-indicators', '-i',
+              help='advance indicator states kept in the price store (requires TRADE_ADVISOR_PRICE_STORE) instead of replaying the warmup',
+              is_flag=True)
+def trade_today_all(users, output, rapid, skip_currency_conversion, today, no_pos, engine, workers, incremental_indicators):
+    """Advise on trades that should be made today for all users, sharing a single compute pass"""
+    if 'whatsapp' in output:
+        raise click.UsageError("whatsapp output is not supported for multiple users")
+    indicator_state_path = None
+    if incremental_indicators:
+        indicator_state_path = os.environ.get('TRADE_ADVISOR_PRICE_STORE', None)
+        if indicator_state_path is None or engine != 'vectorized':
+            raise click.UsageError("--incremental-indicators requires TRADE_ADVISOR_PRICE_STORE and the vectorized engine")
+    # users data is read from the bucket
+    get_s3_prefix()
+    exchange_rate_service = get_exchange_rate_service(skip_currency_conversion)
+    svc = MultiUserTradeTodayService(today, users=users.split(',') if users is not None else None, no_pos=no_pos, rapid=rapid,
+                                     engine=engine, exchange_rate_service=exchange_rate_service, max_workers=workers,
+                                     fundamentals_cache_path=get_service_cache_path('runtime_stock_stats_service', 'fundamentals_cache.json'),
+                                     dataroma_cache_path=get_service_cache_path('dataroma_service', 'dataroma_cache.json'),
+                                     indicator_state_path=indicator_state_path)
+    try:
+        reports = svc.run(output)
+    finally:
+        # Update ExchangeRateCache with retrived dates (to avoid uneccessary API calls)
+        if not skip_currency_conversion:
+            exchange_rate_service.save_exchange_rate_cache()
+        if svc.dataroma_service is not None:
+            svc.dataroma_service.save_cache()
+        if svc.runtime_stock_stats_service is not None:
+            svc.runtime_stock_stats_service.save_cache()
+    print(f"Trades today reported for {len(reports)} users")
+
+@click.command()
+@click.option('--user', '-u',
+              help='replay for this user storage (selected tickers, open and closed positions)',
+              default=None)
+@click.option('--tickers', '-t',
+              help='TICKERS to replay provided as CSV. e.g.: AMZN,GOOG,MSFT), added to the user tickers',
+              default=None)
+@click.option('--from', 'from_date',
+              help='first date to replay in yyyy-mm-dd format (as per trade-today --today)',
+              required=True)
+@click.option('--to', 'to_date',
+              help='last date to replay in yyyy-mm-dd format',
+              default=str(datetime.datetime.today().date()))
+@click.option('--output', '-o',
+              help='Output to either `console` (default),  `email`, `file` or `whatsapp` (e.g. --output=email)',
+              default='console')
+@click.option('--per-day',
+              help='send one trade-today report per replayed date instead of a single consolidated report',
+              is_flag=True)
+@click.option('--rapid', '-r',
+              help='skip long operations (e.g. retrieve extra information from external apis)',
+              is_flag=True)
+@click.option('--skip-currency-conversion',
+              help='skip currency conversions (Will assume 1 US is worth 1 EURO)',
+              is_flag=True)
+@click.option('--no-pos', '-n',
+              help='do not use open positions for testing',
+              is_flag=True)
+@click.option('--engine',
+              help='strategy engine, `backtrader` (default) or `vectorized`',
+              type=click.Choice(StockComputeService.ENGINES),
+              default='backtrader')
+def replay(user, tickers, from_date, to_date, output, per_day, rapid, skip_currency_conversion, no_pos, engine):
+    """Replay the trades advised on each date of a range, in a single strategy pass"""
+    email_receiver = None
+    open_positions = []
+    closed_positions = []
+    if user is not None:
+        # users data is read from the bucket
+        get_s3_prefix()
+        multi_user_svc = MultiUserTradeTodayService(to_date, users=[user], no_pos=no_pos)
+        user_data = multi_user_svc.load_user_data(multi_user_svc.get_users()[0])
+        email_receiver = user_data['email']
+        open_positions = user_data['open_positions']
+        closed_positions = user_data['closed_positions']
+        tickers = user_data['tickers'] if tickers is None else ','.join(list(dict.fromkeys(user_data['tickers'].split(',') + tickers.split(','))))
+    else:
+        user = "unknown"
+        if tickers is None:
+            raise click.UsageError("tickers must be supplied when replaying without a user")
+    # the consolidated console (and whatsapp) report only shows trades and indicators
+    exchange_rate_service = None
+    dataroma_service = None
+    runtime_stock_stats_service = None
+    trade_today_reports = per_day or 'email' in output or 'file' in output
+    if trade_today_reports:
+        exchange_rate_service = get_exchange_rate_service(skip_currency_conversion)
+        dataroma_service = DataromaService(path=get_service_cache_path('dataroma_service', 'dataroma_cache.json'))
+    if trade_today_reports and not rapid:
+        runtime_stock_stats_service = RuntimeStockStatsService(tickers.split(','),
+                                                               path=get_service_cache_path('runtime_stock_stats_service', 'fundamentals_cache.json'))
+    svc = ReplayService(tickers, from_date, to_date, open_positions, closed_positions, user, rapid=rapid, engine=engine,
+                        exchange_rate_service=exchange_rate_service, dataroma_service=dataroma_service,
+                        runtime_stock_stats_service=runtime_stock_stats_service)
+    svc.send_report(output, email_receiver, per_day=per_day)
+    # Update ExchangeRateCache with retrived dates (to avoid uneccessary API calls)
+    if exchange_rate_service is not None and not skip_currency_conversion:
+        exchange_rate_service.save_exchange_rate_cache()
+    if dataroma_service is not None:
+        dataroma_service.save_cache()
+    if runtime_stock_stats_service is not None:
+        runtime_stock_stats_service.save_cache()
+
 @click.command()
 @click.option('--today',
               help='mock today\'s date for testing in yyyy-mm-dd format (e.g. --today=2024-07-14)',
@@ -129,12 +266,8 @@ def trade_today(tickers, today, no_pos, context, position, output, user, rapid,
 def portfolio_stats(today):
     """Show portfolio statistics"""
     open_positions = OpenPositionService().get_all()
-    # add open positions to any supplied tickers
-    position_ticker_list = OpenPositionService().get_distinct_tickers_list()
-    # add supplied tickers
-    tickers = ','.join(position_ticker_list)
-    scmp = StockComputeService(tickers, today, open_positions)
-    portfolio_stats = scmp.portfolio_stats()
+    # positions are valued at the last close, no strategy needs to run
+    portfolio_stats = PortfolioValuationService(open_positions, today).portfolio_stats()
     
     print(f"Portfolio on {str(datetime.datetime.today().date())}: {portfolio_stats.portfolio_as_text()}")
     print(portfolio_stats.assets_as_text())
@@ -151,6 +284,26 @@ def get_s3_prefix():
         raise click.UsageError("TRADE_ADVISOR_S3_BUCKET environment variable not set")
     return s3_prefix
 
+def get_exchange_rate_service(skip_currency_conversion) -> ExchangeRateService:
+    if skip_currency_conversion:
+        # Initialize ExchangeRateService with a stub for testing if skip_currency_conversion is True
+        return ExchangeRateService(stub={'*': {'rates': {'USD': 1.00, 'CHF': 1.00}}})
+    # time-series requests depend on the openexchangerates.org plan
+    time_series = os.environ.get('OPEN_EXCHANGE_TIME_SERIES', 'false').lower() in ['true', '1', 'yes']
+    # Rates read from the local rate store when configured, otherwise from the S3 cache file
+    rate_store_path = os.environ.get('TRADE_ADVISOR_RATE_STORE', None)
+    if rate_store_path is not None:
+        return ExchangeRateService(store=ExchangeRateStoreRepository(rate_store_path), time_series=time_series)
+    s3_prefix = get_s3_prefix()
+    return ExchangeRateService(path=f"{s3_prefix}/services/exchange_rate_service/exchange_rate_cache.json", time_series=time_series)
+
+def get_service_cache_path(service, file_name):
+    # service caches shared by all runs (e.g. fundamentals, Dataroma snapshots), in memory only when no bucket is configured
+    s3_prefix = os.environ.get('TRADE_ADVISOR_S3_BUCKET', None)
+    if s3_prefix is None:
+        return None
+    return f"{s3_prefix}/services/{service}/{file_name}"
+
 def check_aws_cli_installed():
     if os.system(f"which aws > /dev/null 2>&1") != 0:
         raise click.UsageError("You must install awscli as per https://docs.aws.amazon.com/cli/v1/userguide/install-macos.html#install-macosos-bundled-no-sudo")
@@ -178,16 +331,84 @@ def upload(user):
     s3_prefix = get_s3_prefix()
     check_aws_cli_installed()
     validate_download_upload_requirements()
+    # single object read by trade-today / trade-today-all instead of the CSV files
+    bundle_path = UserBundleRepository.create(f"./local_storage/users/{user}", user, UserRepository(f'{s3_prefix}/users/users.csv'))
+    print(f"created {bundle_path}")
     command = f"aws s3 sync ./local_storage/users/{user} {s3_prefix}/users/{user}"
     print(command)
     os.system(command)
    
 @click.command()
-def download_yfinance_data():
+@click.option('--incremental', '-i',
+              help='only download days missing in the price store (requires TRADE_ADVISOR_PRICE_STORE)', 
+              is_flag=True)
+def download_yfinance_data(incremental):
     """Download yfinance data for all users"""
     scmp = StockComputeService(tickers="", todays_date_str=str(datetime.datetime.today().date()), calculate_dates_only=True)
-    YfinanceDataService().download_data_from_api(scmp.warmup_date, scmp.end_date)
+    YfinanceDataService().download_data_from_api(scmp.warmup_date, scmp.end_date, incremental=incremental)
     
+def parse_param_values(param):
+    # e.g. lower_rsi=40,44,48 -> {'lower_rsi': [40, 44, 48]}
+    param_values = {}
+    for p in param:
+        if '=' not in p:
+            raise click.UsageError(f"invalid --param {p}, expected name=value1,value2 (e.g. lower_rsi=40,44,48)")
+        name, values = p.split('=', 1)
+        try:
+            param_values[name] = [int(v) if v.lstrip('-').isdigit() else float(v) for v in values.split(',')]
+        except ValueError:
+            raise click.UsageError(f"invalid --param {p}, values must be numbers")
+    return param_values
+
+@click.command()
+@click.option('--strategy', '-s',
+              help='strategy to optimise',
+              type=click.Choice(list(OptimiserService.STRATEGIES.keys())),
+              default='bbrsi')
+@click.option('--tickers', '-t',
+              help='TICKERS to backtest provided as CSV. e.g.: AMZN,GOOG,MSFT)',
+              required=True)
+@click.option('--start-date',
+              help='first date to trade in yyyy-mm-dd format (indicators are warmed up before this date)',
+              required=True)
+@click.option('--end-date',
+              help='date to stop trading at in yyyy-mm-dd format',
+              default=str(datetime.datetime.today().date()))
+@click.option('--param', '-p',
+              help='strategy param values to sweep as name=value1,value2 (e.g. -p lower_rsi=40,44,48). Call this multiple times for multiple params',
+              multiple=True)
+@click.option('--cash',
+              help='initial cash',
+              show_default=True,
+              default=30000)
+@click.option('--workers', '-w',
+              help='number of backtest processes (defaults to number of CPUs)',
+              type=int,
+              default=None)
+@click.option('--results',
+              help='DuckDB database storing results, params already computed are skipped',
+              show_default=True,
+              default='./local_storage/optimisation_results.duckdb')
+@click.option('--data-directory',
+              help='folder with yfinance_data_{ticker}.csv files to use instead of downloading them from S3',
+              default=None)
+@click.option('--top',
+              help='number of best results shown',
+              show_default=True,
+              default=10)
+def optimise(strategy, tickers, start_date, end_date, param, cash, workers, results, data_directory, top):
+    """Backtest strategy params combinations in parallel and show the best ones"""
+    param_values = parse_param_values(param)
+    svc = OptimiserService(strategy, tickers, parse_date(start_date), parse_date(end_date),
+                           OptimisationResultRepository(results), initial_cash=cash, max_workers=workers)
+    price_data = None
+    if data_directory is not None:
+        price_data = YfinanceDataService.load_yfinance_data_from_filesystem(svc.tickers_list, data_directory, svc.warmup_date, svc.end_date)
+    optimisation_results = svc.optimise(param_values, price_data)
+    print(f"Best {min(top, len(optimisation_results))} of {len(optimisation_results)} results:")
+    for result in optimisation_results[:top]:
+        print(result.as_text())
+
 @click.command()
 @click.option('--user', '-u', 
               required=True,
@@ -218,11 +439,14 @@ def cli():
 
 # Add the commands to the group
 cli.add_command(trade_today)
+cli.add_command(trade_today_all)
+cli.add_command(replay)
 cli.add_command(portfolio_stats)
 cli.add_command(download)
 cli.add_command(upload)
 cli.add_command(download_yfinance_data)
 cli.add_command(test_email)
+cli.add_command(optimise)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,52 @@
+from typing import Dict, List, Tuple
+
+from models.open_position import OpenPosition
+
+
+class OpenPositionIndex:
+    """
+    Open positions (e.g. OpenPositionRepository results) indexed by (ticker, date) and by ticker, so that strategies
+    and reports look positions up in O(1) instead of scanning the whole list for every ticker and bar.
+    Several positions per ticker (and per date) are kept, in the order they were supplied.
+    """
+    def __init__(self, open_positions: List[OpenPosition] = None):
+        self.open_positions = list(open_positions) if open_positions is not None else []
+        self.by_ticker_date: Dict[Tuple[str, object], List[OpenPosition]] = {}
+        self.by_ticker: Dict[str, List[OpenPosition]] = {}
+        for position in self.open_positions:
+            self.by_ticker_date.setdefault((position.ticker, position.date), []).append(position)
+            self.by_ticker.setdefault(position.ticker, []).append(position)
+
+    @staticmethod
+    def of(open_positions) -> 'OpenPositionIndex':
+        """ Indexes open_positions, unless already indexed (so that an index built once is shared) """
+        if isinstance(open_positions, OpenPositionIndex):
+            return open_positions
+        return OpenPositionIndex(open_positions)
+
+    def get(self, ticker, date) -> List[OpenPosition]:
+        """ Positions opened on ticker at date """
+        return self.by_ticker_date.get((ticker, date), [])
+
+    def get_by_ticker(self, ticker) -> List[OpenPosition]:
+        """ Positions opened on ticker, at any date """
+        return self.by_ticker.get(ticker, [])
+
+    def first_by_ticker(self, ticker) -> OpenPosition:
+        positions = self.get_by_ticker(ticker)
+        return positions[0] if positions else None
+
+    def tickers(self) -> List[str]:
+        return list(self.by_ticker.keys())
+
+    def __iter__(self):
+        return iter(self.open_positions)
+
+    def __len__(self):
+        return len(self.open_positions)
+
+    def __getitem__(self, index):
+        return self.open_positions[index]
+
+    def __repr__(self):
+        return f"OpenPositionIndex(open_positions={self.open_positions})"
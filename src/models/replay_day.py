@@ -0,0 +1,41 @@
+import datetime
+from typing import Dict, List
+
+from schemas.stock_daily_stats import StockDailyStats
+from schemas.trade_action import TradeAction
+from strategies.base_strategy import BaseStrategy
+
+
+class ReplayDay:
+    """
+    Trades advised and stock statistics of one replayed date (see ReplayService).
+    Exposes the StockComputeService methods read by TradeTodayReportingService (trades_today, get_stock_daily_stats_list),
+    so that each replayed date is reported as trade-today would have reported it.
+    """
+    def __init__(self, today: str, bar_date: datetime.date, trade_actions: List[TradeAction],
+                 stock_daily_stats_lists: Dict[str, List[StockDailyStats]], end_indexes: Dict[str, int]):
+        """
+        Args:
+            today (str): replayed date (as per trade-today --today)
+            bar_date (datetime.date): date of the bar trades were advised from (the day before today)
+            stock_daily_stats_lists (dict): whole replay statistics by ticker, shared by all replayed dates
+            end_indexes (dict): index following the bar_date statistics in each ticker list
+        """
+        self.today = today
+        self.bar_date = bar_date
+        self.trade_actions = trade_actions
+        self.stock_daily_stats_lists = stock_daily_stats_lists
+        self.end_indexes = end_indexes
+
+    def trades_today(self) -> List[TradeAction]:
+        return self.trade_actions
+
+    def get_stock_daily_stats_list(self, ticker, num_lines=BaseStrategy.TRADE_ACTION_CONTEXT_SIZE) -> List[StockDailyStats]:
+        """ Last num_lines statistics of ticker up to (and including) bar_date """
+        end_index = self.end_indexes.get(ticker, 0)
+        return self.stock_daily_stats_lists[ticker][max(0, end_index - num_lines):end_index]
+
+    def stock_stats_today(self) -> List[StockDailyStats]:
+        """ bar_date statistics of all tickers, sorted by RSI (as per the trade-today report) """
+        stock_stats = [stats[-1] for stats in [self.get_stock_daily_stats_list(ticker, 1) for ticker in self.stock_daily_stats_lists] if stats]
+        return sorted(stock_stats, key=lambda stock: stock.rsi)
@@ -0,0 +1,62 @@
+import datetime
+
+import numpy as np
+
+from schemas.stock_daily_stats import StockDailyStats
+
+
+class StockDailyStatsRingBuffer:
+    """
+    Last `capacity` StockDailyStats of a ticker, stored as rows of a fixed-size numpy record array written in place
+    (oldest rows are overwritten), so that memory does not grow with the number of bars.
+    Reads (indexing, slicing, iteration) materialise StockDailyStats objects, oldest first, as per a list of them.
+    """
+    DTYPE = np.dtype([('date', 'datetime64[D]'),
+                      ('close', np.float64),
+                      ('rsi', np.float64),
+                      ('rsi_ma', np.float64),
+                      ('rsi_crossover_signal', np.bool_),
+                      ('bb_top', np.float64),
+                      ('bb_mid', np.float64),
+                      ('bb_bot', np.float64),
+                      ('position', np.float64),
+                      ('pnl_pct', np.float64)])
+
+    def __init__(self, ticker, capacity):
+        if capacity < 1:
+            raise Exception(f"Invalid ring buffer capacity {capacity}")
+        self.ticker = ticker
+        self.capacity = capacity
+        self.records = np.zeros(capacity, dtype=StockDailyStatsRingBuffer.DTYPE)
+        # number of rows appended so far (the next row is written at count % capacity)
+        self.count = 0
+
+    def append_values(self, date: datetime.date, close, rsi, rsi_ma, rsi_crossover_signal, bb_top, bb_mid, bb_bot, position, pnl_pct):
+        self.records[self.count % self.capacity] = (date, close, rsi, rsi_ma, rsi_crossover_signal, bb_top, bb_mid, bb_bot, position, pnl_pct)
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def stats(self, index) -> StockDailyStats:
+        """ Materialises the index-th (oldest first) row """
+        record = self.records[(self.count - len(self) + index) % self.capacity]
+        return StockDailyStats(date=record['date'].astype(datetime.date),
+                               ticker=self.ticker,
+                               close=float(record['close']),
+                               rsi=float(record['rsi']),
+                               rsi_ma=float(record['rsi_ma']),
+                               rsi_crossover_signal=bool(record['rsi_crossover_signal']),
+                               bb_top=float(record['bb_top']),
+                               bb_mid=float(record['bb_mid']),
+                               bb_bot=float(record['bb_bot']),
+                               position=float(record['position']),
+                               pnl_pct=float(record['pnl_pct']))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.stats(i) for i in range(len(self))[index]]
+        return self.stats(range(len(self))[index])
+
+    def __iter__(self):
+        return iter(self[:])
@@ -1,19 +1,40 @@
-import duckdb
-import boto3
-
 from models.open_position import OpenPosition
+from repositories.resource_registry import ResourceRegistry
 import os
+import tempfile
 
 class BaseRepository():
-    def __init__(self, path):
+    # memory backed folder for S3 objects read by DuckDB (default temp folder when not available)
+    SPOOL_DIRECTORY = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+    # table holding this repository data in a user bundle (see UserBundleRepository)
+    BUNDLE_TABLE = None
+
+    def __init__(self, path, bundle=None):
+        """
+        CSV file read through DuckDB (connection from ResourceRegistry), query it with `SELECT ... FROM {self.source}`
+        S3 objects are streamed into a uniquely named spool file, loaded into a TEMP table (private to the connection) and removed,
+        so repositories can be loaded concurrently (e.g. from a thread pool)
+
+        Args:
+            bundle (UserBundleRepository, optional): user bundle read instead of path when it holds BUNDLE_TABLE
+        """
+        if bundle is not None and bundle.has_table(self.BUNDLE_TABLE):
+            self.conn = bundle.conn
+            self.path = path
+            self.source = self.BUNDLE_TABLE
+            return
+        self.conn = ResourceRegistry.duckdb_connection()
         if path.startswith("s3://"):
-            s3 = boto3.client('s3')
+            s3 = ResourceRegistry.s3_client()
             #print(f"downloading {path}")
-            s3.download_file(path.split('/')[2], '/'.join(path.split('/')[3:]), 'temp.csv')
-            self.conn = duckdb.connect()
-            self.path = 'temp.csv'
+            with tempfile.NamedTemporaryFile(suffix='.csv', dir=BaseRepository.SPOOL_DIRECTORY) as spool:
+                s3.download_fileobj(path.split('/')[2], '/'.join(path.split('/')[3:]), spool)
+                spool.flush()
+                self.conn.execute(f"CREATE TEMP TABLE csv_data AS SELECT * FROM read_csv_auto('{spool.name}')")
+            self.path = path
+            self.source = 'csv_data'
         else:
             # Local path
-            self.conn = duckdb.connect(database=':memory:')
             self.path = path
-            
\ No newline at end of file
+            self.source = f"read_csv_auto('{path}')"
@@ -4,11 +4,12 @@ from models.closed_position import ClosedPosition
 from repositories.base_repository import BaseRepository
 
 class ClosedPositionRepository(BaseRepository):
-    def __init__(self, path):
-        BaseRepository.__init__(self, path)
+    BUNDLE_TABLE = 'closed_positions'
+    def __init__(self, path, bundle=None):
+        BaseRepository.__init__(self, path, bundle)
 
     def get_all(self):
-        query_result = self.conn.execute(f"SELECT * FROM read_csv_auto('{self.path}')").fetchall()
+        query_result = self.conn.execute(f"SELECT * FROM {self.source}").fetchall()
         result = [ClosedPosition(
             date=row[0], 
             ticker=row[1], 
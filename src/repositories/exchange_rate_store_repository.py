@@ -0,0 +1,106 @@
+import glob
+import os
+import time
+
+from repositories.resource_registry import ResourceRegistry
+
+class ExchangeRateStoreRepository():
+    """
+    Persistent columnar store of daily exchange rates (openexchangerates.org USD based rates), one row per date and currency:
+        {path}/rates.parquet (date, currency, rate)
+        {path}/delta-{timestamp}.parquet (rows appended since rates.parquet was written)
+    Rates are immutable once published, so deltas only hold dates not stored yet (see append) until compacted into rates.parquet.
+    Rates are exchanged as dictionaries: date string (yyyy-mm-dd) -> {currency: rate}
+    """
+    FILE_NAME = 'rates.parquet'
+    DELTA_PREFIX = 'delta-'
+    # dates kept by compact (about 20 years of daily rates), oldest dates are evicted first
+    MAX_DATES = 7300
+    # delta files merged by compact
+    MAX_DELTA_FILES = 20
+
+    def __init__(self, path, max_dates=MAX_DATES):
+        self.path = path
+        self.max_dates = max_dates
+        os.makedirs(self.path, exist_ok=True)
+        self.conn = ResourceRegistry.duckdb_connection()
+        # stored dates index, loaded on first use
+        self.stored_dates = None
+
+    def files(self):
+        return glob.glob(os.path.join(self.path, '*.parquet'))
+
+    def delta_files(self):
+        return sorted(glob.glob(os.path.join(self.path, f'{ExchangeRateStoreRepository.DELTA_PREFIX}*.parquet')))
+
+    def _read_parquet_sql(self):
+        return f"read_parquet('{self.path}/*.parquet')"
+
+    def dates(self) -> set:
+        """ Returns the stored dates (yyyy-mm-dd strings) """
+        if self.stored_dates is None:
+            if len(self.files()) == 0:
+                self.stored_dates = set()
+            else:
+                result = self.conn.execute(f"SELECT DISTINCT date FROM {self._read_parquet_sql()}").fetchall()
+                self.stored_dates = set([str(date) for date, in result])
+        return self.stored_dates
+
+    def load(self, dates_str) -> dict:
+        """
+        Loads the rates of the stored dates amongst dates_str with a single query
+        Returns:
+            dict: date string -> {currency: rate}
+        """
+        dates_to_load = [date_str for date_str in dates_str if date_str in self.dates()]
+        if len(dates_to_load) == 0:
+            return {}
+        result = self.conn.execute(
+            # DISTINCT: rows are briefly in both rates.parquet and a delta file while compacting
+            f"SELECT DISTINCT date, currency, rate FROM {self._read_parquet_sql()} "
+            "WHERE list_contains($1::DATE[], date)",
+            [dates_to_load]).fetchall()
+        rates_by_date = {}
+        for date, currency, rate in result:
+            rates_by_date.setdefault(str(date), {})[currency] = rate
+        return rates_by_date
+
+    def _write_parquet(self, rates_by_date, path):
+        rows = [(date_str, currency, rate) for date_str, rates in rates_by_date.items() for currency, rate in rates.items()]
+        self.conn.execute("DROP TABLE IF EXISTS rates_to_save")
+        self.conn.execute(
+            "CREATE TEMP TABLE rates_to_save AS SELECT * FROM ("
+            "SELECT unnest($1::DATE[]) AS date, unnest($2::VARCHAR[]) AS currency, unnest($3::DOUBLE[]) AS rate)",
+            [[row[0] for row in rows], [row[1] for row in rows], [float(row[2]) for row in rows]])
+        temp_path = path + '.tmp'
+        self.conn.execute(f"COPY (SELECT * FROM rates_to_save ORDER BY date, currency) TO '{temp_path}' (FORMAT PARQUET)")
+        os.replace(temp_path, path)
+        self.conn.execute("DROP TABLE rates_to_save")
+
+    def append(self, rates_by_date):
+        """ Appends the rates of dates not stored yet as a delta file (already stored dates are ignored) """
+        new_rates_by_date = {date_str: rates for date_str, rates in rates_by_date.items() if date_str not in self.dates()}
+        if len(new_rates_by_date) == 0:
+            return
+        file_name = f"{ExchangeRateStoreRepository.DELTA_PREFIX}{time.time_ns()}.parquet"
+        self._write_parquet(new_rates_by_date, os.path.join(self.path, file_name))
+        self.stored_dates.update(new_rates_by_date.keys())
+
+    def compact(self, force=False):
+        """
+        Merges the delta files into rates.parquet, keeping the most recent max_dates dates.
+        Unless forced, only done once there are more than MAX_DELTA_FILES delta files or more than max_dates dates
+        """
+        dates_str = sorted(self.dates())
+        num_delta_files = len(self.delta_files())
+        if not force and num_delta_files <= ExchangeRateStoreRepository.MAX_DELTA_FILES and len(dates_str) <= self.max_dates:
+            return
+        if num_delta_files == 0 and len(dates_str) <= self.max_dates:
+            return
+        kept_dates_str = dates_str[-self.max_dates:] if self.max_dates > 0 else []
+        rates_by_date = self.load(kept_dates_str)
+        delta_files = self.delta_files()
+        self._write_parquet(rates_by_date, os.path.join(self.path, ExchangeRateStoreRepository.FILE_NAME))
+        for delta_file in delta_files:
+            os.remove(delta_file)
+        self.stored_dates = set(kept_dates_str)
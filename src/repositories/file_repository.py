@@ -1,15 +1,15 @@
 import botocore
-import duckdb
-import boto3
 
 import os
 
+from repositories.resource_registry import ResourceRegistry
+
 class FileRepository():
     def __init__(self, path):
         self.path = path
         self.is_s3_path = path.startswith("s3://")
         if self.is_s3_path:
-            self.s3 = boto3.client('s3')
+            self.s3 = ResourceRegistry.s3_client()
             self.s3_bucket = path.split('/')[2]
             self.s3_key = '/'.join(path.split('/')[3:])
         else:
@@ -53,7 +53,7 @@ class FileRepository():
             print(f"An unexpected error occurred: {e}")
             
     def delete_all_files_in_path(self):
-        s3 = boto3.client('s3')
+        s3 = self.s3
         # List objects under the path
         response = s3.list_objects_v2(Bucket=self.s3_bucket, Prefix=self.s3_key)
         if 'Contents' in response:
@@ -0,0 +1,90 @@
+import glob
+import os
+
+import numpy as np
+
+from repositories.resource_registry import ResourceRegistry
+
+class IndicatorStoreRepository():
+    """
+    Daily indicators materialised from the price store (see YfinanceDataService.materialise_indicators), one file per ticker:
+        {path}/ticker={TICKER}/indicators.parquet (date, close, rsi, rsi_ma, bb_top, bb_mid, bb_bot, rsi_crossover_signal, seed_date)
+    The close each row was computed from and the first bar the indicators were seeded from are kept, so that readers only
+    use indicators of unchanged prices and of the same warmup (see indicator_service.indicators_from_store).
+    Indicator data is exchanged as dictionaries of numpy columns, as per PriceStoreRepository.
+    """
+    COLUMNS = ['close', 'rsi', 'rsi_ma', 'bb_top', 'bb_mid', 'bb_bot']
+    FILE_NAME = 'indicators.parquet'
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): store folder, e.g. {price store}/indicators (see YfinanceDataService.indicator_store)
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self.conn = ResourceRegistry.duckdb_connection()
+
+    def file_path(self, ticker):
+        return os.path.join(self.path, f"ticker={ticker}", IndicatorStoreRepository.FILE_NAME)
+
+    def tickers(self):
+        return sorted([os.path.basename(os.path.dirname(file)).split('=', 1)[1]
+                       for file in glob.glob(os.path.join(self.path, 'ticker=*', IndicatorStoreRepository.FILE_NAME))])
+
+    def save(self, ticker, indicator_data):
+        """
+        Replaces the ticker indicators
+        Args:
+            indicator_data (dict): 'date' (datetime64[D] array), close and indicator float arrays, 'rsi_crossover_signal' bool array
+                and 'seed_date' (see indicator_service.indicator_table)
+        """
+        os.makedirs(os.path.dirname(self.file_path(ticker)), exist_ok=True)
+        self.conn.execute("DROP TABLE IF EXISTS indicators_to_save")
+        self.conn.execute(
+            "CREATE TEMP TABLE indicators_to_save AS SELECT * FROM ("
+            "SELECT unnest($1::DATE[]) AS date, " +
+            ", ".join([f"unnest(${i + 2}::DOUBLE[]) AS {column}" for i, column in enumerate(IndicatorStoreRepository.COLUMNS)]) +
+            f", unnest(${len(IndicatorStoreRepository.COLUMNS) + 2}::BOOLEAN[]) AS rsi_crossover_signal"
+            f", ${len(IndicatorStoreRepository.COLUMNS) + 3}::DATE AS seed_date)",
+            [indicator_data['date'].astype(str).tolist()] +
+            [np.asarray(indicator_data[column], dtype=np.float64).tolist() for column in IndicatorStoreRepository.COLUMNS] +
+            [np.asarray(indicator_data['rsi_crossover_signal'], dtype=bool).tolist(), str(indicator_data['seed_date'])])
+        temp_path = self.file_path(ticker) + '.tmp'
+        self.conn.execute(f"COPY (SELECT * FROM indicators_to_save ORDER BY date) TO '{temp_path}' (FORMAT PARQUET)")
+        os.replace(temp_path, self.file_path(ticker))
+        self.conn.execute("DROP TABLE indicators_to_save")
+
+    def load(self, tickers_list, from_date, to_date) -> dict:
+        """
+        Loads indicators of the stored tickers among tickers_list with a single range query
+        Args:
+            from_date (datetime.date): First date to load
+            to_date (datetime.date): Date to stop loading at (excluded)
+        Returns:
+            dict: ticker -> {'date': datetime64[D] array, close and indicator float arrays (NaN during warmup),
+                'rsi_crossover_signal': bool array, 'seed_date': datetime64[D] (None when no dates are loaded)},
+                tickers without indicators are left out
+        """
+        stored_tickers = [ticker for ticker in tickers_list if os.path.exists(self.file_path(ticker))]
+        if len(stored_tickers) == 0:
+            return {}
+        result = self.conn.execute(
+            f"SELECT ticker, date, {', '.join(IndicatorStoreRepository.COLUMNS)}, rsi_crossover_signal, seed_date "
+            f"FROM read_parquet('{self.path}/ticker=*/{IndicatorStoreRepository.FILE_NAME}', hive_partitioning = true, "
+            "hive_types = {'ticker': VARCHAR}) "
+            "WHERE list_contains($1, ticker) AND date >= $2 AND date < $3 "
+            "ORDER BY ticker, date",
+            [stored_tickers, from_date, to_date]).fetchnumpy()
+        tickers = np.asarray(result['ticker'], dtype=object)
+        indicator_data = {}
+        for ticker in stored_tickers:
+            rows = np.flatnonzero(tickers == ticker)
+            start, end = (rows[0], rows[-1] + 1) if len(rows) > 0 else (0, 0)
+            indicator_data[ticker] = {'date': np.asarray(result['date'][start:end]).astype('datetime64[D]'),
+                                      # indicators warmup (NaN) is read back as NULL
+                                      **{column: np.ma.filled(np.ma.asarray(result[column][start:end], dtype=np.float64), np.nan)
+                                         for column in IndicatorStoreRepository.COLUMNS},
+                                      'rsi_crossover_signal': np.asarray(result['rsi_crossover_signal'][start:end], dtype=bool),
+                                      'seed_date': np.datetime64(result['seed_date'][start], 'D') if end > start else None}
+        return indicator_data
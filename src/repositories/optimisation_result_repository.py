@@ -0,0 +1,60 @@
+import json
+import os
+
+import duckdb
+
+from schemas.optimisation_result import OptimisationResult
+
+class OptimisationResultRepository():
+    """
+    Persists backtest results in a DuckDB database file, keyed by (strategy, params_hash, tickers, start_date, end_date)
+    so that optimisation reruns skip the params combinations already computed
+    """
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path) != '':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = duckdb.connect(database=path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS optimisation_results (
+                strategy VARCHAR,
+                params_hash VARCHAR,
+                tickers VARCHAR,
+                start_date DATE,
+                end_date DATE,
+                params VARCHAR,
+                initial_cash DOUBLE,
+                final_value DOUBLE,
+                pnl DOUBLE,
+                pnl_pct DOUBLE,
+                num_trade_actions INTEGER,
+                PRIMARY KEY (strategy, params_hash, tickers, start_date, end_date)
+            )""")
+
+    def save(self, result: OptimisationResult):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO optimisation_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [result.strategy, result.params_hash, result.tickers, result.start_date, result.end_date,
+             json.dumps(result.params), result.initial_cash, result.final_value, result.pnl, result.pnl_pct,
+             result.num_trade_actions])
+
+    def get_params_hashes(self, strategy, tickers, start_date, end_date) -> set:
+        """ Returns the params hashes already computed for the strategy, tickers (sorted CSV) and date window """
+        query_result = self.conn.execute(
+            "SELECT params_hash FROM optimisation_results WHERE strategy = ? AND tickers = ? AND start_date = ? AND end_date = ?",
+            [strategy, tickers, start_date, end_date]).fetchall()
+        return {row[0] for row in query_result}
+
+    def get_all(self, strategy, tickers, start_date, end_date, params_hashes=None) -> list:
+        """ Returns results for the strategy, tickers (sorted CSV) and date window, best final value first """
+        query_result = self.conn.execute(
+            "SELECT strategy, params_hash, tickers, start_date, end_date, params, initial_cash, final_value, pnl, pnl_pct, num_trade_actions "
+            "FROM optimisation_results WHERE strategy = ? AND tickers = ? AND start_date = ? AND end_date = ? "
+            "ORDER BY final_value DESC",
+            [strategy, tickers, start_date, end_date]).fetchall()
+        result = [OptimisationResult(strategy=row[0], params_hash=row[1], tickers=row[2], start_date=row[3], end_date=row[4],
+                                     params=json.loads(row[5]), initial_cash=row[6], final_value=row[7], pnl=row[8],
+                                     pnl_pct=row[9], num_trade_actions=row[10]) for row in query_result]
+        if params_hashes is not None:
+            result = [r for r in result if r.params_hash in params_hashes]
+        return result
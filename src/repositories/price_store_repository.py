@@ -0,0 +1,149 @@
+import datetime
+import glob
+import os
+import time
+
+import numpy as np
+
+from repositories.resource_registry import ResourceRegistry
+
+class PriceStoreRepository():
+    """
+    Persistent columnar store of daily prices, one folder per ticker partition:
+        {path}/ticker={TICKER}/prices.parquet (date, open, high, low, close, volume)
+        {path}/ticker={TICKER}/delta-{timestamp}.parquet (rows appended since prices.parquet was written)
+    Rows from deltas take precedence over prices.parquet (latest delta first), until compacted into prices.parquet.
+    Price data is exchanged as dictionaries of numpy columns (see YfinanceDataService.load_yfinance_data_from_filesystem)
+    """
+    COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+    FILE_NAME = 'prices.parquet'
+    DELTA_PREFIX = 'delta-'
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self.conn = ResourceRegistry.duckdb_connection()
+
+    def partition_directory(self, ticker):
+        return os.path.join(self.path, f"ticker={ticker}")
+
+    def partition_files(self, ticker):
+        return glob.glob(os.path.join(self.partition_directory(ticker), '*.parquet'))
+
+    def delta_files(self, ticker):
+        return sorted(glob.glob(os.path.join(self.partition_directory(ticker), f'{PriceStoreRepository.DELTA_PREFIX}*.parquet')))
+
+    def tickers(self):
+        return sorted([entry.split('=', 1)[1] for entry in os.listdir(self.path)
+                       if entry.startswith('ticker=') and len(self.partition_files(entry.split('=', 1)[1])) > 0])
+
+    def last_modified(self, ticker) -> datetime.datetime:
+        """ Returns when the ticker partition was last written (UTC), or None if the ticker is not stored """
+        files = self.partition_files(ticker)
+        if len(files) == 0:
+            return None
+        return datetime.datetime.fromtimestamp(max([os.path.getmtime(file) for file in files]), tz=datetime.timezone.utc)
+
+    def _write_parquet(self, price_data, path):
+        self.conn.execute("DROP TABLE IF EXISTS prices_to_save")
+        self.conn.execute(
+            "CREATE TEMP TABLE prices_to_save AS SELECT * FROM ("
+            "SELECT unnest($1::DATE[]) AS date, " +
+            ", ".join([f"unnest(${i + 2}::DOUBLE[]) AS {column}" for i, column in enumerate(PriceStoreRepository.COLUMNS)]) +
+            ")",
+            [price_data['date'].astype(str).tolist()] + [np.asarray(price_data[column], dtype=np.float64).tolist() for column in PriceStoreRepository.COLUMNS])
+        temp_path = path + '.tmp'
+        self.conn.execute(f"COPY (SELECT DISTINCT ON (date) * FROM prices_to_save ORDER BY date) TO '{temp_path}' (FORMAT PARQUET)")
+        os.replace(temp_path, path)
+        self.conn.execute("DROP TABLE prices_to_save")
+
+    def save(self, ticker, price_data):
+        """ Replaces the ticker partition with the supplied price data (sorted by date, duplicated dates removed) """
+        os.makedirs(self.partition_directory(ticker), exist_ok=True)
+        self._write_parquet(price_data, os.path.join(self.partition_directory(ticker), PriceStoreRepository.FILE_NAME))
+        for delta_file in self.delta_files(ticker):
+            os.remove(delta_file)
+
+    def append(self, ticker, price_data):
+        """ Appends rows to the ticker partition as a delta file (rows for already stored dates replace them) """
+        if len(price_data['date']) == 0:
+            return
+        os.makedirs(self.partition_directory(ticker), exist_ok=True)
+        file_name = f"{PriceStoreRepository.DELTA_PREFIX}{time.time_ns()}.parquet"
+        self._write_parquet(price_data, os.path.join(self.partition_directory(ticker), file_name))
+
+    def compact(self, ticker):
+        """ Merges the ticker delta files into prices.parquet """
+        if len(self.delta_files(ticker)) == 0:
+            return
+        price_data = self.load([ticker], datetime.date.min, datetime.date.max)[ticker]
+        self.save(ticker, price_data)
+
+    def last_dates(self) -> dict:
+        """ Returns the last stored date per ticker (ticker -> datetime.date) """
+        if len(self.tickers()) == 0:
+            return {}
+        result = self.conn.execute(
+            f"SELECT ticker, max(date) FROM {self._read_parquet_sql()} GROUP BY ticker").fetchall()
+        return {ticker: last_date for ticker, last_date in result}
+
+    def _read_parquet_sql(self):
+        return (f"read_parquet('{self.path}/ticker=*/*.parquet', hive_partitioning = true, "
+                "hive_types = {'ticker': VARCHAR}, filename = true)")
+
+    def load(self, tickers_list, from_date, to_date, from_dates: dict = None) -> dict:
+        """
+        Loads prices for all tickers with a single range query
+        Args:
+            tickers_list (list): Ticker symbols to load (e.g. ['AAPL', 'GOOG'])
+            from_date (datetime.date): First date to load
+            to_date (datetime.date): Date to stop loading at (excluded)
+            from_dates (dict, optional): ticker -> first date to load, overriding from_date (e.g. per ticker windows)
+        Returns:
+            dict: ticker -> {'date': datetime64[D] array, 'open', 'high', 'low', 'close', 'volume': float arrays}
+        """
+        missing_tickers = [ticker for ticker in tickers_list if len(self.partition_files(ticker)) == 0]
+        if len(missing_tickers) > 0:
+            raise Exception(f"Missing tickers in price store {self.path}: {missing_tickers}")
+        from_dates = from_dates if from_dates is not None else {}
+        range_tickers = list(dict.fromkeys(tickers_list))
+        result = self.conn.execute(
+            f"SELECT ticker, date, {', '.join(PriceStoreRepository.COLUMNS)} "
+            f"FROM {self._read_parquet_sql()} "
+            "JOIN (SELECT unnest($1::VARCHAR[]) AS range_ticker, unnest($3::DATE[]) AS range_from_date) ON ticker = range_ticker "
+            "WHERE list_contains($1, ticker) AND date >= range_from_date AND date < $2 "
+            # latest delta file wins over older deltas and prices.parquet
+            f"QUALIFY row_number() OVER (PARTITION BY ticker, date ORDER BY "
+            f"starts_with(parse_filename(filename), '{PriceStoreRepository.DELTA_PREFIX}') DESC, filename DESC) = 1 "
+            "ORDER BY ticker, date",
+            [range_tickers, to_date, [from_dates.get(ticker, from_date) for ticker in range_tickers]]).fetchnumpy()
+        tickers = np.asarray(result['ticker'], dtype=object)
+        price_data = {}
+        for ticker in tickers_list:
+            rows = np.flatnonzero(tickers == ticker)
+            start, end = (rows[0], rows[-1] + 1) if len(rows) > 0 else (0, 0)
+            price_data[ticker] = {'date': np.asarray(result['date'][start:end]).astype('datetime64[D]'),
+                                  **{column: np.asarray(result[column][start:end], dtype=np.float64) for column in PriceStoreRepository.COLUMNS}}
+        return price_data
+
+    def latest_closes(self, tickers_list, to_date) -> dict:
+        """
+        Loads the last close of each ticker before to_date with a single query (see PortfolioValuationService)
+        Args:
+            tickers_list (list): Ticker symbols to load (e.g. ['AAPL', 'GOOG'])
+            to_date (datetime.date): Date to stop loading at (excluded)
+        Returns:
+            dict: ticker -> (datetime.date, close), tickers without prices before to_date are left out
+        """
+        missing_tickers = [ticker for ticker in tickers_list if len(self.partition_files(ticker)) == 0]
+        if len(missing_tickers) > 0:
+            raise Exception(f"Missing tickers in price store {self.path}: {missing_tickers}")
+        result = self.conn.execute(
+            f"SELECT ticker, date, close "
+            f"FROM {self._read_parquet_sql()} "
+            "WHERE list_contains($1, ticker) AND date < $2 "
+            # latest date, then latest delta file wins over older deltas and prices.parquet (as per load)
+            f"QUALIFY row_number() OVER (PARTITION BY ticker ORDER BY date DESC, "
+            f"starts_with(parse_filename(filename), '{PriceStoreRepository.DELTA_PREFIX}') DESC, filename DESC) = 1",
+            [list(tickers_list), to_date]).fetchall()
+        return {ticker: (date, float(close)) for ticker, date, close in result}
@@ -0,0 +1,47 @@
+import os
+import threading
+
+import boto3
+import botocore.config
+import duckdb
+
+class ResourceRegistry():
+    """
+    Process-wide S3 client and DuckDB database, created once and shared by all repositories and services.
+    The S3 client is thread-safe (boto3 sessions are not, so the client is created once under a lock), with a connection pool
+    sized for concurrent downloads/uploads (TRADE_ADVISOR_S3_MAX_POOL_CONNECTIONS, default 32).
+    DuckDB connections are cursors of a single in-memory database: cheap to open, usable from their own thread,
+    and their TEMP tables are private to them (dropped once the connection is garbage collected).
+    Resources are recreated in forked processes (e.g. process pool workers).
+    """
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('TRADE_ADVISOR_S3_MAX_POOL_CONNECTIONS', 32))
+    lock = threading.Lock()
+    pid = None
+    s3 = None
+    database = None
+
+    @staticmethod
+    def _check_process():
+        # resources inherited from a parent process are not safe to use
+        if ResourceRegistry.pid != os.getpid():
+            ResourceRegistry.pid = os.getpid()
+            ResourceRegistry.s3 = None
+            ResourceRegistry.database = None
+
+    @staticmethod
+    def s3_client():
+        with ResourceRegistry.lock:
+            ResourceRegistry._check_process()
+            if ResourceRegistry.s3 is None:
+                config = botocore.config.Config(max_pool_connections=ResourceRegistry.S3_MAX_POOL_CONNECTIONS)
+                ResourceRegistry.s3 = boto3.session.Session().client('s3', config=config)
+            return ResourceRegistry.s3
+
+    @staticmethod
+    def duckdb_connection() -> duckdb.DuckDBPyConnection:
+        """ Returns a new connection to the shared in-memory database (create tables as TEMP to keep them private) """
+        with ResourceRegistry.lock:
+            ResourceRegistry._check_process()
+            if ResourceRegistry.database is None:
+                ResourceRegistry.database = duckdb.connect(database=':memory:')
+            return ResourceRegistry.database.cursor()
@@ -4,11 +4,12 @@ from models.selected_tickers import SelectedTickers
 from repositories.base_repository import BaseRepository
 
 class SelectedTickersRepository(BaseRepository):
-    def __init__(self, path):
-        BaseRepository.__init__(self, path)
+    BUNDLE_TABLE = 'selected_tickers'
+    def __init__(self, path, bundle=None):
+        BaseRepository.__init__(self, path, bundle)
 
     def get_all(self):
-        query_result = self.conn.execute(f"SELECT * FROM read_csv_auto('{self.path}')").fetchall()
+        query_result = self.conn.execute(f"SELECT * FROM {self.source}").fetchall()
         result = [SelectedTickers(ticker=row[0]) for row in query_result]
         return result
     
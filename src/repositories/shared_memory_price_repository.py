@@ -0,0 +1,104 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+class SharedMemoryPriceRepository():
+    """
+    Daily prices for a ticker universe held in a single multiprocessing.shared_memory block, so that worker processes
+    attach to the same numpy columns without copying or unpickling them (memory use stays flat with the number of workers).
+    Block layout: date (datetime64[D]), open, high, low, close, volume (float64) columns, all tickers rows concatenated.
+    The creating process owns the block (see unlink), workers attach with the picklable `descriptor`.
+    Price data is exchanged as dictionaries of numpy columns (see PriceStoreRepository.load)
+    """
+    COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+    DTYPES = {'date': np.dtype('datetime64[D]'), 'open': np.dtype(np.float64), 'high': np.dtype(np.float64),
+              'low': np.dtype(np.float64), 'close': np.dtype(np.float64), 'volume': np.dtype(np.float64)}
+
+    def __init__(self, descriptor, shm: shared_memory.SharedMemory, owner=False):
+        self.descriptor = descriptor
+        self.shm = shm
+        self.owner = owner
+        total_rows = descriptor['total_rows']
+        self.columns = {}
+        offset = 0
+        for column in SharedMemoryPriceRepository.COLUMNS:
+            dtype = SharedMemoryPriceRepository.DTYPES[column]
+            self.columns[column] = np.frombuffer(shm.buf, dtype=dtype, count=total_rows, offset=offset)
+            offset += total_rows * dtype.itemsize
+
+    @staticmethod
+    def create(price_data) -> 'SharedMemoryPriceRepository':
+        """ Copies price data (ticker -> numpy columns) into a new shared memory block owned by the caller """
+        ranges = {}
+        total_rows = 0
+        for ticker, prices in price_data.items():
+            ranges[ticker] = (total_rows, total_rows + len(prices['date']))
+            total_rows += len(prices['date'])
+        size = sum([total_rows * dtype.itemsize for dtype in SharedMemoryPriceRepository.DTYPES.values()])
+        # zero size blocks are not supported
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        repository = SharedMemoryPriceRepository({'name': shm.name, 'tickers': ranges, 'total_rows': total_rows}, shm, owner=True)
+        for ticker, (start, end) in ranges.items():
+            for column in SharedMemoryPriceRepository.COLUMNS:
+                repository.columns[column][start:end] = price_data[ticker][column]
+        return repository
+
+    @staticmethod
+    def attach(descriptor) -> 'SharedMemoryPriceRepository':
+        """ Attaches to a block created by another process (zero-copy) """
+        return SharedMemoryPriceRepository(descriptor, shared_memory.SharedMemory(name=descriptor['name']))
+
+    def tickers(self):
+        return list(self.descriptor['tickers'].keys())
+
+    def load(self, tickers_list, from_date=None, to_date=None) -> dict:
+        """
+        Returns read-only views on the tickers prices (no copy), to be released or copied before close
+        Args:
+            from_date (datetime.date, optional): First date to load
+            to_date (datetime.date, optional): Date to stop loading at (excluded)
+        Returns:
+            dict: ticker -> {'date': datetime64[D] array, 'open', 'high', 'low', 'close', 'volume': float arrays}
+        """
+        missing_tickers = [ticker for ticker in tickers_list if ticker not in self.descriptor['tickers']]
+        if len(missing_tickers) > 0:
+            raise Exception(f"Missing tickers in shared memory prices {self.descriptor['name']}: {missing_tickers}")
+        price_data = {}
+        for ticker in tickers_list:
+            start, end = self.descriptor['tickers'][ticker]
+            dates = self.columns['date'][start:end]
+            if from_date is not None:
+                start += int(np.searchsorted(dates, np.datetime64(from_date, 'D')))
+            if to_date is not None:
+                end = self.descriptor['tickers'][ticker][0] + int(np.searchsorted(dates, np.datetime64(to_date, 'D')))
+            price_data[ticker] = {}
+            for column in SharedMemoryPriceRepository.COLUMNS:
+                view = self.columns[column][start:end]
+                view.flags.writeable = False
+                price_data[ticker][column] = view
+        return price_data
+
+    def close(self):
+        """
+        Releases this process mapping of the block
+        Raises:
+            BufferError: If views returned by load are still referenced (callers release or copy them before closing)
+        """
+        self.columns = {}
+        self.shm.close()
+
+    def unlink(self):
+        """ Frees the block, once all processes are done with it (owner only) """
+        if not self.owner:
+            raise Exception("Only the process which created the shared memory prices can unlink them")
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        try:
+            self.close()
+        finally:
+            if self.owner:
+                self.unlink()
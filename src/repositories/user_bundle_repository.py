@@ -0,0 +1,95 @@
+import os
+import tempfile
+import uuid
+
+import botocore
+import duckdb
+
+from repositories.base_repository import BaseRepository
+from repositories.resource_registry import ResourceRegistry
+
+class UserBundleRepository():
+    """
+    Packed copy of a user data (users.csv record, open_positions.csv, selected_tickers.csv and closed_positions.csv tables)
+    in a single DuckDB database file (users/{user}/bundle.duckdb), read with one GET into TEMP tables of one DuckDB connection.
+    Repositories given a bundle (see BaseRepository) read their table from it, falling back to their CSV file
+    when the bundle does not exist or does not hold their table.
+    The bundle is written next to the CSV files by `upload` (see create), so both are synced together.
+    """
+    FILE_NAME = 'bundle.duckdb'
+    USERS_TABLE = 'users'
+    # table -> CSV file in the user folder
+    CSV_TABLES = {'open_positions': 'open_positions.csv',
+                  'selected_tickers': 'selected_tickers.csv',
+                  'closed_positions': 'closed_positions.csv'}
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): bundle path (s3://.../users/{user}/bundle.duckdb or ./.../users/{user}/bundle.duckdb)
+        """
+        self.path = path
+        self.conn = ResourceRegistry.duckdb_connection()
+        self.tables = set()
+        if path.startswith("s3://"):
+            s3 = ResourceRegistry.s3_client()
+            with tempfile.NamedTemporaryFile(suffix='.duckdb', dir=BaseRepository.SPOOL_DIRECTORY) as spool:
+                try:
+                    s3.download_fileobj(path.split('/')[2], '/'.join(path.split('/')[3:]), spool)
+                except botocore.exceptions.ClientError as e:
+                    if e.response['Error']['Code'] in ['404', 'NoSuchKey']:
+                        return
+                    raise
+                spool.flush()
+                self.load(spool.name)
+        elif os.path.exists(path):
+            self.load(path)
+
+    def load(self, database_path):
+        """ Copies all tables of the bundle database file into TEMP tables of this connection """
+        # attached databases are visible to all connections of the shared database, hence a unique name
+        alias = f"bundle_{uuid.uuid4().hex}"
+        self.conn.execute(f"ATTACH '{database_path}' AS {alias} (READ_ONLY)")
+        tables = [row[0] for row in self.conn.execute(
+            "SELECT table_name FROM duckdb_tables() WHERE database_name = $1", [alias]).fetchall()]
+        for table in tables:
+            self.conn.execute(f"CREATE TEMP TABLE {table} AS SELECT * FROM {alias}.{table}")
+        self.conn.execute(f"DETACH {alias}")
+        self.tables = set(tables)
+
+    def exists(self):
+        return len(self.tables) > 0
+
+    def has_table(self, table):
+        return table in self.tables
+
+    @staticmethod
+    def create(user_directory, user_id, users_repository=None) -> str:
+        """
+        Writes {user_directory}/bundle.duckdb from the CSV files found in user_directory
+        Args:
+            users_repository (UserRepository, optional): users.csv, the user_id record of which is added to the bundle
+        Returns:
+            str: bundle path
+        """
+        path = os.path.join(user_directory, UserBundleRepository.FILE_NAME)
+        temp_path = path + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        conn = duckdb.connect(database=temp_path)
+        for table, file_name in UserBundleRepository.CSV_TABLES.items():
+            csv_path = os.path.join(user_directory, file_name)
+            if os.path.exists(csv_path):
+                conn.execute(f"CREATE TABLE {table} AS SELECT * FROM read_csv_auto('{csv_path}')")
+        if users_repository is not None:
+            # same column types as users.csv
+            columns = users_repository.conn.execute(f"DESCRIBE SELECT * FROM {users_repository.source}").fetchall()
+            conn.execute(f"CREATE TABLE {UserBundleRepository.USERS_TABLE} "
+                         f"({', '.join([f'{column[0]} {column[1]}' for column in columns])})")
+            rows = users_repository.conn.execute(f"SELECT * FROM {users_repository.source} WHERE id = $1", [user_id]).fetchall()
+            if len(rows) > 0:
+                conn.executemany(f"INSERT INTO {UserBundleRepository.USERS_TABLE} VALUES "
+                                 f"({', '.join(['?'] * len(columns))})", rows)
+        conn.close()
+        os.replace(temp_path, path)
+        return path
@@ -0,0 +1,21 @@
+from datetime import date
+from typing import Dict, Union
+from pydantic import BaseModel, Field
+
+class OptimisationResult(BaseModel):
+    strategy: str = Field(description='strategy name (e.g. bbrsi)')
+    params: Dict[str, Union[int, float]] = Field(description='strategy params used in this backtest')
+    params_hash: str = Field(description='hash of params, initial cash and price data (see OptimiserService.params_hash)')
+    tickers: str = Field(description='sorted tickers backtested as CSV (e.g. AAPL,AMZN)')
+    start_date: date
+    end_date: date
+    initial_cash: float
+    final_value: float = Field(description='portfolio value at end_date')
+    pnl: float = Field(description='absolute profit and loss')
+    pnl_pct: float = Field(description='percentage profit and loss')
+    num_trade_actions: int = Field(description='number of buy and sell actions')
+
+    def as_text(self):
+        params = ", ".join([f"{name}: {value}" for name, value in self.params.items()])
+        return (f"{self.strategy} ({params}) final_value: {self.final_value:.0f}, "
+                f"pnl: {self.pnl:.0f}, pnl_pct: {self.pnl_pct:.2f}%, trade_actions: {self.num_trade_actions}")
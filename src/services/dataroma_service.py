@@ -1,16 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+import json
 
-from bs4 import BeautifulSoup
-import pandas as pd
 import requests
+from repositories.file_repository import FileRepository
+from services.utils_service import today_as_str
 
-class DataromaService:
+class DataromaGridParser(HTMLParser):
+    """
+    Extracts the cells text of the Dataroma `grid` table in a single pass (same text as BeautifulSoup get_text(strip=True)),
+    without building a document tree
+    """
     def __init__(self):
-        self.symbol_quarter_buys_dict = self.web_scrape(url="https://www.dataroma.com/m/g/portfolio_b.php?q=q&o=c", 
-                               num_columns=9, column_label="Buys▼")
-        self.symbol_6months_buys_dict = self.web_scrape(url="https://www.dataroma.com/m/g/portfolio_b.php?q=h&o=c", 
-                               num_columns=9, column_label="Buys▼")
-        self.symbol_ownership_dict = self.web_scrape(url="https://www.dataroma.com/m/g/portfolio.php?pct=0&o=c", 
-                               num_columns=10, column_label="Ownershipcount▼")
+        super().__init__(convert_charrefs=True)
+        self.table_depth = 0
+        self.in_tbody = False
+        self.cell = None
+        self.header_cells = []
+        self.row = None
+        self.rows = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if self.table_depth > 0 or ('id', 'grid') in attrs:
+                self.table_depth += 1
+        elif self.table_depth == 1:
+            if tag == 'tbody':
+                self.in_tbody = True
+            elif tag == 'tr' and self.in_tbody:
+                self.row = []
+            elif tag == 'td':
+                self.cell = []
+
+    def handle_endtag(self, tag):
+        if self.table_depth == 0:
+            return
+        if tag == 'table':
+            self.table_depth -= 1
+        elif self.table_depth == 1:
+            if tag == 'td' and self.cell is not None:
+                text = "".join(self.cell)
+                if self.row is not None:
+                    self.row.append(text)
+                elif not self.in_tbody:
+                    self.header_cells.append(text)
+                self.cell = None
+            elif tag == 'tr' and self.row is not None:
+                self.rows.append(self.row)
+                self.row = None
+            elif tag == 'tbody':
+                self.in_tbody = False
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            stripped = data.strip()
+            if stripped:
+                self.cell.append(stripped)
+
+class DataromaService:
+    # page name -> url, number of columns and column holding the value of each symbol
+    PAGES = {
+        'quarter_buys': ("https://www.dataroma.com/m/g/portfolio_b.php?q=q&o=c", 9, "Buys▼"),
+        '6months_buys': ("https://www.dataroma.com/m/g/portfolio_b.php?q=h&o=c", 9, "Buys▼"),
+        'ownership': ("https://www.dataroma.com/m/g/portfolio.php?pct=0&o=c", 10, "Ownershipcount▼"),
+    }
+    def __init__(self, path=None, today_date_str=None):
+        """
+        Hedge fund buys and ownership counts scraped from Dataroma, at most once a day.
+
+        Args:
+            path (str, optional): snapshot cache file (s3://.../myfile.json or ./.../myfile.json), shared by all runs of the day.
+                In memory only when not supplied
+            today_date_str (str): The date string for today (for testing only).
+
+        Pages not fetched today are fetched concurrently, conditionally to their ETag/Last-Modified when cached
+        (an unmodified page is not downloaded again). A page failing to download keeps its cached snapshot, or has no data
+        (and is not cached) when there is none.
+        Cache structure is as follows (see save_cache):\n
+        .. code-block:: json
+            {
+                "quarter_buys": {
+                    "fetched_date": "2025-01-02",
+                    "etag": "\\"5f1c-62a1\\"",
+                    "last_modified": "Thu, 02 Jan 2025 04:00:00 GMT",
+                    "symbols": {"AMZN": "12", "BRK.B": "3"}
+                }
+            }
+        """
+        self.today_date_str = today_as_str() if today_date_str is None else today_date_str
+        self.file_repository = FileRepository(path) if path is not None else None
+        self.cache = self.load_cache() if self.file_repository is not None else {}
+        # response validators of pages downloaded by web_scrape, by url
+        self.validators = {}
+        self.refresh()
+        self.symbol_quarter_buys_dict = self.cache.get('quarter_buys', {}).get('symbols', {})
+        self.symbol_6months_buys_dict = self.cache.get('6months_buys', {}).get('symbols', {})
+        self.symbol_ownership_dict = self.cache.get('ownership', {}).get('symbols', {})
+
+    def load_cache(self) -> dict:
+        data_as_str = self.file_repository.load()
+        if data_as_str is None:
+            data_as_str = "{}"
+        return json.loads(data_as_str)
+
+    def save_cache(self):
+        """ Saves the pages snapshot, should be called once all reports using this service are built """
+        if self.file_repository is not None:
+            self.file_repository.save(json.dumps(self.cache, indent=4))
+
+    def refresh(self):
+        """ Fetches pages not fetched today concurrently, a page failing to download keeps its snapshot (if any) """
+        stale_pages = [name for name in DataromaService.PAGES if self.cache.get(name, {}).get('fetched_date') != self.today_date_str]
+        if len(stale_pages) == 0:
+            return
+        with ThreadPoolExecutor(max_workers=len(stale_pages)) as executor:
+            futures = {name: executor.submit(self.web_scrape, *DataromaService.PAGES[name]) for name in stale_pages}
+            for name, future in futures.items():
+                try:
+                    symbols = future.result()
+                except Exception as e:
+                    print(f"Failed to download Dataroma {name}: {e}")
+                    symbols = {}
+                # an empty page is not cached, so that the next run fetches it again
+                if len(symbols) == 0:
+                    if name in self.cache:
+                        print(f"Failed to refresh Dataroma {name}, using snapshot from {self.cache[name]['fetched_date']}")
+                    else:
+                        print(f"Failed to refresh Dataroma {name}, no snapshot available")
+                    continue
+                url = DataromaService.PAGES[name][0]
+                self.cache[name] = {'fetched_date': self.today_date_str, **self.validators.get(url, {}), 'symbols': symbols}
 
     def num_quarter_buys_by_ticker(self, ticker):
         # Dataroma uses '.' (e.g. BRK.B) notation instead of '-' (BRK-B)
@@ -19,7 +138,7 @@ class DataromaService:
             return int(self.symbol_quarter_buys_dict[ticker])
         else:
             return 0
-        
+
     def num_6month_buys_by_ticker(self, ticker):
         # Dataroma uses '.' (e.g. BRK.B) notation instead of '-' (BRK-B)
         ticker = ticker.replace('-', '.')
@@ -27,7 +146,7 @@ class DataromaService:
             return int(self.symbol_6months_buys_dict[ticker])
         else:
             return 0
-        
+
     def num_owners_by_ticker(self, ticker):
         ticker = ticker.replace('-', '.')
         if ticker in self.symbol_ownership_dict:
@@ -35,6 +154,23 @@ class DataromaService:
         else:
             return 0
 
+    def cached_page(self, url) -> dict:
+        for name, (page_url, _, _) in DataromaService.PAGES.items():
+            if page_url == url and name in self.cache:
+                return self.cache[name]
+        return None
+
+    @staticmethod
+    def parse_grid(html_content, num_columns, column_label) -> dict:
+        """ Returns the Symbol to column_label value dictionary of the page `grid` table """
+        parser = DataromaGridParser()
+        parser.feed(html_content)
+        parser.close()
+        headers = parser.header_cells[:num_columns]
+        symbol_index = headers.index('Symbol')
+        value_index = headers.index(column_label)
+        return {row[symbol_index]: row[value_index] for row in parser.rows if len(row) > max(symbol_index, value_index)}
+
     def web_scrape(self, url, num_columns, column_label):
         # Custom headers
         headers = {
@@ -45,26 +181,22 @@ class DataromaService:
             "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1"
         }
+        # Conditional request, when the page was already downloaded
+        cached_page = self.cached_page(url)
+        if cached_page is not None:
+            if cached_page.get('etag'):
+                headers["If-None-Match"] = cached_page['etag']
+            if cached_page.get('last_modified'):
+                headers["If-Modified-Since"] = cached_page['last_modified']
 
         # Make the request
         response = requests.get(url, headers=headers)
         # Check for successful response
-        if response.status_code == 200:
-            html_content = response.text
-            # Parse the HTML
-            soup = BeautifulSoup(html_content, "html.parser")
-            table = soup.find("table", {"id": "grid"})
-            # Extract headers
-            headers = [header.get_text(strip=True) for header in table.find_all("td")][:num_columns]
-            # Extract rows
-            rows = []
-            for row in table.find("tbody").find_all("tr"):
-                cells = [cell.get_text(strip=True) for cell in row.find_all("td")]
-                rows.append(cells)
-            # Create a DataFrame
-            df = pd.DataFrame(rows, columns=headers)
-            #print(df)
-            # Create Symbol to value dictionary
-            return df.set_index('Symbol')[column_label].to_dict()
+        if response.status_code == 304 and cached_page is not None:
+            self.validators[url] = {'etag': cached_page.get('etag'), 'last_modified': cached_page.get('last_modified')}
+            return cached_page['symbols']
+        elif response.status_code == 200:
+            self.validators[url] = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+            return DataromaService.parse_grid(response.text, num_columns, column_label)
         else:
-            return {}
\ No newline at end of file
+            return {}
@@ -1,10 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import datetime
 import json
 import os
-from typing import Dict
+import threading
+from typing import Dict, Iterable
 
 import requests
+from repositories.exchange_rate_store_repository import ExchangeRateStoreRepository
 from repositories.file_repository import FileRepository
 from services.utils_service import date_as_str, date_str_diff_in_days, todays_date, today_as_str
 
@@ -16,6 +19,13 @@ class ExchangeRateCacheEntry:
     rates: Dict[str, float]
 
 class ExchangeRateService:
+    OPEN_EXCHANGE_API_URL = "https://openexchangerates.org/api"
+    # historical rates fetched concurrently by prefetch_rates
+    MAX_CONCURRENT_REQUESTS = 4
+    # longest span (in days) between the start and end dates of a single time-series request
+    TIME_SERIES_MAX_DAYS = 31
+    # time-series responses of plans without access to the endpoint (other errors are raised)
+    TIME_SERIES_NOT_ALLOWED_STATUSES = [403]
     WILCARD_DATE_STUB_EXAMPLE = { '*': {'rates': {'USD': 1.01, 'CHF': 1.02}} }
     MULTI_DATE_STUB_EXAMPLE = {
         '2025-01-01': {'rates': {'USD': 1.01, 'CHF': 1.02}},
@@ -25,7 +35,9 @@ class ExchangeRateService:
                  base_currency='EUR', 
                  stub=None,
                  path=None, 
-                 today_date_str=None # for testing only
+                 today_date_str=None, # for testing only
+                 time_series=False,
+                 store: ExchangeRateStoreRepository = None
                  ):
         """
         ExchangeRateService uses Open Exchange Rates API to fetch exchange rates.
@@ -37,6 +49,10 @@ class ExchangeRateService:
             stub (dict): Supplies data for testing. see `WILCARD_DATE_STUB_EXAMPLE` and `MULTI_DATE_STUB_EXAMPLE`
             path (str): The path to the cache file for exchange rates. (s3://.../myfile.json or ./.../myfile.json)
             today_date_str (str): The date string for today (for testing only).
+            time_series (bool): prefetch_rates uses the time-series endpoint (depends on the openexchangerates.org plan, see
+                OPEN_EXCHANGE_TIME_SERIES), falling back to concurrent historical requests when the plan does not allow it
+            store (ExchangeRateStoreRepository): rate store used instead of the cache file (path), rates are loaded from it
+                when first read and only newly fetched dates are appended to it (see save_exchange_rate_cache)
            
         ExchangeRateService uses the https://docs.openexchangerates.org/reference/latest-json endpoint to get the latest exchange rates.\n
         Given changing base currency (default is USD) requires additional licensing, this class uses USD base currency.\n
@@ -65,16 +81,25 @@ class ExchangeRateService:
         self.base = base_currency
         self.today_date_str = today_as_str() if today_date_str is None else today_date_str
         self.stub = stub
+        self.time_series = time_series
+        self.api_url = os.environ.get('OPEN_EXCHANGE_API_URL', ExchangeRateService.OPEN_EXCHANGE_API_URL)
+        self.store = store
+        # the service may be shared by concurrent reports (see MultiUserTradeTodayService)
+        self.lock = threading.RLock()
         if stub is None:
             # Ensure path is provided
-            if path is None:
+            if path is None and store is None:
                 raise Exception(f"Missing path for exchange rate cache")
             # store APP_ID
             self.app_id = os.environ.get('OPEN_EXCHANGE_APP_ID', None)
             if self.app_id is None:
                 raise Exception(f"Missing environment variable OPEN_EXCHANGE_APP_ID") 
-            self.file_repository = FileRepository(path)
-            self.cache = self.load_exchange_rate_cache()
+            if store is None:
+                self.file_repository = FileRepository(path)
+                self.cache = self.load_exchange_rate_cache()
+            else:
+                # filled from the store as dates are read
+                self.cache = {}
         else:
             # Check for wildcard date stub 
             self.stub_has_wildcard_date = '*' in stub
@@ -106,21 +131,17 @@ class ExchangeRateService:
             date = todays_date()
         date_str = date_as_str(date)
         if self.stub is None:
-            if date_str not in self.cache:
-                url = f"https://openexchangerates.org/api/historical/{date_str}.json?app_id={self.app_id}"
-                response = requests.get(url)
-                if response.status_code == 200:
-                    rates = response.json().get('rates', None)
+            with self.lock:
+                self.load_stored_rates([date_str])
+                if date_str not in self.cache:
                     self.cache[date_str] = ExchangeRateCacheEntry(
                         last_read_date=self.today_date_str,
                         read_count=1,
-                        rates=rates
+                        rates=self.fetch_historical_rates(date_str)
                     )
                 else:
-                    raise Exception(f"ERROR: ({response.status_code}) fetching data from openexchangerates.org")
-            else:
-                self.cache[date_str].read_count += 1
-                self.cache[date_str].last_read_date = self.today_date_str
+                    self.cache[date_str].read_count += 1
+                    self.cache[date_str].last_read_date = self.today_date_str
             # Supports only EUR as base currency
             if self.base == 'EUR':
                 if from_currency == 'USD':
@@ -140,6 +161,82 @@ class ExchangeRateService:
             else:
                 raise Exception(f"Date {date_str} not found in found for in stub: {self.stub}")
             
+    def fetch_historical_rates(self, date_str) -> Dict[str, float]:
+        url = f"{self.api_url}/historical/{date_str}.json?app_id={self.app_id}"
+        response = requests.get(url)
+        if response.status_code == 200:
+            return response.json().get('rates', None)
+        else:
+            raise Exception(f"ERROR: ({response.status_code}) fetching data from openexchangerates.org")
+
+    def fetch_time_series_rates(self, start_date_str, end_date_str) -> Dict[str, Dict[str, float]]:
+        """
+        Returns rates by date from start_date_str to end_date_str (included), None if the plan does not support it
+        Raises:
+            Exception: If the request failed for another reason (e.g. rate limited or server error)
+        """
+        url = f"{self.api_url}/time-series.json?app_id={self.app_id}&start={start_date_str}&end={end_date_str}"
+        response = requests.get(url)
+        if response.status_code == 200:
+            return response.json().get('rates', {})
+        elif response.status_code in ExchangeRateService.TIME_SERIES_NOT_ALLOWED_STATUSES:
+            print(f"Time-series rates not available ({response.status_code}), using historical rates")
+            return None
+        else:
+            raise Exception(f"ERROR: ({response.status_code}) fetching time-series data from openexchangerates.org")
+
+    def prefetch_rates(self, dates: Iterable[datetime.date]):
+        """
+        Fetches the rates of all dates missing from the cache in one pass (e.g. all dates needed by a tax calculation),
+        so that get_rate does not make one blocking call per date.
+        Uses a time-series request per TIME_SERIES_MAX_DAYS range of dates when enabled (see time_series),
+        otherwise up to MAX_CONCURRENT_REQUESTS concurrent historical requests.
+        The cache is saved by save_exchange_rate_cache, as for get_rate.
+
+        Args:
+            dates (Iterable[datetime.date]): dates (future dates are read as today, see get_rate)
+        """
+        if self.stub is not None:
+            return
+        # concurrent callers wait for the rates being fetched rather than fetching them again
+        with self.lock:
+            self._prefetch_rates(sorted(set([date_as_str(min(date, todays_date())) for date in dates])))
+
+    def _prefetch_rates(self, dates_str):
+        self.load_stored_rates(dates_str)
+        missing_dates_str = [date_str for date_str in dates_str if date_str not in self.cache]
+        if len(missing_dates_str) == 0:
+            return
+        print(f"Fetching exchange rates for {len(missing_dates_str)} dates ({len(dates_str) - len(missing_dates_str)} cached)")
+        fetched_rates = {}
+        if self.time_series:
+            ranges = []
+            for date_str in missing_dates_str:
+                if len(ranges) > 0 and date_str_diff_in_days(date_str, ranges[-1][0]) <= ExchangeRateService.TIME_SERIES_MAX_DAYS:
+                    ranges[-1][1] = date_str
+                else:
+                    ranges.append([date_str, date_str])
+            for start_date_str, end_date_str in ranges:
+                rates_by_date = self.fetch_time_series_rates(start_date_str, end_date_str)
+                if rates_by_date is None:
+                    break
+                fetched_rates.update({date_str: rates for date_str, rates in rates_by_date.items() if date_str in missing_dates_str})
+        remaining_dates_str = [date_str for date_str in missing_dates_str if date_str not in fetched_rates]
+        if len(remaining_dates_str) > 0:
+            with ThreadPoolExecutor(max_workers=ExchangeRateService.MAX_CONCURRENT_REQUESTS) as executor:
+                fetched_rates.update(zip(remaining_dates_str, executor.map(self.fetch_historical_rates, remaining_dates_str)))
+        for date_str, rates in fetched_rates.items():
+            # read_count is incremented by get_rate
+            self.cache[date_str] = ExchangeRateCacheEntry(last_read_date=self.today_date_str, read_count=0, rates=rates)
+
+    def load_stored_rates(self, dates_str):
+        """ Adds the rates of dates_str found in the store to the cache (single store query) """
+        if self.store is None:
+            return
+        dates_to_load = [date_str for date_str in dates_str if date_str not in self.cache]
+        for date_str, rates in self.store.load(dates_to_load).items():
+            self.cache[date_str] = ExchangeRateCacheEntry(last_read_date=self.today_date_str, read_count=0, rates=rates)
+
     def set_path(self, path):
         """
         Used for testing only. Sets the path for the file repository.
@@ -166,8 +263,14 @@ class ExchangeRateService:
         Saves the exchange rate cache to the file.\n
         Updates the cache file with the current state of the cache.\n
         Removes stale cache entries (not used in the last 10 days).\n
+        With a rate store, appends the dates fetched by this service instead (except today's, which are not final yet),
+        then compacts the store when due (see ExchangeRateStoreRepository.compact).\n
         Should be called after when application have completed all its currency conversion tasks and is about to exit.\n
         """
+        if self.store is not None:
+            self.store.append({date: entry.rates for date, entry in self.cache.items() if date < self.today_date_str})
+            self.store.compact()
+            return
         cache_data = {
             date: entry.__dict__ 
             for date, entry in self.cache.items() 
@@ -0,0 +1,196 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import talib
+
+# Indicator settings shared with BaseStrategy (see BaseStrategy.__init__)
+RSI_PERIOD = 14
+RSI_MA_PERIOD = 14
+BB_PERIOD = 20
+BB_DEVFACTOR = 2
+# Number of bars backtrader needs before calling BaseStrategy.next (RSI + SMMA of RSI)
+MIN_PERIOD = RSI_PERIOD + RSI_MA_PERIOD
+# Bars of indicator values kept by IndicatorState (trade-today evaluates the last couple of weeks)
+INDICATOR_STATE_TAIL_SIZE = 60
+INDICATOR_NAMES = ['rsi', 'rsi_ma', 'bb_top', 'bb_mid', 'bb_bot']
+
+
+def rsi(close: np.ndarray, period=RSI_PERIOD) -> np.ndarray:
+    """Wilder RSI, equivalent to bt.indicators.RSI (NaN until `period` + 1 bars are available)"""
+    return talib.RSI(np.asarray(close, dtype=np.float64), timeperiod=period)
+
+
+def smma(values: np.ndarray, period=RSI_MA_PERIOD) -> np.ndarray:
+    """
+    Smoothed moving average, equivalent to bt.indicators.SmoothedMovingAverage.
+    Seeded with the simple average of the first `period` valid values, then smoothed with alpha = 1 / period.
+    Leading NaN values (e.g. RSI warmup) are skipped.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    output = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) < period:
+        return output
+    first = valid[0]
+    seed_index = first + period - 1
+    output[seed_index] = values[first:seed_index + 1].mean()
+    previous = output[seed_index]
+    for i in range(seed_index + 1, len(values)):
+        previous = previous + (values[i] - previous) / period
+        output[i] = previous
+    return output
+
+
+def bollinger_bands(close: np.ndarray, period=BB_PERIOD, devfactor=BB_DEVFACTOR):
+    """Bollinger bands (top, mid, bot), equivalent to bt.indicators.BollingerBands"""
+    return talib.BBANDS(np.asarray(close, dtype=np.float64),
+                        timeperiod=period, nbdevup=devfactor, nbdevdn=devfactor, matype=talib.MA_Type.SMA)
+
+
+def compute_indicators(close: np.ndarray) -> dict:
+    """
+    Computes all BaseStrategy indicators for a single ticker close column.
+    Returns a dictionary of arrays aligned with `close` (rsi, rsi_ma, bb_top, bb_mid, bb_bot)
+    """
+    rsi_values = rsi(close)
+    bb_top, bb_mid, bb_bot = bollinger_bands(close)
+    return {
+        'rsi': rsi_values,
+        'rsi_ma': smma(rsi_values),
+        'bb_top': bb_top,
+        'bb_mid': bb_mid,
+        'bb_bot': bb_bot,
+    }
+
+
+@dataclass
+class IndicatorState:
+    """
+    compute_indicators values as of last_date, advanced bar by bar (see advance_indicator_state) instead of replaying the warmup:
+    Wilder RSI average gain/loss, SMMA of RSI and the last BB_PERIOD closes (Bollinger mean/variance window).
+    tail holds the indicator values of the last bars (tail_dates, at most INDICATOR_STATE_TAIL_SIZE).
+    """
+    first_date: str
+    last_date: str
+    last_close: float
+    avg_gain: float
+    avg_loss: float
+    rsi_ma: float
+    window: List[float]
+    tail_dates: List[str]
+    tail: Dict[str, List[float]]
+
+
+def rsi_from_averages(avg_gain, avg_loss) -> float:
+    """RSI from Wilder average gain/loss (0 when prices did not move, as per talib)"""
+    total = avg_gain + avg_loss
+    return 100 * avg_gain / total if total != 0 else 0.0
+
+
+def wilder_averages(close: np.ndarray, period=RSI_PERIOD):
+    """Returns the Wilder average gain and loss as of the last bar (as smoothed by talib.RSI), None when bars are missing"""
+    changes = np.diff(np.asarray(close, dtype=np.float64))
+    if len(changes) < period:
+        return None
+    gains = np.maximum(changes, 0)
+    losses = np.maximum(-changes, 0)
+    avg_gain = gains[:period].mean()
+    avg_loss = losses[:period].mean()
+    for i in range(period, len(changes)):
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+    return avg_gain, avg_loss
+
+
+def indicator_state(dates: np.ndarray, close: np.ndarray, indicators: dict = None) -> IndicatorState:
+    """
+    Builds the IndicatorState of a full replay over close (indicators as returned by compute_indicators when already computed).
+    Returns None when there are not enough bars for all indicators to be available on the last bar.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    indicators = compute_indicators(close) if indicators is None else indicators
+    averages = wilder_averages(close)
+    if averages is None or len(close) < BB_PERIOD or any([np.isnan(indicators[name][-1]) for name in INDICATOR_NAMES]):
+        return None
+    tail_start = max(0, len(dates) - INDICATOR_STATE_TAIL_SIZE)
+    return IndicatorState(first_date=str(dates[0]),
+                          last_date=str(dates[-1]),
+                          last_close=float(close[-1]),
+                          avg_gain=float(averages[0]),
+                          avg_loss=float(averages[1]),
+                          rsi_ma=float(indicators['rsi_ma'][-1]),
+                          window=[float(value) for value in close[-BB_PERIOD:]],
+                          tail_dates=[str(date) for date in dates[tail_start:]],
+                          tail={name: [float(value) for value in indicators[name][tail_start:]] for name in INDICATOR_NAMES})
+
+
+def advance_indicator_state(state: IndicatorState, dates: np.ndarray, close: np.ndarray) -> IndicatorState:
+    """Advances the state over new bars (dates after state.last_date), in constant time per bar"""
+    for date, value in zip(dates, np.asarray(close, dtype=np.float64)):
+        change = value - state.last_close
+        state.avg_gain = (state.avg_gain * (RSI_PERIOD - 1) + max(change, 0)) / RSI_PERIOD
+        state.avg_loss = (state.avg_loss * (RSI_PERIOD - 1) + max(-change, 0)) / RSI_PERIOD
+        rsi_value = rsi_from_averages(state.avg_gain, state.avg_loss)
+        state.rsi_ma = state.rsi_ma + (rsi_value - state.rsi_ma) / RSI_MA_PERIOD
+        state.window = state.window[1:] + [float(value)]
+        window = np.asarray(state.window)
+        mean = window.mean()
+        # population standard deviation, as per talib.BBANDS
+        deviation = np.sqrt(max((window * window).mean() - mean * mean, 0))
+        state.last_date = str(date)
+        state.last_close = float(value)
+        state.tail_dates = (state.tail_dates + [state.last_date])[-INDICATOR_STATE_TAIL_SIZE:]
+        for name, indicator_value in [('rsi', rsi_value), ('rsi_ma', state.rsi_ma), ('bb_top', mean + BB_DEVFACTOR * deviation),
+                                      ('bb_mid', mean), ('bb_bot', mean - BB_DEVFACTOR * deviation)]:
+            state.tail[name] = (state.tail[name] + [float(indicator_value)])[-INDICATOR_STATE_TAIL_SIZE:]
+    return state
+
+
+def indicators_from_state(state: IndicatorState, dates: np.ndarray) -> dict:
+    """Returns the state tail values aligned with dates (see compute_indicators), NaN for dates outside the tail"""
+    positions = {date: i for i, date in enumerate(state.tail_dates)}
+    indices = [(i, positions[str(date)]) for i, date in enumerate(dates) if str(date) in positions]
+    indicators = {}
+    for name in INDICATOR_NAMES:
+        values = np.full(len(dates), np.nan)
+        for i, tail_index in indices:
+            values[i] = state.tail[name][tail_index]
+        indicators[name] = values
+    return indicators
+
+
+def indicator_table(dates: np.ndarray, close: np.ndarray) -> dict:
+    """
+    Daily indicators of a ticker full price history, as materialised by YfinanceDataService.materialise_indicators
+    (see IndicatorStoreRepository), along with the close they were computed from, the RSI crossover flag
+    and the first bar the indicators were seeded from (seed_date)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    dates = np.asarray(dates).astype('datetime64[D]')
+    indicators = compute_indicators(close)
+    rsi_crossover_signal = np.zeros(len(close), dtype=bool)
+    # rsi crossing above its moving average, as per BaseStrategy.next (NaN comparisons are False)
+    rsi_crossover_signal[1:] = (indicators['rsi'][1:] > indicators['rsi_ma'][1:]) & (indicators['rsi'][:-1] < indicators['rsi_ma'][:-1])
+    return {'date': dates, 'close': close, **indicators, 'rsi_crossover_signal': rsi_crossover_signal,
+            'seed_date': dates[0] if len(dates) > 0 else None}
+
+
+def indicators_from_store(stored: dict, dates: np.ndarray, close: np.ndarray) -> dict:
+    """
+    Returns the stored indicators (see indicator_table) aligned with dates (see compute_indicators),
+    or None when some dates are not stored or were stored with a different close (revised prices).
+    The Wilder RSI and SMMA recursions depend on their first bar, so stored indicators are only returned when dates start
+    at the bar they were seeded from (the same values as compute_indicators over the dates close)
+    """
+    if stored is None or len(stored['date']) == 0 or len(dates) == 0:
+        return None
+    dates = np.asarray(dates).astype('datetime64[D]')
+    if stored['seed_date'] != dates[0]:
+        return None
+    positions = np.minimum(np.searchsorted(stored['date'], dates), len(stored['date']) - 1)
+    if not np.array_equal(stored['date'][positions], dates):
+        return None
+    if not np.allclose(stored['close'][positions], np.asarray(close, dtype=np.float64), rtol=0, atol=1e-9):
+        return None
+    return {name: stored[name][positions] for name in INDICATOR_NAMES}
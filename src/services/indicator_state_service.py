@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+
+from repositories.file_repository import FileRepository
+from services.indicator_service import IndicatorState, advance_indicator_state, compute_indicators, indicator_state, indicators_from_state
+
+class IndicatorStateService():
+    FILE_NAME = 'indicator_state.json'
+    def __init__(self, path):
+        """
+        Persisted indicator states (see IndicatorState), so daily trade-today runs advance indicators by the new bars only
+        instead of replaying the whole warmup.
+
+        Args:
+            path (str): folder of the states, one {path}/ticker={TICKER}/indicator_state.json file per ticker
+                (the price store folder, so states are kept next to the prices they were computed from)
+
+        A state is only used when the prices it was computed from are unchanged (same dates and last close)
+        and its tail covers the bars evaluated by the strategy, otherwise indicators are replayed and the state is rebuilt.
+        RSI and its SMMA are recursive, so values advanced from a state are seeded by the first replay rather than by
+        the current warmup window: they can differ from a replay (e.g. the `backtrader` engine) by about a tenth of an RSI point,
+        converging towards the values of the whole price history.
+        """
+        self.path = path
+        # bars advanced and tickers replayed (for monitoring and testing)
+        self.num_advanced_bars = 0
+        self.num_replays = 0
+
+    def state_path(self, ticker):
+        return os.path.join(self.path, f"ticker={ticker}", IndicatorStateService.FILE_NAME)
+
+    def load_state(self, ticker) -> IndicatorState:
+        data_as_str = FileRepository(self.state_path(ticker)).load()
+        if data_as_str is None:
+            return None
+        return IndicatorState(**json.loads(data_as_str))
+
+    def save_state(self, ticker, state: IndicatorState):
+        os.makedirs(os.path.dirname(self.state_path(ticker)), exist_ok=True)
+        FileRepository(self.state_path(ticker)).save(json.dumps(state.__dict__))
+
+    @staticmethod
+    def is_usable(state: IndicatorState, dates, close, from_date) -> bool:
+        """ Checks the state was computed from the same prices and that its tail covers the bars from from_date """
+        if state.last_date not in set([str(date) for date in dates]):
+            return False
+        last_index = int(np.searchsorted(dates, np.datetime64(state.last_date, 'D')))
+        if abs(close[last_index] - state.last_close) > 1e-9:
+            return False
+        tail_start = np.datetime64(state.tail_dates[0], 'D')
+        if np.datetime64(from_date, 'D') < tail_start:
+            return False
+        # same bars (no missing or revised dates) within the tail
+        start = int(np.searchsorted(dates, tail_start))
+        return [str(date) for date in dates[start:last_index + 1]] == state.tail_dates
+
+    def indicators(self, ticker, price_data, from_date) -> dict:
+        """
+        Returns the ticker indicators (see compute_indicators), advancing its persisted state by the new bars when usable
+        Args:
+            price_data (dict): ticker price columns (see PriceStoreRepository.load)
+            from_date (numpy.datetime64): first bar the caller reads indicators of (earlier bars may be NaN)
+        """
+        dates = price_data['date']
+        close = price_data['close']
+        state = self.load_state(ticker) if len(dates) > 0 else None
+        if state is not None and IndicatorStateService.is_usable(state, dates, close, from_date):
+            last_index = int(np.searchsorted(dates, np.datetime64(state.last_date, 'D')))
+            if last_index < len(dates) - 1:
+                state = advance_indicator_state(state, dates[last_index + 1:], close[last_index + 1:])
+                self.num_advanced_bars += len(dates) - 1 - last_index
+                self.save_state(ticker, state)
+            # unless too many bars were advanced for the tail to cover from_date
+            if np.datetime64(from_date, 'D') >= np.datetime64(state.tail_dates[0], 'D'):
+                return indicators_from_state(state, dates)
+        self.num_replays += 1
+        indicators = compute_indicators(close)
+        new_state = indicator_state(dates, close, indicators) if len(dates) > 0 else None
+        # states are not rewound by replays over past windows (e.g. --today in the past)
+        if new_state is not None and (state is None or new_state.last_date >= state.last_date):
+            self.save_state(ticker, new_state)
+        return indicators
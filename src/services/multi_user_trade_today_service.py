@@ -0,0 +1,163 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from repositories.closed_position_repository import ClosedPositionRepository
+from repositories.open_position_repository import OpenPositionRepository
+from repositories.price_store_repository import PriceStoreRepository
+from repositories.selected_tickers_repository import SelectedTickersRepository
+from repositories.user_bundle_repository import UserBundleRepository
+from repositories.user_repository import UserRepository
+from services.dataroma_service import DataromaService
+from services.exchange_rate_service import ExchangeRateService
+from services.indicator_state_service import IndicatorStateService
+from services.runtime_stock_stats_service import RuntimeStockStatsService
+from services.stock_compute_service import StockComputeService
+from services.tax_calculator_service import TaxCalculatorService
+from services.trade_today_reporting_service import TradeTodayReportingService
+from services.yfinance_data_service import YfinanceDataService
+
+class MultiUserTradeTodayService:
+    """
+    Runs trade-today for several users in a single process (see trade-today-all):
+    prices for the union of all users tickers (selected tickers and open positions) are loaded once,
+    each user strategy runs over its own window of those prices (sharing indicators with the `vectorized` engine),
+    and per user reports are rendered and sent concurrently.
+    """
+    def __init__(self, today: str, users=None, no_pos=False, rapid=False, engine='vectorized',
+                 exchange_rate_service: ExchangeRateService = None, price_store: PriceStoreRepository = None, max_workers=4,
+                 fundamentals_cache_path=None, dataroma_cache_path=None, indicator_state_path=None):
+        """
+        Args:
+            today (str): today's date in yyyy-mm-dd format
+            users (list, optional): user ids to run for, defaults to all users (except UserRepository.EXCLUDED_USER_IDS)
+            price_store (PriceStoreRepository, optional): see StockComputeService.load_price_data
+            max_workers (int): users reported concurrently
+            fundamentals_cache_path (str, optional): see RuntimeStockStatsService path (fundamentals are fetched once for all users)
+            dataroma_cache_path (str, optional): see DataromaService path (hedge fund data is scraped once for all users)
+            indicator_state_path (str, optional): folder of the indicator states advanced by the `vectorized` engine
+                instead of replaying the warmup (see IndicatorStateService), e.g. the price store folder
+        """
+        self.s3_prefix = os.environ.get('TRADE_ADVISOR_S3_BUCKET', None)
+        if self.s3_prefix is None:
+            raise Exception("TRADE_ADVISOR_S3_BUCKET environment variable not set")
+        self.today = today
+        self.users = users
+        self.no_pos = no_pos
+        self.rapid = rapid
+        self.engine = engine
+        self.exchange_rate_service = exchange_rate_service
+        self.price_store = price_store
+        self.max_workers = max_workers
+        self.fundamentals_cache_path = fundamentals_cache_path
+        self.dataroma_cache_path = dataroma_cache_path
+        self.indicator_state_path = indicator_state_path
+        # set by run (fundamentals only when not rapid), the caller saves their caches once done
+        self.dataroma_service = None
+        self.runtime_stock_stats_service = None
+
+    def load_user_data(self, user_info) -> dict:
+        """ Returns the user email, tickers (selected tickers followed by open position tickers), open and closed positions """
+        user_path = f"{self.s3_prefix}/users/{user_info.id}"
+        # single GET when the user data was uploaded with its bundle, one GET per CSV file otherwise
+        bundle = UserBundleRepository(f"{user_path}/{UserBundleRepository.FILE_NAME}")
+        open_positions = [] if self.no_pos else OpenPositionRepository(f"{user_path}/open_positions.csv", bundle).get_all()
+        selected_tickers = SelectedTickersRepository(f"{user_path}/selected_tickers.csv", bundle).get_all_as_list()
+        tickers = list(dict.fromkeys(selected_tickers + [position.ticker for position in open_positions]))
+        return {'user': user_info.id,
+                'email': user_info.email,
+                'tickers': ",".join(tickers),
+                'open_positions': open_positions,
+                'closed_positions': ClosedPositionRepository(f"{user_path}/closed_positions.csv", bundle).get_all()}
+
+    def get_users(self) -> list:
+        all_users = UserRepository(f"{self.s3_prefix}/users/users.csv").get_all()
+        if self.users is None:
+            return [user for user in all_users if user.id not in UserRepository.EXCLUDED_USER_IDS]
+        users = [user for user in all_users if user.id in self.users]
+        missing_users = [user for user in self.users if user not in [u.id for u in users]]
+        if len(missing_users) > 0:
+            raise Exception(f"users {missing_users} not found")
+        return users
+
+    def compute(self, users_data) -> dict:
+        """ Computes trades for every user from prices loaded once for all users tickers """
+        compute_services = {}
+        all_tickers = list(dict.fromkeys([ticker for user_data in users_data for ticker in user_data['tickers'].split(',')]))
+        windows = [StockComputeService(user_data['tickers'], self.today, user_data['open_positions'], calculate_dates_only=True)
+                   for user_data in users_data]
+        warmup_date = min([window.warmup_date for window in windows])
+        end_date = max([window.end_date for window in windows])
+        # widest window of each ticker across users
+        warmup_dates = {}
+        for window in windows:
+            for ticker, ticker_warmup_date in window.ticker_warmup_dates.items():
+                warmup_dates[ticker] = min(warmup_dates.get(ticker, ticker_warmup_date), ticker_warmup_date)
+        print(f"Loading prices for {len(all_tickers)} tickers ({len(users_data)} users) from {warmup_date} to {end_date}")
+        price_data = StockComputeService.load_price_data(",".join(all_tickers), warmup_date, end_date, self.price_store, warmup_dates)
+        indicator_cache = {}
+        indicator_state_service = None
+        if self.engine == 'vectorized' and self.indicator_state_path is not None:
+            indicator_state_service = IndicatorStateService(self.indicator_state_path)
+        indicator_data = None
+        price_store = self.price_store if self.price_store is not None else YfinanceDataService.price_store()
+        if self.engine == 'vectorized' and price_store is not None:
+            indicator_data = YfinanceDataService.indicator_store(price_store).load(all_tickers, warmup_date, end_date)
+        for user_data in users_data:
+            compute_services[user_data['user']] = StockComputeService(user_data['tickers'], self.today, user_data['open_positions'],
+                                                                     engine=self.engine, price_data=price_data,
+                                                                     indicator_cache=indicator_cache,
+                                                                     indicator_state_service=indicator_state_service,
+                                                                     indicator_data=indicator_data,
+                                                                     stats_history_size=StockComputeService.DEFAULT_DAILY_STATS_RETURNED)
+        return compute_services
+
+    @staticmethod
+    def report_file(user) -> str:
+        """ File of the user report with the `file` output, e.g. temp/trade_advisor_report_alice.html """
+        return TradeTodayReportingService.REPORT_FILE.replace('.html', f"_{user}.html")
+
+    def report(self, user_data, stock_compute_service, dataroma_service, output) -> TradeTodayReportingService:
+        rep_svc = TradeTodayReportingService(self.today, user_data['tickers'], user_data['open_positions'],
+                                             user_data['closed_positions'], 0, user_data['user'], rapid=self.rapid,
+                                             exchange_rate_service=self.exchange_rate_service,
+                                             stock_compute_service=stock_compute_service,
+                                             dataroma_service=dataroma_service,
+                                             runtime_stock_stats_service=self.runtime_stock_stats_service)
+        # reports are sent concurrently, each user `file` report is written to its own file
+        rep_svc.send_report(output, user_data['email'], report_file=MultiUserTradeTodayService.report_file(user_data['user']))
+        return rep_svc
+
+    def run(self, output='console') -> dict:
+        """
+        Computes and sends (see TradeTodayReportingService.send_report) every user report
+        Raises:
+            Exception: If any user report failed (after all other users reports were sent)
+        Returns:
+            dict: user id -> TradeTodayReportingService
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            users_data = list(executor.map(self.load_user_data, self.get_users()))
+            compute_services = self.compute(users_data)
+            self.dataroma_service = DataromaService(path=self.dataroma_cache_path)
+            if not self.rapid:
+                all_tickers = list(dict.fromkeys([ticker for user_data in users_data for ticker in user_data['tickers'].split(',')]))
+                self.runtime_stock_stats_service = RuntimeStockStatsService(all_tickers, path=self.fundamentals_cache_path)
+            # the exchange rates of all users tax payment windows are fetched once, rather than by each report thread
+            if self.exchange_rate_service is not None:
+                self.exchange_rate_service.prefetch_rates(
+                    set([TaxCalculatorService.exchange_rate_date(position.closed_date)
+                         for user_data in users_data for position in user_data['closed_positions']]))
+            futures = {user_data['user']: executor.submit(self.report, user_data, compute_services[user_data['user']],
+                                                          self.dataroma_service, output)
+                       for user_data in users_data}
+            reports = {}
+            failed_users = {}
+            for user, future in futures.items():
+                try:
+                    reports[user] = future.result()
+                except Exception as e:
+                    print(f"Failed to report trades today for {user}: {e}")
+                    failed_users[user] = e
+        if len(failed_users) > 0:
+            raise Exception(f"Failed to report trades today for users {list(failed_users.keys())}: {failed_users}")
+        return reports
@@ -0,0 +1,161 @@
+import datetime
+import hashlib
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+import backtrader as bt
+import numpy as np
+
+from repositories.optimisation_result_repository import OptimisationResultRepository
+from repositories.shared_memory_price_repository import SharedMemoryPriceRepository
+from schemas.optimisation_result import OptimisationResult
+from services.stock_compute_service import StockComputeService
+from strategies.base_strategy import BaseStrategy
+from strategies.bbrsi_strategy import BbRsiStrategy
+from strategies.rsi_strategy import RsiStrategy
+
+# Prices attached once per worker process by _init_worker (zero-copy), so that tasks only carry strategy params
+_worker_prices = None
+_worker_price_data = None
+
+def _init_worker(descriptor, tickers_list):
+    global _worker_prices, _worker_price_data
+    _worker_prices = SharedMemoryPriceRepository.attach(descriptor)
+    _worker_price_data = _worker_prices.load(tickers_list)
+
+def run_backtest(strategy, params, price_data, tickers_list, start_date, initial_cash) -> dict:
+    """
+    Backtests the strategy with params over the tickers prices (trades from start_date, indicators warmed up before)
+    Returns:
+        dict: final_value and num_trade_actions
+    """
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.addstrategy(strategy, start_date=start_date, **params)
+    for ticker in tickers_list:
+        cerebro.adddata(data=StockComputeService.price_data_feed(price_data[ticker]), name=ticker)
+    cerebro.broker.setcash(initial_cash)
+    strategy_run = cerebro.run()[0]
+    return {'final_value': cerebro.broker.getvalue(), 'num_trade_actions': len(strategy_run.trade_actions)}
+
+def _run_worker_backtest(strategy, params, tickers_list, start_date, initial_cash) -> dict:
+    return run_backtest(strategy, params, _worker_price_data, tickers_list, start_date, initial_cash)
+
+class OptimiserService:
+    STRATEGIES = {'rsi': RsiStrategy, 'bbrsi': BbRsiStrategy}
+    # Strategy params set by the optimiser itself or not applicable to backtests
+    NON_OPTIMISABLE_PARAMS = ['start_date', 'ticker_start_dates', 'single_date_to_trade', 'last_date_to_trade', 'stats_history_size', 'custom_callback', 'open_positions']
+    def __init__(self, strategy_name, tickers, start_date, end_date, result_repository: OptimisationResultRepository,
+                 initial_cash=30000, max_workers=None):
+        """
+        Sweeps strategy params over a process pool, skipping params already stored in result_repository
+        Args:
+            strategy_name (str): see STRATEGIES
+            tickers (str): A comma-separated string of ticker symbols (e.g., "AAPL,GOOG,MSFT").
+            start_date (datetime.date): First date to trade (indicators are warmed up from warmup_date)
+            end_date (datetime.date): Date to stop trading at (excluded)
+            max_workers (int): worker processes (defaults to number of CPUs)
+        """
+        if strategy_name not in OptimiserService.STRATEGIES:
+            raise Exception(f"Unknown strategy {strategy_name}, expected one of {list(OptimiserService.STRATEGIES.keys())}")
+        self.strategy_name = strategy_name
+        self.strategy = OptimiserService.STRATEGIES[strategy_name]
+        self.tickers_list = tickers.split(',')
+        # Results are shared by runs over the same ticker set, regardless of order
+        self.tickers_key = ",".join(sorted(self.tickers_list))
+        self.start_date = start_date
+        self.end_date = end_date
+        self.warmup_date = start_date - datetime.timedelta(BaseStrategy.INDICATOR_WARMUP_IN_DAYS)
+        self.result_repository = result_repository
+        self.initial_cash = initial_cash
+        self.max_workers = max_workers
+
+    def params_hash(self, params, data_key=None) -> str:
+        """
+        Identifies a params combination (and initial cash, which also changes backtest results)
+        Numbers are compared by value (e.g. lower_rsi 40 and 40.0 are the same combination)
+        Args:
+            data_key (str): prices the params are backtested over (see price_data_key), so that results of other prices are not reused
+        """
+        normalised = {name: float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+                      for name, value in {**params, 'initial_cash': self.initial_cash}.items()}
+        if data_key is not None:
+            normalised['price_data'] = data_key
+        key = json.dumps(normalised, sort_keys=True)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def price_data_key(price_data, tickers_list) -> str:
+        """ Identifies the prices of the tickers (latest date and checksum of their bars), whether read from files or the price store """
+        digest = hashlib.sha256()
+        latest_date = None
+        for ticker in sorted(tickers_list):
+            prices = price_data[ticker]
+            digest.update(ticker.encode('utf-8'))
+            for column in SharedMemoryPriceRepository.COLUMNS:
+                digest.update(np.ascontiguousarray(prices[column], dtype=SharedMemoryPriceRepository.DTYPES[column]).tobytes())
+            if len(prices['date']) > 0:
+                latest_date = prices['date'][-1] if latest_date is None else max(latest_date, prices['date'][-1])
+        return f"{latest_date}:{digest.hexdigest()[:16]}"
+
+    def param_grid(self, param_values) -> list:
+        """
+        Args:
+            param_values (dict): strategy param name -> list of values (e.g. {'lower_rsi': [40, 44], 'loss_pct_threshold': [5, 10]})
+        Returns:
+            list: params dictionaries for every combination of values
+        """
+        valid_params = [name for name in self.strategy.params._getkeys() if name not in OptimiserService.NON_OPTIMISABLE_PARAMS]
+        invalid_params = [name for name in param_values if name not in valid_params]
+        if len(invalid_params) > 0:
+            raise Exception(f"Unknown {self.strategy_name} params {invalid_params}, expected some of {list(valid_params)}")
+        names = list(param_values.keys())
+        return [dict(zip(names, values)) for values in itertools.product(*[param_values[name] for name in names])]
+
+    def optimise(self, param_values, price_data=None) -> List[OptimisationResult]:
+        """
+        Backtests every params combination not yet stored in the result repository
+        Args:
+            param_values (dict): see param_grid
+            price_data (dict, optional): prices from warmup_date to end_date (see StockComputeService.load_price_data), loaded when not supplied
+        Returns:
+            list: results for all combinations, best final value first
+        """
+        grid = self.param_grid(param_values)
+        # results are keyed by the prices they were computed from
+        if price_data is None:
+            price_data = StockComputeService.load_price_data(",".join(self.tickers_list), self.warmup_date, self.end_date)
+        price_data = StockComputeService.slice_price_data(price_data, self.tickers_list, self.warmup_date, self.end_date)
+        data_key = OptimiserService.price_data_key(price_data, self.tickers_list)
+        computed_hashes = self.result_repository.get_params_hashes(self.strategy_name, self.tickers_key, self.start_date, self.end_date)
+        pending = [params for params in grid if self.params_hash(params, data_key) not in computed_hashes]
+        print(f"Optimising {self.strategy_name} over {self.tickers_key} from {self.start_date} to {self.end_date}: "
+              f"{len(grid)} params combinations, {len(grid) - len(pending)} already computed")
+        if len(pending) > 0:
+            with SharedMemoryPriceRepository.create(price_data) as shared_prices, \
+                 ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(shared_prices.descriptor, self.tickers_list)) as executor:
+                params_by_future = {executor.submit(_run_worker_backtest, self.strategy, params, self.tickers_list,
+                                                    self.start_date, self.initial_cash): params for params in pending}
+                for completed, future in enumerate(as_completed(params_by_future), start=1):
+                    params = params_by_future[future]
+                    result = self.optimisation_result(params, future.result(), data_key)
+                    self.result_repository.save(result)
+                    print(f"[{completed}/{len(pending)}] {result.as_text()}")
+        grid_hashes = {self.params_hash(params, data_key) for params in grid}
+        return self.result_repository.get_all(self.strategy_name, self.tickers_key, self.start_date, self.end_date, grid_hashes)
+
+    def optimisation_result(self, params, backtest, data_key=None) -> OptimisationResult:
+        pnl = backtest['final_value'] - self.initial_cash
+        return OptimisationResult(strategy=self.strategy_name,
+                                  params=params,
+                                  params_hash=self.params_hash(params, data_key),
+                                  tickers=self.tickers_key,
+                                  start_date=self.start_date,
+                                  end_date=self.end_date,
+                                  initial_cash=self.initial_cash,
+                                  final_value=backtest['final_value'],
+                                  pnl=pnl,
+                                  pnl_pct=pnl / self.initial_cash * 100,
+                                  num_trade_actions=backtest['num_trade_actions'])
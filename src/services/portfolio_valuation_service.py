@@ -0,0 +1,112 @@
+import datetime
+import tempfile
+from typing import List
+
+from models.open_position import OpenPosition
+from models.open_position_index import OpenPositionIndex
+from repositories.price_store_repository import PriceStoreRepository
+from schemas.portfolio_stats import AssetStats, PortfolioStats, PositionStats
+from services.utils_service import parse_date
+from services.yfinance_data_service import YfinanceDataService
+
+class PortfolioValuationService():
+    def __init__(self, open_positions: List[OpenPosition], todays_date_str, data_directory=None,
+                 price_store: PriceStoreRepository = None, latest_closes: dict = None):
+        """
+        Values open positions at the last close before today, without running a strategy (see portfolio-stats)
+        Args:
+            todays_date_str (str): positions are valued at the last close before this date (yyyy-mm-dd), as per StockComputeService
+            data_directory (str): folder with yfinance_data_{ticker}.csv files to use instead of downloading them from S3
+            price_store (PriceStoreRepository): price store to read closes from (caller is responsible for keeping it up to date).
+                When not supplied, the TRADE_ADVISOR_PRICE_STORE price store is used (if set), refreshed from S3 beforehand
+            latest_closes (dict): ticker -> (date, close) already loaded (see load_latest_closes)
+        """
+        self.open_position_index = OpenPositionIndex.of(open_positions)
+        self.end_date = parse_date(todays_date_str)
+        if latest_closes is None:
+            latest_closes = PortfolioValuationService.load_latest_closes(self.open_position_index.tickers(), self.end_date,
+                                                                         data_directory, price_store)
+        self.latest_closes = latest_closes
+
+    @staticmethod
+    def load_latest_closes(tickers_list, end_date, data_directory=None, price_store: PriceStoreRepository = None) -> dict:
+        """
+        Loads the last close of each ticker before end_date, from the yfinance data files in data_directory,
+        the price store (single query) or the yfinance data files in S3
+        Returns:
+            dict: ticker -> (datetime.date, close)
+        """
+        if len(tickers_list) == 0:
+            return {}
+        if data_directory is None:
+            if price_store is None:
+                price_store = YfinanceDataService.price_store()
+                if price_store is not None:
+                    YfinanceDataService().update_price_store_from_s3(",".join(tickers_list), price_store)
+            if price_store is not None:
+                return price_store.latest_closes(tickers_list, end_date)
+        with tempfile.TemporaryDirectory() as temp_yfinance_download_folder:
+            if data_directory is None:
+                data_directory = temp_yfinance_download_folder
+                YfinanceDataService().download_required_yfinance_data_to_filesystem(",".join(tickers_list), data_directory)
+            price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers_list, data_directory, None, end_date)
+        return {ticker: (prices['date'][-1].astype(datetime.date), float(prices['close'][-1]))
+                for ticker, prices in price_data.items() if len(prices['date']) > 0}
+
+    def portfolio_stats(self) -> PortfolioStats:
+        return PortfolioValuationService.compute_portfolio_stats(self.open_position_index, self.latest_closes)
+
+    @staticmethod
+    def compute_portfolio_stats(open_position_index: OpenPositionIndex, latest_closes: dict) -> PortfolioStats:
+        """
+        Computes position, asset (all positions of a ticker) and portfolio statistics
+        Args:
+            latest_closes (dict): ticker -> (date, close) the positions of the ticker are valued at
+        """
+        position_stats_list = []
+        asset_stats_list = []
+        total_invested = 0
+        for ticker in open_position_index.tickers():
+            if ticker not in latest_closes:
+                raise Exception(f"Missing prices for {ticker}")
+            date, close = latest_closes[ticker]
+            asset_units = 0
+            asset_amount = 0
+            asset_value = 0
+            positions = open_position_index.get_by_ticker(ticker)
+            for open_position in positions:
+                amount = open_position.size * open_position.price
+                value = open_position.size * close
+                position_stats_list.append(PositionStats(
+                    ticker = ticker,
+                    date = date,
+                    units = open_position.size,
+                    open = open_position.price,
+                    amount = amount,
+                    value = value,
+                    pnl = value - amount,
+                    pnl_pct = (value - amount) / amount * 100
+                ))
+                asset_units += open_position.size
+                asset_amount += amount
+                asset_value += value
+            # AssetStats across all positions on this ticker
+            asset_stats_list.append(AssetStats(
+                ticker = ticker,
+                price = close,
+                units = asset_units,
+                num_positions = len(positions),
+                amount = asset_amount,
+                value = asset_value,
+                pnl = asset_value - asset_amount,
+                pnl_pct = (asset_value - asset_amount) / asset_amount * 100
+            ))
+            total_invested += asset_amount
+        portfolio_value = sum([asset_stats.value for asset_stats in asset_stats_list])
+        return PortfolioStats(
+            total_invested = total_invested,
+            pnl = portfolio_value - total_invested,
+            pnl_pct = (portfolio_value - total_invested) / total_invested * 100 if total_invested else 0,
+            portfolio_value = portfolio_value,
+            asset_stats_list = asset_stats_list,
+            position_stats_list = position_stats_list)
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import deque
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe rate limiter, e.g. TwelveData API credits (1 credit per symbol requested).
+    Credits spent over the last 60 seconds are kept so that no 60 second window exceeds credits_per_minute, including
+    the first minute and after idle periods (a full token bucket alone would allow twice the rate over those windows).
+    A token bucket, starting full and refilling continuously at credits_per_minute / 60 per second up to capacity,
+    additionally limits bursts when capacity is lower than credits_per_minute.
+    acquire blocks until enough credits are available, so callers never exceed the configured rate.
+    """
+    WINDOW_IN_SECONDS = 60
+
+    def __init__(self, credits_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if credits_per_minute <= 0:
+            raise Exception(f"Invalid rate limit: {credits_per_minute} credits per minute")
+        self.credits_per_minute = credits_per_minute
+        self.refill_per_second = credits_per_minute / 60
+        self.capacity = credits_per_minute if capacity is None else min(capacity, credits_per_minute)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.last_refill = self.clock()
+        # (time, credits) spent within the last WINDOW_IN_SECONDS
+        self.spent = deque()
+        self.spent_credits = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_per_second)
+        self.last_refill = now
+
+    def _expire(self, now):
+        while len(self.spent) > 0 and self.spent[0][0] <= now - TokenBucketRateLimiter.WINDOW_IN_SECONDS:
+            _, credits = self.spent.popleft()
+            self.spent_credits -= credits
+
+    def _window_ready_at(self, now, credits) -> float:
+        """ Time when enough of the spent credits have left the window to spend credits """
+        excess = self.spent_credits + credits - self.credits_per_minute
+        ready_at = now
+        for spent_time, spent_credits in self.spent:
+            if excess <= 0:
+                break
+            excess -= spent_credits
+            ready_at = spent_time + TokenBucketRateLimiter.WINDOW_IN_SECONDS
+        return ready_at
+
+    def acquire(self, credits=1) -> float:
+        """
+        Waits until the requested credits are available and consumes them
+        Returns:
+            float: Seconds spent waiting
+        """
+        if credits > self.capacity:
+            raise Exception(f"Cannot acquire {credits} credits from a rate limiter with capacity {self.capacity}")
+        waited = 0.0
+        # Holding the lock while waiting serves callers in arrival order
+        with self.lock:
+            now = self.clock()
+            while True:
+                self._refill(now)
+                self._expire(now)
+                ready_at = self._window_ready_at(now, credits)
+                # tolerates rounding errors of the refill
+                if self.tokens + 1e-9 < credits:
+                    ready_at = max(ready_at, now + (credits - self.tokens) / self.refill_per_second)
+                if ready_at <= now:
+                    break
+                self.sleep(ready_at - now)
+                waited += ready_at - now
+                # sleep waits at least the requested time, which the clock may not reflect exactly when rounded
+                now = max(self.clock(), ready_at)
+            self.tokens -= credits
+            self.spent.append((now, credits))
+            self.spent_credits += credits
+        return waited
@@ -0,0 +1,145 @@
+import bisect
+import datetime
+from typing import Dict
+
+from models.replay_day import ReplayDay
+from services.dataroma_service import DataromaService
+from services.email_notification_service import EmailNotificationService
+from services.exchange_rate_service import ExchangeRateService
+from services.runtime_stock_stats_service import RuntimeStockStatsService
+from services.stock_compute_service import StockComputeService
+from services.trade_today_reporting_service import TradeTodayReportingService
+from services.utils_service import date_as_str, parse_date
+from services.whatsup_notification_service import WhatsappNotificationService
+from strategies.bbrsi_strategy import BbRsiStrategy
+
+class ReplayService():
+    def __init__(self, tickers, from_date_str, to_date_str, open_positions=None, closed_positions=None, user="unknown",
+                 rapid=False, strategy=BbRsiStrategy, engine='backtrader', data_directory=None, price_store=None,
+                 exchange_rate_service: ExchangeRateService = None, dataroma_service: DataromaService = None,
+                 runtime_stock_stats_service: RuntimeStockStatsService = None):
+        """
+        Trade-today reports of every date from from_date_str to to_date_str, as `trade-today --today` would have reported
+        them, computed by a single strategy pass over the whole range (see StockComputeService replay_from_date_str)
+        instead of one run per date.
+        Advised trades are not executed by the replay: positions on each date are the recorded open positions bought
+        by then, as for trade-today. Dates without prices (e.g. the day after a week-end) are not reported.
+
+        Args:
+            tickers (str): A comma-separated string of ticker symbols (e.g., "AAPL,GOOG,MSFT").
+            from_date_str (str): first replayed date in yyyy-mm-dd format
+            to_date_str (str): last replayed date in yyyy-mm-dd format
+            data_directory, price_store, engine: see StockComputeService
+            dataroma_service (DataromaService): shared by all dates reports, scraped on first report when not supplied
+            runtime_stock_stats_service (RuntimeStockStatsService): fundamentals shared by all dates reports (see TradeTodayReportingService)
+        """
+        if parse_date(from_date_str) > parse_date(to_date_str):
+            raise Exception(f"Replay from date {from_date_str} is after to date {to_date_str}")
+        self.tickers = tickers
+        self.from_date_str = from_date_str
+        self.to_date_str = to_date_str
+        self.open_positions = open_positions if open_positions is not None else []
+        self.closed_positions = closed_positions if closed_positions is not None else []
+        self.user = user
+        self.rapid = rapid
+        self.exchange_rate_service = exchange_rate_service
+        self.dataroma_service = dataroma_service
+        self.runtime_stock_stats_service = runtime_stock_stats_service
+        self.cli_command = f"replay --tickers {tickers} --from {from_date_str} --to {to_date_str}"
+        self.stock_compute_service = StockComputeService(tickers, to_date_str, self.open_positions, strategy=strategy, engine=engine,
+                                                         data_directory=data_directory, price_store=price_store,
+                                                         replay_from_date_str=from_date_str)
+        self.days = self.split_by_day()
+
+    def split_by_day(self) -> Dict[str, ReplayDay]:
+        """ Splits the replay trades and statistics by replayed date (the day after the bar they were computed from) """
+        strategy = self.stock_compute_service.get_strategy()
+        first_bar_date = parse_date(self.from_date_str) - datetime.timedelta(days=1)
+        last_bar_date = parse_date(self.to_date_str) - datetime.timedelta(days=1)
+        stock_daily_stats_lists = {ticker: strategy.stock_daily_stats_list[ticker] for ticker in self.tickers.split(',')}
+        stats_dates = {ticker: [stats.date for stats in stats_list] for ticker, stats_list in stock_daily_stats_lists.items()}
+        bar_dates = sorted(set([date for dates in stats_dates.values() for date in dates if first_bar_date <= date <= last_bar_date]))
+        days = {}
+        for bar_date in bar_dates:
+            today = date_as_str(bar_date + datetime.timedelta(days=1))
+            end_indexes = {ticker: bisect.bisect_right(dates, bar_date) for ticker, dates in stats_dates.items()}
+            days[today] = ReplayDay(today, bar_date, [], stock_daily_stats_lists, end_indexes)
+        for trade_action in strategy.trade_actions:
+            today = date_as_str(trade_action.date + datetime.timedelta(days=1))
+            if today in days:
+                days[today].trade_actions.append(trade_action)
+        return days
+
+    def num_trades(self):
+        return sum([len(day.trade_actions) for day in self.days.values()])
+
+    def day_reporting_service(self, today) -> TradeTodayReportingService:
+        """ trade-today report of a replayed date, limited to the positions opened (and closed) by then """
+        day = self.days[today]
+        if self.dataroma_service is None:
+            self.dataroma_service = DataromaService()
+        open_positions = [position for position in self.open_positions if position.date <= day.bar_date]
+        closed_positions = [position for position in self.closed_positions if position.closed_date <= day.bar_date]
+        tickers = ",".join([ticker for ticker in self.tickers.split(',') if day.get_stock_daily_stats_list(ticker, 1)])
+        return TradeTodayReportingService(today, tickers, open_positions, closed_positions, 0, self.user, rapid=self.rapid,
+                                          exchange_rate_service=self.exchange_rate_service, stock_compute_service=day,
+                                          dataroma_service=self.dataroma_service,
+                                          runtime_stock_stats_service=self.runtime_stock_stats_service)
+
+    def console_report(self, include_stats=True):
+        """ Consolidated console report, one trade-today section per replayed date """
+        output = ""
+        output += self.cli_command + "\n"
+        output += "\n"
+        for today, day in self.days.items():
+            output += f"Replay of {today}\n"
+            if day.trade_actions:
+                for trade in day.trade_actions:
+                    output += trade.as_text(context=False) + "\n"
+            else:
+                output += f"No trades today ({today})\n"
+            if include_stats:
+                for stock in day.stock_stats_today():
+                    output += stock.as_text() + "\n"
+            output += "\n"
+        output += f"{self.num_trades()} trades over {len(self.days)} replayed dates\n"
+        return output
+
+    def email_html_report(self, simulation=False):
+        """ Consolidated HTML report, the trades and open position sections of each replayed date """
+        output = ""
+        output += f"<p>Replay for {self.user.capitalize()} from {self.from_date_str} to {self.to_date_str}</p>"
+        output += f"<p><i>Created on {str(datetime.datetime.now()).split('.')[0]}</i></p>"
+        for today in self.days:
+            print(f"Building replay report of {today} ...")
+            rep_svc = self.day_reporting_service(today)
+            output += rep_svc.trades_today_html_section()
+            if rep_svc.open_positions:
+                output += rep_svc.open_position_performance_html_section()
+        output += f"<h1>Execution Command</h1>"
+        output += f"<p>{self.cli_command}</p>"
+        if simulation:
+            with open('temp/trade_advisor_replay_report.html', 'w') as file:
+                file.write(output)
+        return (f"{self.num_trades()} trades from {self.from_date_str} to {self.to_date_str}", output)
+
+    def send_report(self, output, email_receiver=None, per_day=False):
+        """
+        Sends the consolidated report to `console`, `whatsapp`, `email` or `file` (see replay --output),
+        or one trade-today report per replayed date when per_day is set
+        """
+        if per_day:
+            for today in self.days:
+                self.day_reporting_service(today).send_report(output, email_receiver)
+            return
+        print(self.console_report())
+        if 'whatsapp' in output:
+            WhatsappNotificationService().send_message(self.console_report(include_stats=False))
+            print("Whatsapp report sent")
+        elif 'email' in output:
+            subject, body = self.email_html_report()
+            EmailNotificationService(email_receiver=email_receiver).send_email(subject, body)
+            print("Email report sent")
+        elif 'file' in output:
+            subject, body = self.email_html_report(simulation=True)
+            print("Email report written to file")
@@ -1,35 +1,126 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+
 import yfinance as yf
-from services.utils_service import todays_date
+from repositories.file_repository import FileRepository
+from services.utils_service import date_str_diff_in_days, todays_date, today_as_str
 from datetime import datetime
 
+
+@dataclass
+class FundamentalsCacheEntry:
+    fetched_date: str
+    close: float
+    eps_ttm: float
+    earnings_dates: List[str]
+
 class RuntimeStockStatsService():
-    # see https://pypi.org/project/yfinance/ 
-    def __init__(self, ticker_list: list, rapid=False):
+    # see https://pypi.org/project/yfinance/
+    MAX_CONCURRENT_REQUESTS = 8
+    # entries not refreshed for this many days are dropped from the saved cache
+    STALE_CACHE_ENTRY_IN_DAYS = 10
+    def __init__(self, ticker_list: list, rapid=False, path=None, max_workers=MAX_CONCURRENT_REQUESTS, today_date_str=None):
+        """
+        Fundamentals (P/E ratio, next earnings call) of ticker_list, fetched from yfinance at most once a day per ticker.
+
+        Args:
+            rapid (bool): skip yfinance calls, returning placeholder values
+            path (str, optional): fundamentals cache file (s3://.../myfile.json or ./.../myfile.json), in memory only when not supplied
+            max_workers (int): tickers fetched concurrently when the cache is prefetched
+            today_date_str (str): The date string for today (for testing only).
+
+        Fundamentals of all tickers missing from the cache (or fetched before today) are prefetched concurrently.
+        Cache structure is as follows (see save_cache):\n
+        .. code-block:: json
+            {
+                "AMZN": {
+                    "fetched_date": "2025-01-02",
+                    "close": 220.22,
+                    "eps_ttm": 5.53,
+                    "earnings_dates": ["2025-02-06", "2024-10-31"]
+                }
+            }
+        """
         space_separated_tickers = ' '.join(ticker_list)
         self.tickers = yf.Tickers(space_separated_tickers)
         self.ticker_list = ticker_list
         self.rapid = rapid
-        
+        self.max_workers = max_workers
+        self.today_date_str = today_as_str() if today_date_str is None else today_date_str
+        self.file_repository = FileRepository(path) if path is not None else None
+        self.cache = self.load_cache() if self.file_repository is not None else {}
+        if not self.rapid:
+            self.prefetch()
+
+    def load_cache(self) -> Dict[str, FundamentalsCacheEntry]:
+        data_as_str = self.file_repository.load()
+        if data_as_str is None:
+            data_as_str = "{}"
+        data = json.loads(data_as_str)
+        return {ticker: FundamentalsCacheEntry(**entry) for ticker, entry in data.items()}
+
+    def save_cache(self):
+        """
+        Saves the fundamentals cache (removing entries not refreshed in the last STALE_CACHE_ENTRY_IN_DAYS days).\n
+        Should be called once all reports using this service are built.\n
+        """
+        if self.file_repository is None:
+            return
+        cache_data = {
+            ticker: entry.__dict__
+            for ticker, entry in self.cache.items()
+            if date_str_diff_in_days(self.today_date_str, entry.fetched_date) < RuntimeStockStatsService.STALE_CACHE_ENTRY_IN_DAYS
+        }
+        self.file_repository.save(json.dumps(cache_data, indent=4))
+
+    def is_fresh(self, ticker):
+        return ticker in self.cache and self.cache[ticker].fetched_date == self.today_date_str
+
+    def fetch_fundamentals(self, ticker) -> FundamentalsCacheEntry:
+        stock = self.tickers.tickers[ticker]
+        close = float(stock.history(period='1d')['Close'].iloc[0])
+        eps_ttm = stock.info.get('trailingEps', None)
+        earnings = stock.get_earnings_dates()
+        earnings_dates = [] if earnings is None else [str(d.astype('M8[ms]').astype(datetime).date()) for d in list(earnings.index.values)]
+        return FundamentalsCacheEntry(fetched_date=self.today_date_str, close=close, eps_ttm=eps_ttm, earnings_dates=earnings_dates)
+
+    def prefetch(self):
+        """ Fetches fundamentals of tickers not fetched today concurrently (failures are retried on first use) """
+        stale_tickers = [ticker for ticker in self.ticker_list if not self.is_fresh(ticker)]
+        if len(stale_tickers) == 0:
+            return
+        print(f"Fetching fundamentals for {len(stale_tickers)} tickers ({len(self.ticker_list) - len(stale_tickers)} cached)")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {ticker: executor.submit(self.fetch_fundamentals, ticker) for ticker in stale_tickers}
+            for ticker, future in futures.items():
+                try:
+                    self.cache[ticker] = future.result()
+                except Exception as e:
+                    print(f"Failed to fetch fundamentals for {ticker}: {e}")
+
+    def fundamentals(self, ticker) -> FundamentalsCacheEntry:
+        if not self.is_fresh(ticker):
+            self.cache[ticker] = self.fetch_fundamentals(ticker)
+        return self.cache[ticker]
+
     def pe_ratio(self, ticker):
         if ticker not in self.ticker_list:
             raise Exception(f"{ticker} not in ticker list")
         if not self.rapid:
-            stock = self.tickers.tickers[ticker]
-            stock_price = stock.history(period='1d')['Close'].iloc[0]
-            eps_ttm = stock.info['trailingEps']
-            if eps_ttm:
-                pe_ratio = round(stock_price / eps_ttm, 2)
+            fundamentals = self.fundamentals(ticker)
+            if fundamentals.eps_ttm:
+                pe_ratio = round(fundamentals.close / fundamentals.eps_ttm, 2)
             else:
                 raise Exception(f"EPS data not available for {ticker}")
         else:
             pe_ratio = 42
         return(pe_ratio)
-    
+
     def next_earnings_call_in_days(self, ticker):
         if not self.rapid:
-            stock = self.tickers.tickers[ticker]
-            #print(stock.get_earnings_dates())
-            earnings_dates = [d.astype('M8[ms]').astype(datetime).date() for d in list(stock.get_earnings_dates().index.values)]
+            earnings_dates = [datetime.strptime(d, "%Y-%m-%d").date() for d in self.fundamentals(ticker).earnings_dates]
             future_earnings_dates = [d for d in earnings_dates if d > todays_date()]
             next_earnings_date = min(future_earnings_dates)
             days_to_earning = (next_earnings_date - todays_date()).days
@@ -37,5 +128,3 @@ class RuntimeStockStatsService():
             days_to_earning = 42
         #print(f"{ticker}: {days_to_earning}d {next_earnings_date}")
         return days_to_earning
-        
-        
\ No newline at end of file
@@ -1,15 +1,21 @@
 import random
 import tempfile
 from typing import List
-from schemas.portfolio_stats import AssetStats, PortfolioStats, PositionStats
+from repositories.price_store_repository import PriceStoreRepository
+from models.open_position_index import OpenPositionIndex
+from schemas.portfolio_stats import PortfolioStats
 from schemas.stock_daily_stats import StockDailyStats
+from services.portfolio_valuation_service import PortfolioValuationService
 from services.yfinance_data_service import YfinanceDataService
 from services.utils_service import date_as_str, parse_date
 from strategies.base_strategy import BaseStrategy
 from strategies.rsi_strategy import RsiStrategy
 from strategies.bbrsi_strategy import BbRsiStrategy
+from strategies.numpy_data import NumpyData
+from strategies.vectorized_strategy import VectorizedStrategy
 
 import backtrader as bt
+import numpy as np
 import yfinance as yf
 
 import datetime
@@ -18,39 +24,103 @@ import os
 class StockComputeService:
     DEFAULT_DAILY_STATS_RETURNED = BaseStrategy.TRADE_ACTION_CONTEXT_SIZE
     LOWER_RSI = 50
-    def __init__(self, tickers, todays_date_str, open_positions=None, strategy=BbRsiStrategy, calculate_dates_only=False):
+    ENGINES = ['backtrader', 'vectorized']
+    def __init__(self, tickers, todays_date_str, open_positions=None, strategy=BbRsiStrategy, calculate_dates_only=False,
+                 engine='backtrader', data_directory=None, price_store: PriceStoreRepository = None,
+                 price_data: dict = None, indicator_cache: dict = None, indicator_state_service=None, replay_from_date_str=None,
+                 stats_history_size=None, indicator_data: dict = None):
+        """
+        Args:
+            engine (str): `backtrader` steps the strategy bar by bar through Cerebro,
+                `vectorized` computes indicators as whole columns (see VectorizedStrategy) producing the same results
+            data_directory (str): folder with yfinance_data_{ticker}.csv files to use instead of downloading them from S3
+            price_store (PriceStoreRepository): price store to read prices from (caller is responsible for keeping it up to date).
+                When not supplied, the TRADE_ADVISOR_PRICE_STORE price store is used (if set), refreshed from S3 beforehand
+            price_data (dict): prices already loaded (see load_price_data), e.g. shared by several users.
+                Only the bars within each ticker window (ticker_warmup_dates to end_date) are used
+            indicator_cache (dict): indicators shared between `vectorized` engine runs over the same prices
+            indicator_state_service (IndicatorStateService): persisted indicator states advanced by the `vectorized` engine
+                instead of replaying the warmup (see VectorizedStrategy)
+            replay_from_date_str (str): first date of a replay ending on todays_date_str (see ReplayService).
+                Trades are advised for every date of the range in one pass, as trade-today would on each of them
+            stats_history_size (int): number of last bars stats kept by the strategy (see get_stock_daily_stats_list),
+                in a ring buffer materialising StockDailyStats when read. Stats of all bars are kept when not supplied
+            indicator_data (dict): indicators materialised in the price store (see IndicatorStoreRepository.load), read by
+                the `vectorized` engine instead of computing them. Loaded from the price store when prices are read from it
+        """
+        if engine not in StockComputeService.ENGINES:
+            raise Exception(f"Unknown engine {engine}, expected one of {StockComputeService.ENGINES}")
+        self.engine = engine
+        if stats_history_size is not None and stats_history_size < BaseStrategy.TRADE_ACTION_CONTEXT_SIZE:
+            raise Exception(f"stats_history_size must be at least {BaseStrategy.TRADE_ACTION_CONTEXT_SIZE} (trade actions context)")
         self.todays_date_str = date_as_str(parse_date(todays_date_str) - datetime.timedelta(days=1))
         self.open_positions = open_positions
+        # built once, shared by the strategy (buy_position_recorded) and portfolio_stats
+        self.open_position_index = OpenPositionIndex.of(open_positions) if open_positions is not None else None
 
         self.initial_cash = 30000
         # end_date is the supplied date in today_data_str
         self.end_date = parse_date(self.todays_date_str) + datetime.timedelta(days=1)
         number_of_weeks_to_observe = 2
-        if open_positions:
-            self.warmup_date = open_positions[0].date - datetime.timedelta(weeks = BaseStrategy.INDICATOR_WARMUP_IN_WEEKS + number_of_weeks_to_observe)
-            self.start_date = open_positions[0].date - datetime.timedelta(weeks = number_of_weeks_to_observe)
-        else:
-            self.warmup_date = self.end_date - datetime.timedelta(weeks = BaseStrategy.INDICATOR_WARMUP_IN_WEEKS + number_of_weeks_to_observe)
-            self.start_date = self.end_date - datetime.timedelta(weeks = number_of_weeks_to_observe)
+        # first date trades are advised for (the day before today, as per todays_date_str)
+        first_date_to_trade_str = self.todays_date_str
+        default_first_observed_date = self.end_date
+        if replay_from_date_str is not None:
+            first_date_to_trade_str = date_as_str(parse_date(replay_from_date_str) - datetime.timedelta(days=1))
+            default_first_observed_date = parse_date(replay_from_date_str)
+        self.tickers_list = tickers.split(',')
+        # Each ticker window: open position tickers are observed from their first recorded position (peak tracking),
+        # watched tickers from the first date to trade only, both preceded by the indicators warmup
+        self.ticker_warmup_dates = {}
+        self.ticker_start_dates = {}
+        for ticker in self.tickers_list:
+            positions = self.open_position_index.get_by_ticker(ticker) if self.open_position_index is not None else []
+            first_observed_date = min([default_first_observed_date] + [position.date for position in positions])
+            self.ticker_warmup_dates[ticker] = first_observed_date - datetime.timedelta(weeks = BaseStrategy.INDICATOR_WARMUP_IN_WEEKS + number_of_weeks_to_observe)
+            self.ticker_start_dates[ticker] = first_observed_date - datetime.timedelta(weeks = number_of_weeks_to_observe)
+        # widest window, across all tickers
+        self.warmup_date = min(self.ticker_warmup_dates.values())
+        self.start_date = min(self.ticker_start_dates.values())
         if self.warmup_date > self.end_date:
             print(f"ERROR start_date={self.start_date} < end_date={self.end_date}")
-        self.tickers_list = tickers.split(',')
+        self.strategy_class = strategy
+        self.indicator_cache = indicator_cache
+        self.indicator_state_service = indicator_state_service
+        self.indicator_data = indicator_data
+        self.strategy_params = dict(start_date = self.start_date,
+                                    ticker_start_dates=self.ticker_start_dates,
+                                    printlog=False,
+                                    upper_rsi=60,
+                                    lower_rsi=StockComputeService.LOWER_RSI,
+                                    loss_pct_threshold = 9,
+                                    fixed_investment_amount=5000,
+                                    single_date_to_trade=first_date_to_trade_str,
+                                    last_date_to_trade=self.todays_date_str if replay_from_date_str is not None else None,
+                                    open_positions=self.open_position_index,
+                                    stats_history_size=stats_history_size)
         # Create a cerebro entity
         self.cerebro = bt.Cerebro()
         # Add a strategy
-        self.cerebro.addstrategy(strategy,
-                            start_date = self.start_date,
-                            printlog=False,
-                            upper_rsi=60,
-                            lower_rsi=StockComputeService.LOWER_RSI,
-                            loss_pct_threshold = 9,
-                            fixed_investment_amount=5000,
-                            single_date_to_trade=self.todays_date_str,
-                            open_positions=self.open_positions)
+        self.cerebro.addstrategy(strategy, **self.strategy_params)
 
         print(f'StockComputeService warmup_date:{self.warmup_date}, end_date: {self.end_date}')
         if calculate_dates_only == True:
             return
+        if data_directory is not None:
+            self.compute(data_directory)
+            return
+        if price_data is not None:
+            self.compute_from_price_data(StockComputeService.slice_price_data(price_data, self.tickers_list, self.ticker_warmup_dates, self.end_date))
+            return
+        if price_store is None:
+            price_store = YfinanceDataService.price_store()
+            if price_store is not None:
+                YfinanceDataService().update_price_store_from_s3(tickers, price_store)
+        if price_store is not None:
+            if self.engine == 'vectorized' and self.indicator_data is None:
+                self.indicator_data = YfinanceDataService.indicator_store(price_store).load(self.tickers_list, self.warmup_date, self.end_date)
+            self.compute_from_price_data(price_store.load(self.tickers_list, self.warmup_date, self.end_date, self.ticker_warmup_dates))
+            return
         # TODO: If yfinance-data-store contains all ticker data for the required date range, use that instead of yfinance (see yfinance-data-download)
         with tempfile.TemporaryDirectory() as temp_yfinance_download_folder:
             print(f"Temporary yfinance download folder: {temp_yfinance_download_folder}")
@@ -72,32 +142,76 @@ class StockComputeService:
                     # Save as CSV
                     filename = os.path.join(temp_yfinance_download_folder, f'yfinance_data_{ticker}.csv')
                     single_ticker_data.to_csv(filename)
-            # Add the Data Feed to Cerebro
-            for ticker in self.tickers_list:
-                filename = os.path.join(temp_yfinance_download_folder, f'yfinance_data_{ticker}.csv')
-                # Load data from CSV
-                # Using GenericCSVData instead of YahooFinanceCSVData as there are issues with YahooFinanceCSVData
-                # see https://www.backtrader.com/docu/datafeed/#genericcsvdata
-                data = bt.feeds.GenericCSVData(
-                    dataname=filename,
-                    fromdate=datetime.datetime.combine(self.warmup_date, datetime.datetime.min.time()),
-                    todate=datetime.datetime.combine(self.end_date, datetime.datetime.min.time()),
-                    nullvalue=0.0,
-                    dtformat=('%Y-%m-%d'),
-                    datetime=0,
-                    close=1,
-                    high=2,
-                    low=3,
-                    open=4,
-                    volume=5,
-                    openinterest=None
-                )
-                self.cerebro.adddata(data=data, name=ticker)
-            # Set our desired cash start
-            self.cerebro.broker.setcash(self.initial_cash)
-            # Run over everything
-            self.cerebro.run()
-            self.strategy = self.cerebro.runstrats[0][0]
+            self.compute(temp_yfinance_download_folder)
+
+    @staticmethod
+    def load_price_data(tickers, warmup_date, end_date, price_store: PriceStoreRepository = None, warmup_dates: dict = None) -> dict:
+        """
+        Loads prices for all tickers once, so that they can be shared by several StockComputeService (see price_data)
+        Uses the price store (refreshed from S3 when not supplied, as per __init__) or the yfinance data files in S3
+        Args:
+            tickers (str): A comma-separated string of ticker symbols (e.g., "AAPL,GOOG,MSFT").
+            warmup_dates (dict): ticker -> first date to load, overriding warmup_date (see ticker_warmup_dates)
+        """
+        tickers_list = tickers.split(',')
+        if price_store is None:
+            price_store = YfinanceDataService.price_store()
+            if price_store is not None:
+                YfinanceDataService().update_price_store_from_s3(tickers, price_store)
+        if price_store is not None:
+            return price_store.load(tickers_list, warmup_date, end_date, warmup_dates)
+        with tempfile.TemporaryDirectory() as temp_yfinance_download_folder:
+            YfinanceDataService().download_required_yfinance_data_to_filesystem(tickers, temp_yfinance_download_folder)
+            price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers_list, temp_yfinance_download_folder, warmup_date, end_date)
+        if warmup_dates is None:
+            return price_data
+        return StockComputeService.slice_price_data(price_data, tickers_list, warmup_dates, end_date)
+
+    @staticmethod
+    def slice_price_data(price_data, tickers_list, from_date, to_date) -> dict:
+        """
+        Returns the tickers prices from from_date up to, but excluding, to_date
+        Args:
+            from_date (datetime.date or dict): first date, or ticker -> first date (see ticker_warmup_dates)
+        """
+        sliced_price_data = {}
+        for ticker in tickers_list:
+            if ticker not in price_data:
+                raise Exception(f"Missing prices for {ticker}")
+            dates = price_data[ticker]['date']
+            ticker_from_date = from_date[ticker] if isinstance(from_date, dict) else from_date
+            start, end = np.searchsorted(dates, [np.datetime64(ticker_from_date, 'D'), np.datetime64(to_date, 'D')])
+            sliced_price_data[ticker] = {column: values[start:end] for column, values in price_data[ticker].items()}
+        return sliced_price_data
+
+    def compute(self, yfinance_data_folder):
+        # yfinance data files are parsed into price columns (same bars as bt.feeds.GenericCSVData) fed through NumpyData
+        self.compute_from_price_data({ticker: YfinanceDataService.load_yfinance_data_from_filesystem(
+            [ticker], yfinance_data_folder, self.ticker_warmup_dates[ticker], self.end_date)[ticker] for ticker in self.tickers_list})
+
+    def compute_from_price_data(self, price_data):
+        """ Computes trades from already loaded price data (see PriceStoreRepository.load) """
+        if self.engine == 'vectorized':
+            self.strategy = VectorizedStrategy(self.strategy_class, price_data, self.initial_cash,
+                                               indicator_cache=self.indicator_cache,
+                                               indicator_state_service=self.indicator_state_service,
+                                               indicator_data=self.indicator_data, **self.strategy_params)
+            return
+        for ticker in self.tickers_list:
+            self.cerebro.adddata(data=StockComputeService.price_data_feed(price_data[ticker]), name=ticker)
+        self.run_cerebro()
+
+    @staticmethod
+    def price_data_feed(prices) -> NumpyData:
+        """ Backtrader data feed for a single ticker price columns (see load_price_data), reusable across Cerebro runs """
+        return NumpyData(dataname=prices)
+
+    def run_cerebro(self):
+        # Set our desired cash start
+        self.cerebro.broker.setcash(self.initial_cash)
+        # Run over everything
+        self.cerebro.run()
+        self.strategy = self.cerebro.runstrats[0][0]
 
     def trades_today(self):
         return self.strategy.trade_actions
@@ -112,50 +226,10 @@ class StockComputeService:
         return self.strategy
     
     def portfolio_stats(self) -> PortfolioStats:
-        # compute portfolio statistics
-        position_stats_list = []
-        asset_stats_list = []
-        portfolio_stats = None
-        total_invested = 0
-        for open_position in self.open_positions:
-            # compute PositionStats from open_position and StockDailyStats
-            stock_daily_stats = self.get_stock_daily_stats_list(open_position.ticker, 1)[-1]
-            amount = open_position.size * open_position.price
-            value = open_position.size * stock_daily_stats.close
-            total_invested += amount
-            position_stats = PositionStats(
-                ticker = stock_daily_stats.ticker,
-                date = stock_daily_stats.date,
-                units = open_position.size,
-                open = open_position.price,
-                amount = amount,
-                value = value,
-                pnl = amount - value,
-                pnl_pct = (value - amount) / amount * 100
-            )
-            position_stats_list.append(position_stats)
-            # compute AssetStats (same as PositionStats if only one position per ticker)
-            asset_stats = AssetStats(
-                ticker = stock_daily_stats.ticker,
-                price = stock_daily_stats.close,
-                units = open_position.size,
-                num_positions = 1, # TODO: P2 Support multiple positions per ticker
-                amount = amount,
-                value = value,
-                pnl = value - amount,
-                pnl_pct =  (value - amount) / amount * 100
-            )
-            asset_stats_list.append(asset_stats)
-            
-        # calculate portfolio stats
-        portfolio_value = 0
-        for asset_stats in asset_stats_list:
-            portfolio_value += asset_stats.value
-        portfolio_stats = PortfolioStats(
-            total_invested = total_invested, 
-            pnl = portfolio_value - total_invested,
-            pnl_pct = (portfolio_value - total_invested) / total_invested * 100,
-            portfolio_value = portfolio_value,
-            asset_stats_list = asset_stats_list, 
-            position_stats_list  = position_stats_list)
-        return portfolio_stats
\ No newline at end of file
+        """ Values open positions at the last computed close (see PortfolioValuationService, which does not need a backtest) """
+        open_position_index = self.open_position_index if self.open_position_index is not None else OpenPositionIndex()
+        latest_closes = {}
+        for ticker in open_position_index.tickers():
+            stock_daily_stats = self.get_stock_daily_stats_list(ticker, 1)[-1]
+            latest_closes[ticker] = (stock_daily_stats.date, stock_daily_stats.close)
+        return PortfolioValuationService.compute_portfolio_stats(open_position_index, latest_closes)
\ No newline at end of file
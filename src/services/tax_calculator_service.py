@@ -1,3 +1,4 @@
+import datetime
 from typing import Dict, List
 from models.closed_position import ClosedPosition
 from services.exchange_rate_service import ExchangeRateService
@@ -44,19 +45,17 @@ class TaxPaymentWindow:
         self.total_capital_loss = 0
         self.month_name = "Nov" if end_month == 11 else "Dec"
         self.exchange_rate_service = exchange_rate_service
-        #: Get exchange rate for the last day of the end_month, or today's if in future
-        # It will either be 30 of November or 31 of December
         if end_month == 11:
-            end_date = parse_date(f"{year}-11-30")
             self.tax_due_date = "December 15"
         else:
-            end_date = parse_date(f"{year}-12-31")
             self.tax_due_date = "January 31"
         self.cgt_tax_rate = 0.33
         self.yearly_tax_exemption = 1270.00
         for position in closed_positions:
             if position.closed_date.month <= end_month and position.closed_date.month >= start_month:
-                self.trade_gain_items.append(TradeGainItem(position, self.exchange_rate_service, end_date))
+                #: Get exchange rate for the last day of the end_month, or today's if in future (as prefetched by load_tax_years)
+                exchange_rate_date = TaxCalculatorService.exchange_rate_date(position.closed_date)
+                self.trade_gain_items.append(TradeGainItem(position, self.exchange_rate_service, exchange_rate_date))
                 
     def calculate(self, carried_over_loss_in_euro = 0, remaining_tax_exemption_in_euro = 1270.00):
         # use chargeable gain and capital loss in euro
@@ -277,7 +276,20 @@ class TaxCalculatorService:
                     carried_over_loss_in_euro = tax_year.tax_payment_window(month).loss_to_carryover
                     tax_year.cgt_return = CapitalGainTaxReturn(tax_year)
         
+    @staticmethod
+    def exchange_rate_date(closed_date) -> datetime.date:
+        """
+        Date of the exchange rate used for a position closed on closed_date (end of its TaxPaymentWindow),
+        either 30 of November or 31 of December. Read by TaxPaymentWindow and prefetched by load_tax_years
+        """
+        if closed_date.month <= 11:
+            return parse_date(f"{closed_date.year}-11-30")
+        return parse_date(f"{closed_date.year}-12-31")
+
     def load_tax_years(self):
+        # Fetch the rates of all tax payment windows at once, before TradeGainItem reads them one by one
+        self.exchange_rate_service.prefetch_rates(
+            set([TaxCalculatorService.exchange_rate_date(position.closed_date) for position in self.closed_positions]))
         # Create TaxYear objects for each year that has open positions
         years = set(position.closed_date.year for position in self.closed_positions)
         self.tax_years_dict = {year: TaxYear(year, self.closed_positions, self.exchange_rate_service) for year in years}
@@ -5,23 +5,42 @@ from services.position_stats_service import PositionStatsService
 from services.runtime_stock_stats_service import RuntimeStockStatsService
 from services.stock_compute_service import StockComputeService
 from services.dataroma_service import DataromaService
+from models.open_position_index import OpenPositionIndex
+from services.email_notification_service import EmailNotificationService
+from services.whatsup_notification_service import WhatsappNotificationService
 
 class TradeTodayReportingService():
+    REPORT_FILE = 'temp/trade_advisor_report.html'
+
     def __init__(self, today: str, tickers, open_positions, closed_positions, context, user="unknown", rapid=False, 
-                 exchange_rate_service: ExchangeRateService = None):
+                 exchange_rate_service: ExchangeRateService = None, stock_compute_service: StockComputeService = None,
+                 dataroma_service: DataromaService = None, runtime_stock_stats_service: RuntimeStockStatsService = None):
+        """
+        Args:
+            stock_compute_service (StockComputeService): already computed trades and stats for tickers (e.g. from prices
+                shared by several users), computed here when not supplied
+            dataroma_service (DataromaService): hedge fund data shared by several reports, scraped here when not supplied
+            runtime_stock_stats_service (RuntimeStockStatsService): fundamentals of (at least) tickers, e.g. backed by a
+                persistent cache or shared by several reports, fetched once for both report sections when not supplied
+        """
         self.cli_command = ""
         self.trades_today = []
         self.stock_stats_today = []
         self.context = context
         self.open_positions = open_positions
+        self.open_position_index = OpenPositionIndex.of(open_positions)
         self.closed_positions = closed_positions
         self.user = user
         self.today_str = today
         self.rapid = rapid
         self.position_stats_service = PositionStatsService(open_positions, closed_positions)
-        self.dataroma_service = DataromaService()
+        self.dataroma_service = dataroma_service if dataroma_service is not None else DataromaService()
+        self.runtime_stock_stats_service = runtime_stock_stats_service
         self.tax_calculator_service = TaxCalculatorService(closed_positions=closed_positions, exchange_rate_service=exchange_rate_service)
-        svc = StockComputeService(tickers, today, open_positions)
+        svc = stock_compute_service
+        if svc is None:
+            # the report only reads the last bars stats
+            svc = StockComputeService(tickers, today, open_positions, stats_history_size=StockComputeService.DEFAULT_DAILY_STATS_RETURNED)
         trades = svc.trades_today()
         # Command line expanded
         self.cli_command = f"trade-today --tickers {tickers}"
@@ -54,11 +73,16 @@ class TradeTodayReportingService():
                 output += stock.as_text() + "\n"
         return output
    
+    def get_runtime_stock_stats_service(self) -> RuntimeStockStatsService:
+        # created on first use, shared by both report sections
+        if self.runtime_stock_stats_service is None:
+            ticker_list = [stock.ticker for stock in self.stock_stats_today]
+            self.runtime_stock_stats_service = RuntimeStockStatsService(ticker_list, self.rapid)
+        return self.runtime_stock_stats_service
+
     def position_from_ticker(self, ticker):
-        for open_position in self.open_positions:
-            if open_position.ticker == ticker:
-                return open_position
-        return None
+        # first position recorded for the ticker
+        return self.open_position_index.first_by_ticker(ticker)
    
     def trades_today_html_section(self):
         oversold_hedge_fund_bought_tickers = []
@@ -88,8 +112,7 @@ class TradeTodayReportingService():
         if not self.rapid:
             output += "<th>Earnings in</th>"
         output += "</tr>"
-        ticker_list = [stock.ticker for stock in self.stock_stats_today]
-        runtime_stock_stats_service = RuntimeStockStatsService(ticker_list, self.rapid)
+        runtime_stock_stats_service = self.get_runtime_stock_stats_service()
         for stock in self.stock_stats_today:
             # exclude stocks with open positions
             if self.position_from_ticker(stock.ticker) is None:
@@ -176,8 +199,7 @@ class TradeTodayReportingService():
     def open_position_performance_html_section(self):
         output = ""
         total_pnl = 0.0
-        ticker_list = [stock.ticker for stock in self.stock_stats_today]
-        runtime_stock_stats_service = RuntimeStockStatsService(ticker_list, self.rapid)
+        runtime_stock_stats_service = self.get_runtime_stock_stats_service()
         stock_stats_sorted_by_pnl = sorted(self.stock_stats_today, key=lambda stats: stats.pnl_pct, reverse=True)
         for stock in stock_stats_sorted_by_pnl:
             position = self.position_from_ticker(stock.ticker)
@@ -291,7 +313,11 @@ class TradeTodayReportingService():
         output += "</table>"
         return output
     
-    def email_html_report(self, simulation=False):
+    def email_html_report(self, simulation=False, report_file=REPORT_FILE):
+        """
+        Args:
+            simulation (bool): also writes the report to report_file
+        """
         output = ""
         output += f"<p>Report for {self.user.capitalize()}</p>"
         output += f"<p><i>Created on {str(datetime.datetime.now()).split('.')[0]}</i></p>"
@@ -312,11 +338,27 @@ class TradeTodayReportingService():
         output += f"<h1>Execution Command</h1>"
         output += f"<p>{self.cli_command}</p>"
         if simulation:
-            with open('temp/trade_advisor_report.html', 'w') as file:
+            with open(report_file, 'w') as file:
                 file.write(output)
         return(f"{len(self.trades_today)} trades today {str(datetime.datetime.now()).split('.')[0]}", output)
     
     def whatsapp_report(self):
         return self.console_report(include_stats=False)
-    
-    
\ No newline at end of file
+
+    def send_report(self, output, email_receiver=None, report_file=REPORT_FILE):
+        """
+        Prints the console report and sends it to `whatsapp`, `email` or `file` (see trade-today --output)
+        Args:
+            report_file (str): file the `file` report is written to, e.g. one per user when several reports are sent concurrently
+        """
+        print(self.console_report())
+        if 'whatsapp' in output:
+            WhatsappNotificationService().send_message(self.whatsapp_report())
+            print("Whatsapp report sent")
+        elif 'email' in output:
+            subject, body = self.email_html_report()
+            EmailNotificationService(email_receiver=email_receiver).send_email(subject, body)
+            print("Email report sent")
+        elif 'file' in output:
+            subject, body = self.email_html_report(simulation=True, report_file=report_file)
+            print(f"Email report written to {report_file}")
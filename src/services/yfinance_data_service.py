@@ -1,35 +1,105 @@
 import datetime
+import hashlib
 import json
 import os
-import boto3
+import numpy as np
 import requests
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from repositories.file_repository import FileRepository
-from time import sleep
+from repositories.indicator_store_repository import IndicatorStoreRepository
+from repositories.price_store_repository import PriceStoreRepository
+from repositories.resource_registry import ResourceRegistry
 
 from repositories.selected_tickers_repository import SelectedTickersRepository
 from repositories.user_repository import UserRepository
+from services.indicator_service import indicator_table
+from services.rate_limiter_service import TokenBucketRateLimiter
+from services.utils_service import parse_date
 
 class YfinanceDataService:
+    # yfinance data files column positions (as loaded by bt.feeds.GenericCSVData in StockComputeService)
+    CSV_COLUMNS = {'datetime': 0, 'close': 1, 'high': 2, 'low': 3, 'open': 4, 'volume': 5}
+    TWELVEDATA_API_URL = "https://api.twelvedata.com/time_series"
+    # TwelveData charges 1 credit per symbol, overridden by TWELVEDATA_CREDITS_PER_MINUTE (plan limit)
+    CREDITS_PER_MINUTE = 8
+    # Concurrent API requests, overridden by TWELVEDATA_MAX_CONCURRENT_REQUESTS
+    MAX_CONCURRENT_REQUESTS = 4
+    # Incremental downloads compact a ticker price store partition once it reaches this number of delta files
+    INCREMENTAL_COMPACTION_THRESHOLD = 5
+    # Concurrent yfinance file downloads from S3, overridden by TRADE_ADVISOR_S3_MAX_CONCURRENT_DOWNLOADS
+    MAX_CONCURRENT_S3_DOWNLOADS = 16
+    MANIFEST_FILE_NAME = 'manifest.json'
+    # Price store sub-folder of the materialised indicators (see materialise_indicators)
+    INDICATOR_STORE_FOLDER = 'indicators'
     def __init__(self):
         self.s3_prefix = os.environ.get('TRADE_ADVISOR_S3_BUCKET', None)
         if self.s3_prefix is None:
             raise Exception("TRADE_ADVISOR_S3_BUCKET environment variable not set")
         self.path_to_yfinance_data_in_s3 = f"{self.s3_prefix}/services/yfinance"
+        self.manifest_path = f"{self.path_to_yfinance_data_in_s3}/{YfinanceDataService.MANIFEST_FILE_NAME}"
+        # Keep-alive connections shared by concurrent API requests
+        self.session = requests.Session()
+
+    @staticmethod
+    def price_store() -> PriceStoreRepository:
+        """ Returns the local price store when TRADE_ADVISOR_PRICE_STORE (local folder) is set, otherwise None """
+        price_store_path = os.environ.get('TRADE_ADVISOR_PRICE_STORE', None)
+        if price_store_path is None:
+            return None
+        return PriceStoreRepository(price_store_path)
+
+    @staticmethod
+    def indicator_store(price_store: PriceStoreRepository) -> IndicatorStoreRepository:
+        """ Returns the daily indicators materialised next to the price store prices (see materialise_indicators) """
+        return IndicatorStoreRepository(os.path.join(price_store.path, YfinanceDataService.INDICATOR_STORE_FOLDER))
+
+    @staticmethod
+    def materialise_indicators(price_store: PriceStoreRepository, tickers_list):
+        """
+        Recomputes the daily indicators of the tickers full price history, so that compute runs warming up from the first
+        stored bar read them instead of replaying the warmup (see VectorizedStrategy indicator_data and indicators_from_store)
+        """
+        indicator_store = YfinanceDataService.indicator_store(price_store)
+        price_data = price_store.load(tickers_list, datetime.date.min, datetime.date.max)
+        for ticker, prices in price_data.items():
+            if len(prices['date']) > 0:
+                indicator_store.save(ticker, indicator_table(prices['date'], prices['close']))
+        print(f"Materialised indicators of {len(price_data)} tickers")
 
     def _transform_api_data_format_to_csv_map(self, api_data: str) -> dict:
         # Returns a dictionary with the key as file name and the value as the csv data
         input_data = json.loads(api_data)
+        if input_data.get('status', None) == 'error':
+            # e.g. incremental request for dates without new data (weekend or holiday)
+            if 'No data is available' in input_data.get('message', ''):
+                return {}
+            raise Exception(f"Failed to download data from TwelveData API: {input_data}")
+        # Single symbol responses are not keyed by symbol
+        if 'meta' in input_data and 'values' in input_data:
+            input_data = {input_data['meta']['symbol']: input_data}
         output = {}
         for ticker, data in input_data.items():
+            if 'values' not in data:
+                print(f"No TwelveData values returned for {ticker}: {data.get('message', data)}")
+                continue
             values = sorted(data["values"], key=lambda x: x["datetime"])
             rows = [f'{v["datetime"]},{v["open"]},{v["high"]},{v["low"]},{v["close"]},{v["volume"]}' for v in values]
             output[f"yfinance_data_{ticker.replace('.','-')}.csv"] = "\n".join(rows)
         return output
 
+    @staticmethod
+    def to_yfinance_csv(price_data) -> str:
+        """ Serialises numpy price columns into yfinance data file content (inverse of parse_yfinance_csv, without header) """
+        columns = sorted(YfinanceDataService.CSV_COLUMNS, key=lambda name: YfinanceDataService.CSV_COLUMNS[name])
+        rows = []
+        for i, date in enumerate(price_data['date']):
+            rows.append(",".join([str(date) if name == 'datetime' else repr(float(price_data[name][i])) for name in columns]))
+        return "\n".join(rows)
+
     def _download_next_batch_of_data_from_api(self, start_date, end_date, tickers) -> str:
         reformatted_tickers = tickers.replace("-", ".")
-        url = "https://api.twelvedata.com/time_series"
+        url = os.environ.get('TWELVEDATA_API_URL', YfinanceDataService.TWELVEDATA_API_URL)
         params = {
             "symbol": reformatted_tickers,
             "interval": "1day",
@@ -37,27 +107,42 @@ class YfinanceDataService:
             "end_date": end_date,
             "apikey": self.api_key
         }
-        response = requests.get(url, params=params)
+        response = self.session.get(url, params=params)
         if response.status_code != 200:
             raise Exception(f"Failed to download data from TwelveData API ({response.status_code}): {response.text}")
         return response.text
 
-    def download_data_from_api(self, start_date, end_date, tickers=None, batch_size=7) -> str:
+    def _rate_limited_download(self, rate_limiter: TokenBucketRateLimiter, start_date, end_date, tickers_to_retrieve) -> str:
+        waited = rate_limiter.acquire(len(tickers_to_retrieve))
+        if waited > 0:
+            print(f"Waited {waited:.1f} seconds for TwelveData credits to retrieve {tickers_to_retrieve}")
+        return self._download_next_batch_of_data_from_api(start_date, end_date, ",".join(tickers_to_retrieve))
+
+    def download_data_from_api(self, start_date, end_date, tickers=None, batch_size=7, incremental=False) -> str:
         """
         Transforms API data from the TwelveData time_series endpoint into a yfinance compatible csv files
-        Retrieves data from the TwelveData API in batches spaced in 1 minute intervals to avoid rate limits.
+        Retrieves data from the TwelveData API in concurrent batches, scheduled by a rate limiter so that no 60 second window
+        exceeds the plan rate limit (TWELVEDATA_CREDITS_PER_MINUTE). Transforms and S3 uploads run while other batches are in flight.
         Args:
             start_date (str): Start date for the data retrieval in 'YYYY-MM-DD' format.
             end_date (str): End date for the data retrieval in 'YYYY-MM-DD' format.
             tickers (list, optional): List of ticker symbols to retrieve data for. If None, will use user selected tickers.
+            incremental (bool): Only retrieve the days after the last date stored for each ticker in the price store
+                (TRADE_ADVISOR_PRICE_STORE), appending them as delta files, and compacting them periodically
+                (see INCREMENTAL_COMPACTION_THRESHOLD). yfinance files uploaded to S3 are rebuilt from the price store.
         """    
         # get list of selected_stock (for all users) unless provided (provided means caller is managing the list)
         self.api_key = os.environ.get('TWELVEDATA_API_KEY', None)
         if self.api_key is None:
             raise Exception("TWELVEDATA_API_KEY environment variable not set")
+        price_store = YfinanceDataService.price_store()
+        if incremental and price_store is None:
+            raise Exception("TRADE_ADVISOR_PRICE_STORE environment variable must be set for incremental downloads")
+        start_date = parse_date(start_date) if isinstance(start_date, str) else start_date
+        end_date = parse_date(end_date) if isinstance(end_date, str) else end_date
         # Get list of selected tickers from user repository
         self.selected_tickers = []
-        users = [user.id for user in UserRepository(f"{self.s3_prefix}/users/users.csv").get_all() if user.id not in ['test', 'utest', 'blank', 'bugfix']]
+        users = [user.id for user in UserRepository(f"{self.s3_prefix}/users/users.csv").get_all() if user.id not in UserRepository.EXCLUDED_USER_IDS]
         for user in users:
             self.selected_tickers += SelectedTickersRepository(f"{self.s3_prefix}/users/{user}/selected_tickers.csv").get_all_as_list()
         self.selected_list = list(set(self.selected_tickers)) 
@@ -65,21 +150,133 @@ class YfinanceDataService:
             tickers_remaining = self.selected_tickers
         else:
             tickers_remaining = tickers.split(',')
-        while len(tickers_remaining) > 0:
-            tickers_to_retrieve = tickers_remaining[:batch_size]
-            tickers_remaining = tickers_remaining[batch_size:]
-            api_data = self._download_next_batch_of_data_from_api(start_date, end_date, ",".join(tickers_to_retrieve))
-            csv_map = self._transform_api_data_format_to_csv_map(api_data)
-            for file_name, csv_data in csv_map.items():
-                FileRepository(f"{self.path_to_yfinance_data_in_s3}/{file_name}").save(csv_data)
-            print(f"Downloaded {len(csv_map)} tickers {tickers_to_retrieve} from TwelveData and uploaded yfinance files to S3 ({len(tickers_remaining)} remaining).")
-            if len(tickers_remaining) > 0:
-                print("Pausing next for 60 seconds to avoid rate limits")
-                sleep(60)
-                
+        if incremental:
+            batches = self._incremental_batches(tickers_remaining, start_date, end_date, price_store.last_dates(), batch_size)
+        else:
+            batches = [(start_date, tickers_remaining[i:i + batch_size]) for i in range(0, len(tickers_remaining), batch_size)]
+        credits_per_minute = float(os.environ.get('TWELVEDATA_CREDITS_PER_MINUTE', YfinanceDataService.CREDITS_PER_MINUTE))
+        max_concurrent_requests = int(os.environ.get('TWELVEDATA_MAX_CONCURRENT_REQUESTS', YfinanceDataService.MAX_CONCURRENT_REQUESTS))
+        if batch_size > credits_per_minute:
+            raise Exception(f"batch_size {batch_size} exceeds the {credits_per_minute} TwelveData credits available per minute")
+        rate_limiter = TokenBucketRateLimiter(credits_per_minute)
+        with ThreadPoolExecutor(max_workers=max_concurrent_requests) as fetch_executor, \
+             ThreadPoolExecutor(max_workers=max_concurrent_requests) as upload_executor:
+            batch_by_future = {fetch_executor.submit(self._rate_limited_download, rate_limiter, batch_start_date, end_date, tickers_to_retrieve):
+                               (batch_start_date, tickers_to_retrieve) for batch_start_date, tickers_to_retrieve in batches}
+            uploads = []
+            # yfinance file name -> manifest entry of the uploaded files
+            manifest_entries = {}
+            stored_tickers = []
+            try:
+                for batches_completed, future in enumerate(as_completed(batch_by_future), start=1):
+                    batch_start_date, tickers_to_retrieve = batch_by_future[future]
+                    csv_map = self._transform_api_data_format_to_csv_map(future.result())
+                    # Price store writes stay on this thread (single DuckDB connection)
+                    if incremental:
+                        csv_map = self._append_to_price_store(csv_map, price_store, start_date)
+                    for file_name, csv_data in csv_map.items():
+                        stored_tickers.append(file_name[len('yfinance_data_'):-len('.csv')])
+                        uploads.append(upload_executor.submit(FileRepository(f"{self.path_to_yfinance_data_in_s3}/{file_name}").save, csv_data))
+                        manifest_entries[file_name] = YfinanceDataService.manifest_entry(csv_data)
+                        if price_store is not None and not incremental:
+                            ticker = file_name[len('yfinance_data_'):-len('.csv')]
+                            price_store.save(ticker, YfinanceDataService.parse_yfinance_csv(csv_data, has_header=False))
+                    print(f"Downloaded {len(csv_map)} tickers {tickers_to_retrieve} from TwelveData since {batch_start_date} and queued yfinance files upload to S3 ({len(batches) - batches_completed} batches remaining).")
+                if price_store is not None:
+                    # while the last uploads complete
+                    YfinanceDataService.materialise_indicators(price_store, stored_tickers)
+                for upload in uploads:
+                    upload.result()
+                self._update_manifest(manifest_entries)
+            except Exception:
+                for future in batch_by_future:
+                    future.cancel()
+                raise
+
+    def _incremental_batches(self, tickers_list, start_date, end_date, last_dates, batch_size) -> list:
+        """
+        Groups tickers by the first date missing in the price store, skipping tickers already up to date
+        Returns:
+            list: (start_date, tickers) tuples, each retrieved with a single API request
+        """
+        tickers_by_start_date = {}
+        for ticker in dict.fromkeys(tickers_list):
+            last_date = last_dates.get(ticker, None)
+            if last_date is None or last_date < start_date:
+                ticker_start_date = start_date
+            else:
+                ticker_start_date = last_date + datetime.timedelta(days=1)
+            if ticker_start_date >= end_date:
+                continue
+            tickers_by_start_date.setdefault(ticker_start_date, []).append(ticker)
+        batches = []
+        for ticker_start_date in sorted(tickers_by_start_date):
+            tickers_to_retrieve = tickers_by_start_date[ticker_start_date]
+            batches += [(ticker_start_date, tickers_to_retrieve[i:i + batch_size]) for i in range(0, len(tickers_to_retrieve), batch_size)]
+        return batches
+
+    def _append_to_price_store(self, csv_map, price_store: PriceStoreRepository, start_date) -> dict:
+        """
+        Appends retrieved rows to the price store as delta files, compacting tickers with too many deltas
+        Returns:
+            dict: yfinance file name -> csv data, rebuilt from the price store since start_date
+        """
+        output = {}
+        for file_name, csv_data in csv_map.items():
+            ticker = file_name[len('yfinance_data_'):-len('.csv')]
+            price_store.append(ticker, YfinanceDataService.parse_yfinance_csv(csv_data, has_header=False))
+            if len(price_store.delta_files(ticker)) >= YfinanceDataService.INCREMENTAL_COMPACTION_THRESHOLD:
+                price_store.compact(ticker)
+            price_data = price_store.load([ticker], start_date, datetime.date.max)[ticker]
+            output[file_name] = YfinanceDataService.to_yfinance_csv(price_data)
+        return output
+
+    @staticmethod
+    def manifest_entry(csv_data) -> dict:
+        """
+        Returns the manifest entry of a yfinance data file (see load_manifest)
+        ETag is the MD5 of the content, as set by S3 for single part uploads
+        """
+        rows = [row for row in csv_data.splitlines() if row.strip() != '']
+        return {'last_date': rows[-1].split(',')[YfinanceDataService.CSV_COLUMNS['datetime']] if len(rows) > 0 else None,
+                'etag': f'"{hashlib.md5(csv_data.encode("utf-8")).hexdigest()}"',
+                'rows': len(rows),
+                'last_modified': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+
+    def load_manifest(self) -> dict:
+        """
+        Loads the yfinance data files manifest, written by download_data_from_api along with the files, with a single GET
+        Returns:
+            dict: yfinance file name -> {'last_date': '2025-05-23', 'etag': '"45aac209401d91d6d1a5edb72949c58a"', 'rows': 200,
+            'last_modified': '2025-05-25T09:33:42.123456+00:00'}, None when there is no manifest
+        """
+        data_as_str = FileRepository(self.manifest_path).load()
+        if data_as_str is None:
+            return None
+        return json.loads(data_as_str)
+
+    def _update_manifest(self, manifest_entries):
+        """ Merges the entries of the files just uploaded into the manifest """
+        if len(manifest_entries) == 0:
+            return
+        manifest = self.load_manifest() or {}
+        manifest.update(manifest_entries)
+        FileRepository(self.manifest_path).save(json.dumps(manifest, indent=4, sort_keys=True))
+
+    def _list_yfinance_data_in_s3(self) -> dict:
+        """ Lists all yfinance data files (every page), for buckets without manifest """
+        s3 = ResourceRegistry.s3_client()
+        entries = {}
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.s3_prefix.replace('s3://', ''), Prefix="services/yfinance/"):
+            for entry in page.get('Contents', []):
+                entries[entry['Key'].split('/')[-1]] = {'last_modified': entry['LastModified'].isoformat(), 'etag': entry['ETag']}
+        return entries
+
     def _check_all_yfinance_data_is_in_s3(self, tickers):
         """
-        Checks if all expected yfinance data files for the given tickers are present and up-to-date in the specified S3 bucket.
+        Checks if all expected yfinance data files for the given tickers are present and up-to-date in the specified S3 bucket,
+        using the manifest (see load_manifest), only listing the bucket for files missing from the manifest.
         Args:
             tickers (str): A comma-separated string of ticker symbols (e.g., "AAPL,GOOG,MSFT").
         Raises:
@@ -88,45 +285,136 @@ class YfinanceDataService:
             Exception: If any yfinance data files in S3 are not up to date (i.e., last modified date is before today).
         Returns:
             list: A list of S3 object entries corresponding to the required yfinance data files.
-            {'Key': 'services/yfinance/yfinance_data_AAPL.csv', 'LastModified': datetime.datetime(2025, 5, 25, 9, 33, 42, tzinfo=tzutc()), 'ETag': '"45aac209401d91d6d1a5edb72949c58a"', 'ChecksumAlgorithm': ['CRC64NVME'], 'Size': 590, 'StorageClass': 'STANDARD'}
+            {'Key': 'services/yfinance/yfinance_data_AAPL.csv', 'LastModified': datetime.datetime(2025, 5, 25, 9, 33, 42, tzinfo=tzutc()), 'ETag': '"45aac209401d91d6d1a5edb72949c58a"'}
         """
-        s3 = boto3.client('s3')
         today = datetime.datetime.today().date()
         path_to_files = "services/yfinance/"
-        tickers = tickers.split(",")
-        expected_ticker_files = [f"{path_to_files}yfinance_data_{ticker}.csv" for ticker in tickers]
-        response = s3.list_objects_v2(Bucket=self.s3_prefix.replace('s3://',''), Prefix=path_to_files)
-        if 'Contents' not in response:
+        manifest = self.load_manifest() or {}
+        expected_files = [f"yfinance_data_{ticker}.csv" for ticker in dict.fromkeys(tickers.split(","))]
+        if any([file not in manifest for file in expected_files]) and self.s3_prefix.startswith("s3://"):
+            # files uploaded before the manifest was introduced
+            print(f"yfinance data files missing from {self.manifest_path}, listing yfinance data files")
+            manifest = {**self._list_yfinance_data_in_s3(), **manifest}
+        if len(manifest) == 0:
             raise Exception("No yfinance data found in S3")
-        entries_in_s3 = [entry for entry in response['Contents']]
-        
+
         # Check all required files are present in S3
-        missing_files = [file for file in expected_ticker_files if file not in [entry['Key'] for entry in entries_in_s3]]
+        missing_files = [f"{path_to_files}{file}" for file in expected_files if file not in manifest]
         if len(missing_files) > 0:
             raise Exception(f"Missing yfinance data files in S3: {missing_files}")
-        required_s3_files_entries = [entry for entry in response['Contents'] if entry['Key'] in expected_ticker_files]
+        required_s3_files_entries = [{'Key': f"{path_to_files}{file}",
+                                      'LastModified': datetime.datetime.fromisoformat(manifest[file]['last_modified']),
+                                      'ETag': manifest[file]['etag']} for file in expected_files]
         # Check all files are up to date
         for entry in required_s3_files_entries:
             if entry['LastModified'].date() < today:
                 raise Exception(f"yfinance data file {entry['Key']} is not up to date in S3, last modified on {entry['LastModified'].date()} (today is {today})")
         return required_s3_files_entries
-    
+
+    def _download_yfinance_files_from_s3(self, s3_files_entries) -> dict:
+        """
+        Downloads the yfinance data files concurrently (at most TRADE_ADVISOR_S3_MAX_CONCURRENT_DOWNLOADS at a time)
+        Returns:
+            dict: S3 key -> file content
+        """
+        max_workers = int(os.environ.get('TRADE_ADVISOR_S3_MAX_CONCURRENT_DOWNLOADS', YfinanceDataService.MAX_CONCURRENT_S3_DOWNLOADS))
+        keys = [entry['Key'] for entry in s3_files_entries]
+        if len(keys) == 0:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as executor:
+            contents = list(executor.map(lambda key: FileRepository(f"{self.s3_prefix}/{key}").load(), keys))
+        missing_keys = [key for key, content in zip(keys, contents) if content is None]
+        if len(missing_keys) > 0:
+            raise Exception(f"Failed to download yfinance data files from S3: {missing_keys}")
+        return dict(zip(keys, contents))
+
     def _download_yfinance_data_from_s3(self, s3_files_entries, temp_directory=None):   
         """
         Downloads the yfinance data files from the specified S3 bucket and saves them to the local file system.
         Args:
             s3_files_entries (list): A list of S3 object entries corresponding to the yfinance data files to download.
         """
-        s3 = boto3.client('s3')
-        # Create temp directory using tempfile.TemporaryDirectory()
-        for entry in s3_files_entries:
-            file_name = entry['Key'].split('/')[-1]
-            response = s3.get_object(Bucket=self.s3_prefix.replace('s3://', ''), Key=entry['Key'])
-            content = response['Body'].read().decode('utf-8')
+        for key, content in self._download_yfinance_files_from_s3(s3_files_entries).items():
+            file_name = key.split('/')[-1]
             FileRepository(f"{temp_directory}/{file_name}").save(content)
 
     def download_required_yfinance_data_to_filesystem(self, tickers, temp_directory) -> str:
         # Ensure yfinance files in s3 are up to date (refreshed today)
         s3_files_entries = self._check_all_yfinance_data_is_in_s3(tickers)
         # Download yfinance-data-store data files to tempfile.TemporaryDirectory()
-        self._download_yfinance_data_from_s3(s3_files_entries, temp_directory)
\ No newline at end of file
+        self._download_yfinance_data_from_s3(s3_files_entries, temp_directory)
+
+    @staticmethod
+    def parse_yfinance_csv(content, from_date=None, to_date=None, has_header=True) -> dict:
+        """
+        Parses yfinance data file content into numpy columns, with the same semantics as bt.feeds.GenericCSVData
+        (empty values are 0.0, bars loaded from from_date up to, but excluding, to_date)
+        Args:
+            content (str): yfinance data file content (see CSV_COLUMNS)
+            from_date (datetime.date, optional): First date to load
+            to_date (datetime.date, optional): Date to stop loading at (excluded)
+            has_header (bool): Skip first line (GenericCSVData default). Files uploaded by download_data_from_api have no header
+        Returns:
+            dict: {'date': datetime64[D] array, 'open', 'high', 'low', 'close', 'volume': float arrays}
+        """
+        columns = YfinanceDataService.CSV_COLUMNS
+        dates = []
+        values = {name: [] for name in columns if name != 'datetime'}
+        lines = content.splitlines()
+        if has_header:
+            lines = lines[1:]
+        # yyyy-mm-dd dates compare as strings, they are converted at once
+        from_date_str = str(from_date) if from_date is not None else None
+        to_date_str = str(to_date) if to_date is not None else None
+        for line in lines:
+            if line.strip() == '':
+                continue
+            fields = line.split(',')
+            date = fields[columns['datetime']]
+            if from_date_str is not None and date < from_date_str:
+                continue
+            if to_date_str is not None and date >= to_date_str:
+                break
+            dates.append(date)
+            for name in values:
+                field = fields[columns[name]]
+                values[name].append(float(field) if field != '' else 0.0)
+        return {'date': np.array(dates, dtype='datetime64[D]'),
+                **{name: np.array(column, dtype=np.float64) for name, column in values.items()}}
+
+    @staticmethod
+    def load_yfinance_data_from_filesystem(tickers_list, directory, from_date, to_date) -> dict:
+        """
+        Loads yfinance_data_{ticker}.csv files from a folder (see parse_yfinance_csv)
+        Returns:
+            dict: ticker -> {'date': datetime64[D] array, 'open', 'high', 'low', 'close', 'volume': float arrays}
+        """
+        price_data = {}
+        for ticker in tickers_list:
+            with open(os.path.join(directory, f'yfinance_data_{ticker}.csv'), 'r', encoding='utf-8') as file:
+                price_data[ticker] = YfinanceDataService.parse_yfinance_csv(file.read(), from_date, to_date)
+        return price_data
+
+    def update_price_store_from_s3(self, tickers, price_store: PriceStoreRepository):
+        """
+        Refreshes the price store partitions which are older than the yfinance data files in S3,
+        so that compute runs only download tickers that changed since the price store was last updated.
+        Args:
+            tickers (str): A comma-separated string of ticker symbols (e.g., "AAPL,GOOG,MSFT").
+            price_store (PriceStoreRepository): Local price store to refresh
+        """
+        s3_files_entries = self._check_all_yfinance_data_is_in_s3(tickers)
+        stale_entries = []
+        for entry in s3_files_entries:
+            ticker = entry['Key'].split('/')[-1][len('yfinance_data_'):-len('.csv')]
+            last_modified = price_store.last_modified(ticker)
+            if last_modified is None or last_modified < entry['LastModified']:
+                stale_entries.append(entry)
+        # Price store writes stay on this thread (single DuckDB connection)
+        refreshed_tickers = []
+        for key, content in self._download_yfinance_files_from_s3(stale_entries).items():
+            ticker = key.split('/')[-1][len('yfinance_data_'):-len('.csv')]
+            price_store.save(ticker, YfinanceDataService.parse_yfinance_csv(content, has_header=False))
+            refreshed_tickers.append(ticker)
+        if refreshed_tickers:
+            YfinanceDataService.materialise_indicators(price_store, refreshed_tickers)
@@ -3,8 +3,11 @@ from __future__ import (absolute_import, division, print_function,
 
 import datetime  # For datetime objects
 import backtrader as bt
+from models.open_position_index import OpenPositionIndex
+from models.stock_daily_stats_ring_buffer import StockDailyStatsRingBuffer
 from schemas.stock_daily_stats import StockDailyStats
 from schemas.trade_action import TradeAction
+from services.indicator_service import MIN_PERIOD
 import matplotlib.pyplot as plt
 
 class BaseStrategy(bt.Strategy):
@@ -17,13 +20,23 @@ class BaseStrategy(bt.Strategy):
             self.single_date_to_trade = datetime.datetime.strptime(self.params.single_date_to_trade, "%Y-%m-%d").date()
         else:
             self.single_date_to_trade = None    
+        # replays (see ReplayService) trade every date from single_date_to_trade to last_date_to_trade
+        if self.params.last_date_to_trade is not None:
+            self.last_date_to_trade = datetime.datetime.strptime(self.params.last_date_to_trade, "%Y-%m-%d").date()
+        else:
+            self.last_date_to_trade = self.single_date_to_trade
         # The attributes below are stored as dictionaries keyed by ticker name (e.g. AMZN)
         self.order = {data._name: None for data in self.datas}
         self.buyprice = {data._name: None for data in self.datas}
         self.buycomm = {data._name: None for data in self.datas}
         self.last_bought_order_date = {data._name: None for data in self.datas}
-        self.stock_daily_stats_list = {data._name: [] for data in self.datas}
+        # Highest close since the open position was bought (see peak_price_since_bought)
+        self.peak_close_since_bought = {data._name: None for data in self.datas}
+        # Stats of every bar, or of the last stats_history_size bars only (see new_stock_daily_stats_history)
+        self.stock_daily_stats_list = {data._name: self.new_stock_daily_stats_history(data._name) for data in self.datas}
         self.stock_pnl = {data._name: 0 for data in self.datas}
+        # Recorded open positions looked up by (ticker, date) on every bar (see buy_position_recorded)
+        self.open_position_index = OpenPositionIndex.of(self.params.open_positions) if self.params.open_positions is not None else None
         # Add the RSI indicator
         self.rsi = {
             data._name: bt.indicators.RSI(data, 
@@ -40,20 +53,50 @@ class BaseStrategy(bt.Strategy):
                                                      devfactor=2,
                                                      plot=True) 
             for data in self.datas }
-        for data in self.datas:
-            self.stock_daily_stats_list[data._name] = []
         # Trade action list
         self.trade_actions = []
         
-    def log(self, txt, dt=None, do_print=False):
-        ''' Logging function for strategy'''
-        if self.params.printlog or do_print:
-            dt = dt or self.datas[0].datetime.date(0)
+    def new_stock_daily_stats_history(self, ticker):
+        # a list of every bar stats, unless bounded by stats_history_size (e.g. trade-today only reads the last bars)
+        if self.params.stats_history_size is None:
+            return []
+        return StockDailyStatsRingBuffer(ticker, self.params.stats_history_size)
+
+    def record_stock_daily_stats(self, ticker, **stats):
+        history = self.stock_daily_stats_list[ticker]
+        if isinstance(history, StockDailyStatsRingBuffer):
+            # stored as an array row, materialised when read
+            history.append_values(**stats)
+        else:
+            history.append(StockDailyStats(ticker=ticker, **stats))
+
+    def log_enabled(self, do_print=False):
+        return self.params.printlog or do_print
+
+    def log(self, txt, *args, dt=None, do_print=False):
+        '''
+        Logging function for strategy, messages are only formatted when logging is enabled (see log_enabled):
+        txt is either a %-style format of args (e.g. self.log('%s BUY CREATE, %.2f', name, close))
+        or a callable returning the message (e.g. self.log(lambda: stats.as_text()))
+        '''
+        if self.log_enabled(do_print):
+            if callable(txt):
+                txt = txt()
+            elif args:
+                txt = txt % args
+            dt = dt or self.datetime.date(0)
             print('%s, %s' % (dt.isoformat(), txt))
 
     def trade_today_mode(self):
         return self.single_date_to_trade is not None
 
+    def replay_mode(self):
+        # trade-today mode over several dates, advised trades are not executed (positions are the recorded ones)
+        return self.trade_today_mode() and self.last_date_to_trade != self.single_date_to_trade
+
+    def is_date_to_trade(self, date):
+        return self.trade_today_mode() and self.single_date_to_trade <= date <= self.last_date_to_trade
+
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             # Buy/Sell order submitted/accepted to/by broker - Nothing to do
@@ -64,30 +107,31 @@ class BaseStrategy(bt.Strategy):
         if order.status in [order.Completed]:
             if order.isbuy():
                 if not self.trade_today_mode():
-                    self.log(
-                        '%s BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                         (order.data._name,
-                        order.executed.price,
-                        order.executed.value,
-                        order.executed.comm))
+                    self.log('%s BUY EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f',
+                             order.data._name,
+                             order.executed.price,
+                             order.executed.value,
+                             order.executed.comm)
 
                 self.buyprice[order.data._name] = order.executed.price
                 self.buycomm[order.data._name] = order.executed.comm
-                self.last_bought_order_date[order.data._name] = self.datas[0].datetime.date(0)
+                self.last_bought_order_date[order.data._name] = order.data.datetime.date(0)
+                self.peak_close_since_bought[order.data._name] = order.data.close[0]
             else:  # Sell
+                self.peak_close_since_bought[order.data._name] = None
                 if not self.trade_today_mode():                
-                    self.log('%s SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f' %
-                            (order.data._name,
-                            order.executed.price,
-                            order.executed.value,
-                            order.executed.comm))
+                    self.log('%s SELL EXECUTED, Price: %.2f, Cost: %.2f, Comm %.2f',
+                             order.data._name,
+                             order.executed.price,
+                             order.executed.value,
+                             order.executed.comm)
 
         elif order.status in [order.Canceled]:
-            self.log('%s Order Canceled' % order.data._name)
+            self.log('%s Order Canceled', order.data._name)
         elif order.status in [order.Margin]:
-            self.log('%s Order Margin' % order.data._name)
+            self.log('%s Order Margin', order.data._name)
         elif order.status in [order.Rejected]:
-            self.log('%s Order Rejected' % order.data._name)
+            self.log('%s Order Rejected', order.data._name)
         # Write down: no pending order
         self.order[order.data._name] = None
 
@@ -95,65 +139,76 @@ class BaseStrategy(bt.Strategy):
         if not trade.isclosed:
             return
         self.stock_pnl[trade.data._name] += trade.pnl
-        self.log('%s OPERATION PROFIT, GROSS %.2f, NET %.2f' %
-                 (trade.data._name, trade.pnl, trade.pnlcomm))
+        self.log('%s OPERATION PROFIT, GROSS %.2f, NET %.2f',
+                 trade.data._name, trade.pnl, trade.pnlcomm)
+
+    def ticker_start_date(self, name):
+        # first date evaluated for the ticker, tickers may have their own window (see StockComputeService ticker_start_dates)
+        if self.params.ticker_start_dates is not None and name in self.params.ticker_start_dates:
+            return self.params.ticker_start_dates[name]
+        return self.params.start_date
 
-    def warmup_buffer(self):
-        # processing date within warmup buffer
-        return self.datas[0].datetime.date(0) < self.params.start_date
+    def warmup_buffer(self, data):
+        # processing date within the ticker warmup buffer (or before its indicators are available)
+        return len(data) < MIN_PERIOD or self.datetime.date(0) < self.ticker_start_date(data._name)
    
     def days_in_buffer(self):
         return len(self)
     
-    def buy_position_recorded(self, name):
+    def buy_position_recorded(self, name, date=None):
+        # last position recorded for the ticker on date (defaults to the current bar date)
         open_position_recorded = None
-        if self.params.open_positions is not None:
-            for position in self.params.open_positions:
-                if position.ticker == name and position.date == self.datas[0].datetime.date(0):
-                    open_position_recorded = position
+        if self.open_position_index is not None:
+            positions = self.open_position_index.get(name, date if date is not None else self.datetime.date(0))
+            if positions:
+                open_position_recorded = positions[-1]
         return open_position_recorded
     
     def peak_price_since_bought(self, data):
-        # Walk back until position date (negative) index is found
-        index = 0
-        j = 0
+        # Running maximum maintained by notify_order (bought bar close) and next (closes since), O(1) per call
         peak_price = self.getposition(data).price
-        
-        order_date = self.last_bought_order_date[data._name]
-        while order_date != data.datetime.date(index) and j < self.days_in_buffer():
-            index -= 1
-            j += 1
-        # Now calculate max from than index forward
-        for k in range(index, 1):
-            peak_price = max(peak_price, data.close[k])
+        if self.peak_close_since_bought[data._name] is not None:
+            peak_price = max(peak_price, self.peak_close_since_bought[data._name])
         return peak_price
+
+    def update_peak_close_since_bought(self):
+        for data in self.datas:
+            peak_close = self.peak_close_since_bought[data._name]
+            if peak_close is not None and data.close[0] > peak_close:
+                self.peak_close_since_bought[data._name] = data.close[0]
    
     def pnl_perc(self, data):
         return round((1 - (self.getposition(data).price / data.close[0])) * 100, 2)
     
+    def prenext(self):
+        # Tickers with a shorter window start later, the others are evaluated meanwhile (see warmup_buffer)
+        self.next()
+
     def next(self):
+        # Updated for all tickers before the loop below (which returns early)
+        self.update_peak_close_since_bought()
         for data in self.datas:
             # Warm-up RSI for rsi_warmup_in_days
-            if self.warmup_buffer():
-                return
+            if self.warmup_buffer(data):
+                continue
             # Simply log the closing price of the series from the reference
             pnl_perc = 0
             if self.getposition(data):
                 pnl_perc = self.pnl_perc(data)
             rsi_crossover_signal = self.rsi[data._name][0] > self.rsi_ma[data._name][0] and self.rsi[data._name][-1] < self.rsi_ma[data._name][-1]
-            stock_stats = StockDailyStats(date=str(self.datas[0].datetime.date(0)), 
-                                          ticker = data._name, 
-                                          close = round(data.close[0], 2), 
-                                          rsi = round(self.rsi[data._name][0], 2), 
-                                          rsi_ma = round(self.rsi_ma[data._name][0], 2),
-                                          rsi_crossover_signal = rsi_crossover_signal,
-                                          bb_top = self.b_band[data._name].lines.top[0],
-                                          bb_mid = self.b_band[data._name].lines.mid[0],
-                                          bb_bot = self.b_band[data._name].lines.bot[0],
-                                          position = round(self.getposition(data).price, 2), 
-                                          pnl_pct = pnl_perc)
-            self.stock_daily_stats_list[data._name].append(stock_stats)
-            self.log(stock_stats.as_text(include_date=False))
+            self.record_stock_daily_stats(data._name,
+                                          date=self.datetime.date(0),
+                                          close=round(data.close[0], 2),
+                                          rsi=round(self.rsi[data._name][0], 2),
+                                          rsi_ma=round(self.rsi_ma[data._name][0], 2),
+                                          rsi_crossover_signal=rsi_crossover_signal,
+                                          bb_top=self.b_band[data._name].lines.top[0],
+                                          bb_mid=self.b_band[data._name].lines.mid[0],
+                                          bb_bot=self.b_band[data._name].lines.bot[0],
+                                          position=round(self.getposition(data).price, 2),
+                                          pnl_pct=pnl_perc)
+            # stats are only materialised and formatted when logged
+            self.log(lambda: self.stock_daily_stats_list[data._name][-1].as_text(include_date=False))
 
             # Check if an order is pending ... if yes, we cannot send a 2nd one
             if self.order[data._name]:
@@ -165,13 +220,14 @@ class BaseStrategy(bt.Strategy):
                 position_recorded = self.buy_position_recorded(data._name)
                 buy_action = self.buy_action(data._name)
                 if position_recorded:
-                    self.log(f'{data._name} BUY RECORDED, {position_recorded.price:.2f}')
+                    self.log('%s BUY RECORDED, %.2f', data._name, position_recorded.price)
                     self.order[data._name] = self.buy(data=data, size=position_recorded.size, price=position_recorded.price)
                 elif buy_action is not None:
                     # BUY, BUY, BUY!!! (with all possible default parameters)
-                    self.log(f'{data._name} BUY CREATE, {data.close[0]:.2f}')
+                    self.log('%s BUY CREATE, %.2f', data._name, data.close[0])
                     # Buy dollar ammount
-                    self.order[data._name] = self.buy(data=data, size=float(self.params.fixed_investment_amount / data.close[0]))
+                    if not self.replay_mode():
+                        self.order[data._name] = self.buy(data=data, size=float(self.params.fixed_investment_amount / data.close[0]))
                     buy_action.context = [s.as_text() for s in self.stock_daily_stats_list[data._name][-BaseStrategy.TRADE_ACTION_CONTEXT_SIZE:]]
                     self.trade_actions.append(buy_action)
                     if self.params.print_trade_actions:
@@ -181,9 +237,10 @@ class BaseStrategy(bt.Strategy):
                 sell_action = self.sell_action(data._name)
                 if sell_action:
                     # SELL, SELL, SELL!!! (with all possible default parameters)
-                    self.log('%s SELL CREATE, %.2f' % (data._name, data.close[0]))
+                    self.log('%s SELL CREATE, %.2f', data._name, data.close[0])
                     # Sell position
-                    self.order[data._name] = self.sell(data = data, size = self.getposition(data).size)
+                    if not self.replay_mode():
+                        self.order[data._name] = self.sell(data = data, size = self.getposition(data).size)
                     sell_action.context = [s.as_text() for s in self.stock_daily_stats_list[data._name][-BaseStrategy.TRADE_ACTION_CONTEXT_SIZE:]]
                     self.trade_actions.append(sell_action)
                     if self.params.print_trade_actions:
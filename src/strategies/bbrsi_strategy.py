@@ -12,6 +12,7 @@ from strategies.base_strategy import BaseStrategy
 class BbRsiStrategy(BaseStrategy):
     params = (
         ('start_date', None),
+        ('ticker_start_dates', None), # ticker -> first date evaluated, start_date for other tickers
         ('printlog', False),
         ('print_trade_actions', False),
         ('upper_rsi', 60), # TODO: Remove - Not in use in this strategy
@@ -26,6 +27,8 @@ class BbRsiStrategy(BaseStrategy):
         ('inflection_profit_percentage_target', 5), # 5 showed best outcome for 5 year backtest
         ('fixed_investment_amount', 4000),
         ('single_date_to_trade', None), # date string expected (e.g. 2023-12-31)
+        ('last_date_to_trade', None), # replays trade every date from single_date_to_trade to this date string
+        ('stats_history_size', None), # keep stats of the last bars only (e.g. TRADE_ACTION_CONTEXT_SIZE), all bars if None
         ('custom_callback', None),
         ('open_positions', None)
     )
@@ -40,7 +43,7 @@ class BbRsiStrategy(BaseStrategy):
         if data.close[-1] < self.b_band[name].lines.bot[-1] \
             and data.close[0] > self.b_band[name].lines.bot[0]\
             and self.rsi[name][0] < self.params.lower_rsi: # rsi below threshold
-            buy_action = TradeAction(date=self.datas[0].datetime.date(0), action="BUY", ticker=name)
+            buy_action = TradeAction(date=self.datetime.date(0), action="BUY", ticker=name)
             buy_action.reason = f"{name} Close ({data.close[-1]:.2f},{data.close[0]:.2f}) above Bollinger bottom ({self.b_band[name].lines.bot[0]:.2f}) while RSI ({self.rsi[name][0]:.2f}) below {self.params.lower_rsi:.2f}"
         return buy_action
 
@@ -48,14 +51,12 @@ class BbRsiStrategy(BaseStrategy):
         ret_buy_action = None
         # TODO: Buy when lower bb is crossed and 
         data = self.getdatabyname(name)
-        is_todays_date = self.single_date_to_trade == self.datas[0].datetime.date(0)
+        # Not current-trade-day, the action (and its reason) is not built
+        if self.trade_today_mode() and not self.is_date_to_trade(self.datetime.date(0)):
+            return ret_buy_action
         # Bollinger bottom band upwards crossover
         buy_action = self.buy_upon_bb_bot_upwards_crossover_with_rsi_reenforcement(name, data)
-        if not self.trade_today_mode():
-            buy = buy_action is not None
-        else:
-            buy = buy_action is not None and is_todays_date
-        if buy:
+        if buy_action is not None:
             ret_buy_action = buy_action
         return ret_buy_action
       
@@ -69,7 +70,7 @@ class BbRsiStrategy(BaseStrategy):
             and self.pnl_perc(data) > self.params.inflection_profit_percentage_target\
             and data.close[0] < data.close[-2] # close recovery seen in last close compared to hat peak
         if condition:
-            sell_action = TradeAction(date=self.datas[0].datetime.date(0), action="SELL", ticker=name)
+            sell_action = TradeAction(date=self.datetime.date(0), action="SELL", ticker=name)
             sell_action.reason = f"{name} Bollinger mid inflection sustained ({self.b_band[name].lines.mid[-3]:.2f}, {self.b_band[name].lines.mid[-2]:.2f}, {self.b_band[name].lines.mid[-1]:.2f}, {self.b_band[name].lines.mid[0]:.2f}) - pnl-pct: {self.pnl_perc(data)}%"
 
         return sell_action
@@ -79,7 +80,7 @@ class BbRsiStrategy(BaseStrategy):
         condition = data.close[0] < self.b_band[name].lines.bot[0] \
             and ((1-(data.close[0] / self.getposition(data).price))*100) > self.params.bb_low_crossover_loss_tolerance
         if condition:
-            sell_action  = TradeAction(date=self.datas[0].datetime.date(0), action="SELL", ticker=name)
+            sell_action  = TradeAction(date=self.datetime.date(0), action="SELL", ticker=name)
             sell_action.reason = f"{name} Close ({data.close[-1]:.2f}, {data.close[0]:.2f}) below Bollinger bottom ({self.b_band[name].lines.bot[0]:.2f}) and loss above {self.params.bb_low_crossover_loss_tolerance}% - pnl-pct: {self.pnl_perc(data)}%"
         return sell_action
    
@@ -87,7 +88,7 @@ class BbRsiStrategy(BaseStrategy):
         sell_action = None
         condition = data.close[0] < self.getposition(data).price * (1-(self.params.loss_pct_threshold / 100))
         if condition:
-            sell_action  = TradeAction(date=self.datas[0].datetime.date(0), action="SELL", ticker=name)
+            sell_action  = TradeAction(date=self.datetime.date(0), action="SELL", ticker=name)
             sell_action.reason = f"{name} Close ({data.close[-1]:.2f}, {data.close[0]:.2f}) loss of {abs(self.pnl_perc(data))}% (above {self.params.loss_pct_threshold}% tolerance)"
         return sell_action
     
@@ -97,7 +98,7 @@ class BbRsiStrategy(BaseStrategy):
         data = self.getdatabyname(name)
         # Nothing to sell or not current-trade-day
         if not self.getposition(data) or \
-            (self.trade_today_mode() and self.single_date_to_trade != self.datas[0].datetime.date(0)):
+            (self.trade_today_mode() and not self.is_date_to_trade(self.datetime.date(0))):
             return False
         else:
             sell_action = self.sell_upon_bb_mid_hat_inflection(name, data)
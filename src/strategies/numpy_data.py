@@ -0,0 +1,42 @@
+import datetime
+
+import backtrader as bt
+import numpy as np
+
+class NumpyData(bt.feed.DataBase):
+    """
+    Backtrader data feed serving bars straight from in-memory price columns (see PriceStoreRepository.load):
+    dataname={'date': datetime64[D] array, 'open', 'high', 'low', 'close', 'volume': float arrays}.
+    Dates are converted to backtrader float dates once, as whole columns, and bars are copied from the arrays without any parsing,
+    so the same price columns can feed many Cerebro runs (e.g. optimisation backtests).
+    Columns may be any array-like numpy can convert without copying (e.g. Arrow arrays).
+    Bars are timestamped at midnight, as per bt.feeds.PandasData (openinterest is not set).
+    """
+    COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+    # backtrader float date (see bt.date2num) of 1970-01-01, numpy datetime64 epoch
+    EPOCH_DATE_NUM = float(datetime.date(1970, 1, 1).toordinal())
+
+    def __init__(self):
+        super(NumpyData, self).__init__()
+        self._datetime = NumpyData.date2num_column(self.p.dataname['date'])
+        self._columns = [(getattr(self.lines, name), np.asarray(self.p.dataname[name], dtype=np.float64)) for name in NumpyData.COLUMNS]
+
+    @staticmethod
+    def date2num_column(dates) -> np.ndarray:
+        """ Converts a datetime64 column into backtrader float dates (midnight of each date) """
+        return np.asarray(dates).astype('datetime64[D]').astype(np.int64) + NumpyData.EPOCH_DATE_NUM
+
+    def start(self):
+        super(NumpyData, self).start()
+        # reset the position with each start
+        self._idx = -1
+
+    def _load(self):
+        self._idx += 1
+        if self._idx >= len(self._datetime):
+            # exhausted all bars
+            return False
+        self.lines.datetime[0] = self._datetime[self._idx]
+        for line, values in self._columns:
+            line[0] = values[self._idx]
+        return True
@@ -12,6 +12,7 @@ from strategies.base_strategy import BaseStrategy
 class RsiStrategy(BaseStrategy):
     params = (
         ('start_date', None),
+        ('ticker_start_dates', None), # ticker -> first date evaluated, start_date for other tickers
         ('printlog', False),
         ('print_trade_actions', False),
         ('upper_rsi', 60),
@@ -20,6 +21,8 @@ class RsiStrategy(BaseStrategy):
         ('profit_protection_pct_threshold', 0), # 0 = allow profit to come down to 0%
         ('fixed_investment_amount', 3000),
         ('single_date_to_trade', None), # date string expected (e.g. 2023-12-31)
+        ('last_date_to_trade', None), # replays trade every date from single_date_to_trade to this date string
+        ('stats_history_size', None), # keep stats of the last bars only (e.g. TRADE_ACTION_CONTEXT_SIZE), all bars if None
         ('custom_callback', None),
         ('open_positions', None)
     )
@@ -32,25 +35,25 @@ class RsiStrategy(BaseStrategy):
         # Buy when RSI goes over RSI-MA while under lower_rsi
         rsi_below_lower_threshold = self.rsi[name][0] < self.params.lower_rsi
         rsi_crossed_above_rsi_ma = self.rsi[name][-1] < self.rsi_ma[name][-1] and self.rsi[name][0] > self.rsi_ma[name][0]
-        is_todays_date = self.single_date_to_trade == self.datas[0].datetime.date(0)
+        is_todays_date = self.is_date_to_trade(self.datetime.date(0))
         if not self.trade_today_mode():
             buy = rsi_below_lower_threshold and rsi_crossed_above_rsi_ma
         else:
             buy = rsi_below_lower_threshold and rsi_crossed_above_rsi_ma and is_todays_date
         if buy:
-            buy_action = TradeAction(date=self.datas[0].datetime.date(0), action="BUY", ticker=name)
+            buy_action = TradeAction(date=self.datetime.date(0), action="BUY", ticker=name)
             buy_action.reason = f"{name} RSI: {self.rsi[name][0]:.2f} (yesterday={self.rsi[name][-1]:.2f}) above RSI-MA {self.rsi_ma[name][0]:.2f} under RSI < {self.params.lower_rsi:.2f} threshold"
         return buy_action
        
     def sell_action(self, name):
-        sell_action = TradeAction(date=self.datas[0].datetime.date(0), action="SELL", ticker=name)
+        sell_action = None
         # Sell when RSI crosses over RSI-based-MA coming down above RSI 60, or when position showing 10% loss
         data = self.getdatabyname(name)
         reached_maximum_tolerated_loss = False
         reached_maximum_profit_loss_tolerance = False
         # Nothing to sell or not current-trade-day
         if not self.getposition(data) or \
-            (self.trade_today_mode() and self.single_date_to_trade != self.datas[0].datetime.date(0)):
+            (self.trade_today_mode() and not self.is_date_to_trade(self.datetime.date(0))):
             return False
         else:
             # Profitable position
@@ -63,6 +66,8 @@ class RsiStrategy(BaseStrategy):
                 profit_pct =  current_per_share_profit / peak_share_profit * 100
                 if profit_pct < self.params.profit_protection_pct_threshold:
                     reached_maximum_profit_loss_tolerance = True
+                    # action (and its reason) only built when selling
+                    sell_action = TradeAction(date=self.datetime.date(0), action="SELL", ticker=name)
                     sell_action.reason = f"{name} Maximum profit loss tolerance reached {self.params.profit_protection_pct_threshold}% Selling with {profit_pct:.2f}% profit"
                     self.log(sell_action.reason)
             else:
@@ -70,6 +75,7 @@ class RsiStrategy(BaseStrategy):
                 percent = self.params.loss_pct_threshold
                 pnl_perc = 1 - (self.getposition(data).price / data.close[0])
                 if pnl_perc < -1 * (percent/100):
+                    sell_action = TradeAction(date=self.datetime.date(0), action="SELL", ticker=name)
                     sell_action.reason = f"{name} Maximum tolerated loss reached {percent:.2f}% Selling with {pnl_perc*100*-1:.2f}% loss"
                     self.log(sell_action.reason)
                     reached_maximum_tolerated_loss = True
@@ -81,10 +87,9 @@ class RsiStrategy(BaseStrategy):
     def stop(self):
         if not self.trade_today_mode():
             #TODO: Make log statment more generic and push to parent class
-            self.log(f'RSI: {self.params.upper_rsi}/{self.params.lower_rsi}, ' +
-                    f'loss_pct: {self.params.loss_pct_threshold}, '
-                    f'investment: {self.params.fixed_investment_amount}, '
-                    f'End portfolio value: {round(self.broker.getvalue())}')
+            self.log('RSI: %s/%s, loss_pct: %s, investment: %s, End portfolio value: %s',
+                     self.params.upper_rsi, self.params.lower_rsi, self.params.loss_pct_threshold,
+                     self.params.fixed_investment_amount, round(self.broker.getvalue()))
         if self.params.custom_callback is not None:
             self.params.custom_callback(self)
 
@@ -0,0 +1,244 @@
+import datetime
+import types
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+
+from models.open_position_index import OpenPositionIndex
+from services.indicator_service import MIN_PERIOD, compute_indicators, indicators_from_store
+from strategies.base_strategy import BaseStrategy
+
+
+class ArrayLine:
+    """
+    Exposes a numpy column with backtrader line indexing ([0] current bar, [-1] previous bar, ...)
+    rows maps each calendar index to the column row of the last bar on or before that date, so that (as per backtrader)
+    a ticker without a bar on a date keeps its previous bar
+    """
+    def __init__(self, values, cursor, rows):
+        self.values = values
+        self.cursor = cursor
+        self.rows = rows
+
+    def __getitem__(self, index):
+        return float(self.values[self.rows[self.cursor.index] + index])
+
+
+class ArrayData:
+    """Exposes a ticker price columns as a backtrader data feed (close, open, datetime and _name)"""
+    def __init__(self, name, price_data, cursor, rows):
+        self._name = name
+        self.cursor = cursor
+        self.rows = rows
+        self.dates = price_data['date']
+        self.open = ArrayLine(price_data['open'], cursor, rows)
+        self.close = ArrayLine(price_data['close'], cursor, rows)
+        self.datetime = SimpleNamespace(date=self.date)
+
+    def date(self, index=0):
+        return self.dates[self.rows[self.cursor.index] + index].astype(datetime.date)
+
+
+class ArrayPosition:
+    def __init__(self, size=0, price=0.0):
+        self.size = size
+        self.price = price
+
+    def __bool__(self):
+        return self.size != 0
+
+
+class VectorizedStrategy:
+    """
+    Trade-today engine computing the same StockDailyStats and TradeAction lists as a BaseStrategy subclass
+    (RsiStrategy, BbRsiStrategy) run through backtrader, but using whole-column indicator arrays.
+    Indicators are computed once per ticker (see indicator_service) and only the bars from start_date onwards are
+    evaluated. Buy/sell rules are the strategy own methods, bound to array backed lines, so both engines share them.
+    Orders are filled at the ticker next bar open, as per backtrader default broker.
+    Bars are stepped through the calendar of all tickers, which may be loaded over windows starting on different dates
+    (see StockComputeService ticker_start_dates) and miss some bars: as per backtrader datetime synchronisation,
+    a ticker is evaluated from its own start date, keeping its previous bar on dates it has no bar for.
+    indicator_cache (dict, optional) shares indicators between runs over the same prices (e.g. one run per user)
+    indicator_state_service (IndicatorStateService, optional) advances persisted indicator states instead of replaying the warmup
+    indicator_data (dict, optional) ticker -> indicators materialised in the price store (see IndicatorStoreRepository),
+        used instead of computing them for tickers whose stored close matches every price bar
+    """
+    def __init__(self, strategy, price_data: Dict[str, Dict[str, np.ndarray]], initial_cash, indicator_cache=None,
+                 indicator_state_service=None, indicator_data=None, **kwargs):
+        self.strategy_class = strategy
+        self.params = SimpleNamespace(**{**strategy.params._getpairs(), **kwargs})
+        if self.params.single_date_to_trade is None:
+            raise Exception("VectorizedStrategy only supports trade-today mode (single_date_to_trade must be set)")
+        self.single_date_to_trade = datetime.datetime.strptime(self.params.single_date_to_trade, "%Y-%m-%d").date()
+        if self.params.last_date_to_trade is not None:
+            self.last_date_to_trade = datetime.datetime.strptime(self.params.last_date_to_trade, "%Y-%m-%d").date()
+        else:
+            self.last_date_to_trade = self.single_date_to_trade
+        self.cash = initial_cash
+        self.cursor = SimpleNamespace(index=0)
+        self.tickers = list(price_data.keys())
+        self.price_data = price_data
+        # trading calendar of all tickers
+        self.dates = np.unique(np.concatenate([price_data[ticker]['date'] for ticker in self.tickers])) if self.tickers \
+            else np.array([], dtype='datetime64[D]')
+        # calendar index -> row of each ticker last bar on or before that date (-1 before its first bar)
+        self.rows = {ticker: np.searchsorted(price_data[ticker]['date'], self.dates, side='right') - 1 for ticker in self.tickers}
+        self.datetime = SimpleNamespace(date=self.date)
+        self.data_by_name = {ticker: ArrayData(ticker, price_data[ticker], self.cursor, self.rows[ticker]) for ticker in self.tickers}
+        self.datas = [self.data_by_name[ticker] for ticker in self.tickers]
+        self.indicator_state_service = indicator_state_service
+        self.indicator_data = indicator_data
+        self.rsi = {}
+        self.rsi_ma = {}
+        self.b_band = {}
+        # calendar index of the first bar evaluated for each ticker
+        self.first_indexes = {ticker: self.first_index(ticker) for ticker in self.tickers}
+        for ticker in self.tickers:
+            indicators = self.ticker_indicators(ticker, indicator_cache)
+            rows = self.rows[ticker]
+            self.rsi[ticker] = ArrayLine(indicators['rsi'], self.cursor, rows)
+            self.rsi_ma[ticker] = ArrayLine(indicators['rsi_ma'], self.cursor, rows)
+            self.b_band[ticker] = SimpleNamespace(lines=SimpleNamespace(
+                top=ArrayLine(indicators['bb_top'], self.cursor, rows),
+                mid=ArrayLine(indicators['bb_mid'], self.cursor, rows),
+                bot=ArrayLine(indicators['bb_bot'], self.cursor, rows)))
+        self.positions = {ticker: ArrayPosition() for ticker in self.tickers}
+        self.peak_close_since_bought = {ticker: None for ticker in self.tickers}
+        self.open_position_index = OpenPositionIndex.of(self.params.open_positions) if self.params.open_positions is not None else None
+        self.pending_orders = []
+        self.stock_daily_stats_list = {ticker: self.new_stock_daily_stats_history(ticker) for ticker in self.tickers}
+        self.trade_actions = []
+        self.run()
+
+    def compute_ticker_indicators(self, ticker):
+        dates = self.price_data[ticker]['date']
+        if self.indicator_data is not None:
+            indicators = indicators_from_store(self.indicator_data.get(ticker), dates, self.price_data[ticker]['close'])
+            if indicators is not None:
+                return indicators
+        first_row = self.first_row(ticker)
+        if self.indicator_state_service is None or first_row >= len(dates):
+            return compute_indicators(self.price_data[ticker]['close'])
+        # previous bar indicators are read by the first evaluated bar (crossovers)
+        return self.indicator_state_service.indicators(ticker, self.price_data[ticker], dates[first_row - 1])
+
+    def ticker_indicators(self, ticker, indicator_cache):
+        if indicator_cache is None:
+            return self.compute_ticker_indicators(ticker)
+        dates = self.price_data[ticker]['date']
+        # indicators depend on the first bar (warmup), so runs over different windows do not share them
+        key = (ticker, str(dates[0]), str(dates[-1]), len(dates)) if len(dates) > 0 else (ticker,)
+        if self.indicator_state_service is not None:
+            # bars covered by the indicator state tail depend on the first evaluated bar
+            key += (self.first_row(ticker),)
+        if key not in indicator_cache:
+            indicator_cache[key] = self.compute_ticker_indicators(ticker)
+        return indicator_cache[key]
+
+    def __getattr__(self, name):
+        # Strategy rules (e.g. buy_action, sell_action, pnl_perc) are bound to this instance
+        attribute = getattr(self.strategy_class, name)
+        if isinstance(attribute, types.FunctionType):
+            return types.MethodType(attribute, self)
+        return attribute
+
+    def date(self, index=0):
+        return self.dates[self.cursor.index + index].astype(datetime.date)
+
+    def getdatabyname(self, name):
+        return self.data_by_name[name]
+
+    def getposition(self, data):
+        return self.positions[data._name]
+
+    def trade_today_mode(self):
+        return True
+
+    def execute_pending_orders(self):
+        unfilled_orders = []
+        for ticker, size, created_row in self.pending_orders:
+            row = self.rows[ticker][self.cursor.index]
+            if row <= created_row:
+                # no new bar for the ticker yet
+                unfilled_orders.append((ticker, size, created_row))
+                continue
+            price = self.price_data[ticker]['open'][row]
+            position = self.positions[ticker]
+            if size > 0:
+                if size * price > self.cash:
+                    continue # backtrader rejects the order (margin)
+                self.cash -= size * price
+                position.price = float(price)
+                position.size = size
+                self.peak_close_since_bought[ticker] = float(self.price_data[ticker]['close'][row])
+            else:
+                self.cash += position.size * price
+                position.size = 0
+                position.price = 0.0
+                self.peak_close_since_bought[ticker] = None
+        self.pending_orders = unfilled_orders
+
+    def first_index(self, ticker):
+        """ Calendar index of the ticker first bar evaluated by next (its start date, once indicators are available) """
+        dates = self.price_data[ticker]['date']
+        start_index = int(np.searchsorted(self.dates, np.datetime64(self.ticker_start_date(ticker), 'D')))
+        if len(dates) < MIN_PERIOD:
+            return len(self.dates)
+        return max(start_index, int(np.searchsorted(self.dates, dates[MIN_PERIOD - 1])))
+
+    def first_row(self, ticker):
+        """ Row of the ticker first bar evaluated by next (see first_index) """
+        first_index = self.first_indexes[ticker]
+        return int(self.rows[ticker][first_index]) if first_index < len(self.dates) else len(self.price_data[ticker]['date'])
+
+    def run(self):
+        first_index = min(self.first_indexes.values()) if self.tickers else 0
+        for index in range(first_index, len(self.dates)):
+            self.cursor.index = index
+            self.next()
+
+    def next(self):
+        self.execute_pending_orders()
+        self.update_peak_close_since_bought()
+        date = self.date(0)
+        for data in self.datas:
+            name = data._name
+            if self.cursor.index < self.first_indexes[name]:
+                continue
+            position = self.positions[name]
+            pnl_perc = self.pnl_perc(data) if position else 0
+            rsi_crossover_signal = self.rsi[name][0] > self.rsi_ma[name][0] and self.rsi[name][-1] < self.rsi_ma[name][-1]
+            self.record_stock_daily_stats(name,
+                                          date=date,
+                                          close=round(data.close[0], 2),
+                                          rsi=round(self.rsi[name][0], 2),
+                                          rsi_ma=round(self.rsi_ma[name][0], 2),
+                                          rsi_crossover_signal=rsi_crossover_signal,
+                                          bb_top=self.b_band[name].lines.top[0],
+                                          bb_mid=self.b_band[name].lines.mid[0],
+                                          bb_bot=self.b_band[name].lines.bot[0],
+                                          position=round(position.price, 2),
+                                          pnl_pct=pnl_perc)
+            # as per BaseStrategy.next, formatted only when printlog is set
+            self.log(lambda: self.stock_daily_stats_list[name][-1].as_text(include_date=False))
+            if any([ticker == name for ticker, _, _ in self.pending_orders]):
+                # as per BaseStrategy.next, bar evaluation stops on a ticker whose order is not filled yet (missing bar)
+                return
+            if not position:
+                position_recorded = self.buy_position_recorded(name, date)
+                buy_action = self.buy_action(name)
+                if position_recorded:
+                    self.pending_orders.append((name, position_recorded.size, self.rows[name][self.cursor.index]))
+                elif buy_action is not None:
+                    if not self.replay_mode():
+                        self.pending_orders.append((name, float(self.params.fixed_investment_amount / data.close[0]), self.rows[name][self.cursor.index]))
+                    buy_action.context = [s.as_text() for s in self.stock_daily_stats_list[name][-BaseStrategy.TRADE_ACTION_CONTEXT_SIZE:]]
+                    self.trade_actions.append(buy_action)
+            else:
+                sell_action = self.sell_action(name)
+                if sell_action:
+                    if not self.replay_mode():
+                        self.pending_orders.append((name, -position.size, self.rows[name][self.cursor.index]))
+                    sell_action.context = [s.as_text() for s in self.stock_daily_stats_list[name][-BaseStrategy.TRADE_ACTION_CONTEXT_SIZE:]]
+                    self.trade_actions.append(sell_action)
@@ -5,7 +5,7 @@ from services.open_position_service import OpenPositionService
 from services.stock_compute_service import StockComputeService
 from test.utils import *
 from click.testing import CliRunner
-from cli.cli import trade_today
+from cli.cli import get_exchange_rate_service, trade_today
 import pytest
 import pytest
 import pytest
@@ -49,4 +49,12 @@ def test_cli_with_file_output():
     load_dotenv()
     runner = CliRunner()
     result = runner.invoke(trade_today, ['-u', 'bugfix', '-o', 'file', '-r'])
-    assert result.exit_code == 0
\ No newline at end of file
+    assert result.exit_code == 0
+
+def test_exchange_rate_service_time_series(tmp_path, monkeypatch):
+    monkeypatch.setenv('OPEN_EXCHANGE_APP_ID', 'test')
+    monkeypatch.setenv('TRADE_ADVISOR_RATE_STORE', str(tmp_path / "rate_store"))
+    monkeypatch.delenv('OPEN_EXCHANGE_TIME_SERIES', raising=False)
+    assert not get_exchange_rate_service(False).time_series
+    monkeypatch.setenv('OPEN_EXCHANGE_TIME_SERIES', 'true')
+    assert get_exchange_rate_service(False).time_series
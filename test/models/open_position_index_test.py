@@ -0,0 +1,24 @@
+import datetime
+from models.open_position import OpenPosition
+from models.open_position_index import OpenPositionIndex
+
+def test_open_position_index():
+    first_amzn = OpenPosition(datetime.date(2024, 1, 2), "AMZN", 10.0, 150.0, "USD")
+    second_amzn = OpenPosition(datetime.date(2024, 2, 1), "AMZN", 5.0, 160.0, "USD")
+    novn = OpenPosition(datetime.date(2024, 1, 2), "NOVN", 20.0, 90.0, "CHF")
+    index = OpenPositionIndex([first_amzn, novn, second_amzn])
+    assert index.get("AMZN", datetime.date(2024, 1, 2)) == [first_amzn]
+    assert index.get("AMZN", datetime.date(2024, 1, 3)) == []
+    assert index.get_by_ticker("AMZN") == [first_amzn, second_amzn]
+    assert index.get_by_ticker("MSFT") == []
+    assert index.first_by_ticker("AMZN") == first_amzn
+    assert index.first_by_ticker("MSFT") is None
+    assert index.tickers() == ["AMZN", "NOVN"]
+    # list-like, in supplied order
+    assert len(index) == 3
+    assert index[0] == first_amzn
+    assert list(index) == [first_amzn, novn, second_amzn]
+    # an index is shared rather than rebuilt
+    assert OpenPositionIndex.of(index) is index
+    assert OpenPositionIndex.of([novn]).get_by_ticker("NOVN") == [novn]
+    assert len(OpenPositionIndex()) == 0
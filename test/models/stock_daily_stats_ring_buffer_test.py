@@ -0,0 +1,58 @@
+import datetime
+import pytest
+from models.open_position import OpenPosition
+from models.stock_daily_stats_ring_buffer import StockDailyStatsRingBuffer
+from services.stock_compute_service import StockComputeService
+from strategies.bbrsi_strategy import BbRsiStrategy
+from strategies.rsi_strategy import RsiStrategy
+from test.utils import write_synthetic_yfinance_data
+
+def append_day(buffer, day):
+    buffer.append_values(date=datetime.date(2024, 1, day), close=100.0 + day, rsi=40.0 + day, rsi_ma=45.0,
+                         rsi_crossover_signal=day % 2 == 0, bb_top=110.0, bb_mid=100.0, bb_bot=90.0, position=0.0, pnl_pct=0.0)
+
+def test_ring_buffer_keeps_last_rows():
+    buffer = StockDailyStatsRingBuffer("AMZN", 3)
+    assert len(buffer) == 0
+    assert buffer[-2:] == []
+    for day in range(1, 6):
+        append_day(buffer, day)
+    assert len(buffer) == 3
+    # oldest first, as per a list
+    assert [stats.date.day for stats in buffer] == [3, 4, 5]
+    assert [stats.date.day for stats in buffer[-2:]] == [4, 5]
+    last = buffer[-1]
+    assert last.ticker == "AMZN"
+    assert last.date == datetime.date(2024, 1, 5)
+    assert last.close == 105.0
+    assert last.rsi == 45.0
+    assert last.rsi_crossover_signal is False
+    assert buffer[0].rsi_crossover_signal is False
+    assert buffer[1].rsi_crossover_signal is True
+    with pytest.raises(IndexError):
+        buffer[3]
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+@pytest.mark.parametrize("engine", StockComputeService.ENGINES)
+def test_bounded_stats_history_same_results(tmp_path, strategy, engine):
+    tickers = ["AAA", "BBB"]
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    open_positions = [OpenPosition(date=dates[240], ticker="AAA", size=10, price=100.0, currency='USD')]
+    num_actions = 0
+    for today in dates[250:390:3]:
+        full_svc = StockComputeService(",".join(tickers), str(today), open_positions, strategy=strategy,
+                                       data_directory=str(tmp_path), engine=engine)
+        bounded_svc = StockComputeService(",".join(tickers), str(today), open_positions, strategy=strategy,
+                                          data_directory=str(tmp_path), engine=engine,
+                                          stats_history_size=StockComputeService.DEFAULT_DAILY_STATS_RETURNED)
+        for ticker in tickers:
+            assert [s.as_text() for s in bounded_svc.get_stock_daily_stats_list(ticker)] == \
+                [s.as_text() for s in full_svc.get_stock_daily_stats_list(ticker)]
+        assert [(a.as_text(), a.context) for a in bounded_svc.trades_today()] == [(a.as_text(), a.context) for a in full_svc.trades_today()]
+        assert isinstance(bounded_svc.get_strategy().stock_daily_stats_list["AAA"], StockDailyStatsRingBuffer)
+        num_actions += len(full_svc.trades_today())
+    assert num_actions > 0
+
+def test_stats_history_size_below_trade_action_context():
+    with pytest.raises(Exception):
+        StockComputeService("AAA", "2024-01-02", stats_history_size=1, calculate_dates_only=True)
@@ -0,0 +1,42 @@
+import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from repositories.base_repository import BaseRepository
+from repositories.open_position_repository import OpenPositionRepository
+from repositories.resource_registry import ResourceRegistry
+from repositories.selected_tickers_repository import SelectedTickersRepository
+
+class FakeS3Client:
+    """ Serves objects from a dictionary (bucket/key -> CSV content), slowly """
+    objects = {}
+
+    def download_fileobj(self, bucket, key, fileobj):
+        content = FakeS3Client.objects[f"{bucket}/{key}"].encode('utf-8')
+        # written in two parts, to interleave concurrent downloads
+        fileobj.write(content[:10])
+        time.sleep(0.05)
+        fileobj.write(content[10:])
+
+class FakeSession:
+    def client(self, service_name, **kwargs):
+        return FakeS3Client()
+
+def test_s3_repositories_load_concurrently(monkeypatch):
+    monkeypatch.setattr(boto3.session, 'Session', FakeSession)
+    monkeypatch.setattr(ResourceRegistry, 's3', None)
+    tickers = [f"T{i:02d}" for i in range(16)]
+    FakeS3Client.objects = {f"bucket/users/{ticker}/selected_tickers.csv": f"ticker\n{ticker}\n{ticker}B" for ticker in tickers}
+    FakeS3Client.objects["bucket/users/alice/open_positions.csv"] = "date,ticker,size,price,currency\n2024-07-18,AMZN,2.5,185.9,USD"
+    spool_files = set(os.listdir(BaseRepository.SPOOL_DIRECTORY or '/tmp'))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        loaded = list(executor.map(lambda ticker: SelectedTickersRepository(f"s3://bucket/users/{ticker}/selected_tickers.csv").get_all_as_list(),
+                                   tickers))
+    assert loaded == [[ticker, f"{ticker}B"] for ticker in tickers]
+    # spool files are removed once loaded
+    assert set(os.listdir(BaseRepository.SPOOL_DIRECTORY or '/tmp')) <= spool_files
+    # same types as reading a local CSV file
+    positions = OpenPositionRepository("s3://bucket/users/alice/open_positions.csv").get_all()
+    assert positions[0].date == datetime.date(2024, 7, 18)
+    assert positions[0].size == 2.5
@@ -0,0 +1,35 @@
+import pytest
+from repositories.exchange_rate_store_repository import ExchangeRateStoreRepository
+
+def rates(date_str):
+    return {'EUR': 0.9 + int(date_str[-2:]) / 1000, 'CHF': 0.8}
+
+def test_append_and_load(tmp_path):
+    store = ExchangeRateStoreRepository(str(tmp_path / "rate_store"))
+    assert store.dates() == set()
+    assert store.load(["2024-12-31"]) == {}
+    store.append({date_str: rates(date_str) for date_str in ["2024-11-30", "2024-12-31"]})
+    # already stored dates are not appended again
+    store.append({"2024-12-31": {'EUR': 0.0}, "2023-12-31": rates("2023-12-31")})
+    assert len(store.delta_files()) == 2
+    store = ExchangeRateStoreRepository(str(tmp_path / "rate_store"))
+    assert store.dates() == {"2023-12-31", "2024-11-30", "2024-12-31"}
+    loaded = store.load(["2024-12-31", "2023-12-31", "2022-12-31"])
+    assert loaded == {"2024-12-31": rates("2024-12-31"), "2023-12-31": rates("2023-12-31")}
+
+def test_compact_evicts_oldest_dates(tmp_path):
+    store = ExchangeRateStoreRepository(str(tmp_path / "rate_store"), max_dates=3)
+    dates_str = [f"2024-12-{day:02d}" for day in range(1, 6)]
+    for date_str in dates_str[:3]:
+        store.append({date_str: rates(date_str)})
+    # not due yet
+    store.compact()
+    assert len(store.delta_files()) == 3
+    store.compact(force=True)
+    assert store.delta_files() == []
+    assert store.load(dates_str[:3]) == {date_str: rates(date_str) for date_str in dates_str[:3]}
+    # size based eviction, once above max_dates
+    store.append({date_str: rates(date_str) for date_str in dates_str[3:]})
+    store.compact()
+    store = ExchangeRateStoreRepository(str(tmp_path / "rate_store"), max_dates=3)
+    assert sorted(store.dates()) == dates_str[2:]
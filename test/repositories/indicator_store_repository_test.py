@@ -0,0 +1,112 @@
+import os
+from datetime import timedelta
+import numpy as np
+import pytest
+from models.open_position import OpenPosition
+from repositories.price_store_repository import PriceStoreRepository
+from services.indicator_service import INDICATOR_NAMES, compute_indicators, indicators_from_store
+from services.stock_compute_service import StockComputeService
+from services.yfinance_data_service import YfinanceDataService
+from strategies.bbrsi_strategy import BbRsiStrategy
+from strategies.rsi_strategy import RsiStrategy
+from test.utils import *
+
+tickers = ["AAA", "BBB", "BRK-B"]
+
+def populated_price_store(directory):
+    price_store = PriceStoreRepository(str(directory / "price_store"))
+    for ticker in tickers:
+        with open(os.path.join(directory, f"yfinance_data_{ticker}.csv")) as file:
+            price_store.save(ticker, YfinanceDataService.parse_yfinance_csv(file.read()))
+    YfinanceDataService.materialise_indicators(price_store, tickers)
+    return price_store
+
+def test_indicator_store_round_trip(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=100)
+    price_store = populated_price_store(tmp_path)
+    indicator_store = YfinanceDataService.indicator_store(price_store)
+    assert indicator_store.tickers() == sorted(tickers)
+    # indicators are kept apart from the price store partitions
+    assert price_store.tickers() == sorted(tickers)
+    prices = price_store.load(["AAA"], dates[0], dates[-1] + timedelta(days=1))["AAA"]
+    expected = compute_indicators(prices['close'])
+    stored = indicator_store.load(["AAA", "ZZZ"], dates[0], dates[-1] + timedelta(days=1))
+    assert list(stored.keys()) == ["AAA"]
+    assert stored["AAA"]['seed_date'] == dates[0]
+    assert (stored["AAA"]['date'] == prices['date']).all()
+    assert (stored["AAA"]['close'] == prices['close']).all()
+    for name in INDICATOR_NAMES:
+        # warmup NaN are read back as NaN
+        np.testing.assert_array_equal(stored["AAA"][name], expected[name])
+    rsi, rsi_ma = expected['rsi'], expected['rsi_ma']
+    assert stored["AAA"]['rsi_crossover_signal'][1:].tolist() == ((rsi[1:] > rsi_ma[1:]) & (rsi[:-1] < rsi_ma[:-1])).tolist()
+    assert stored["AAA"]['rsi_crossover_signal'].any()
+    assert len(indicator_store.load(["BBB"], dates[10], dates[20])["BBB"]['date']) == 10
+
+def test_indicators_from_store_revised_prices(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=100)
+    price_store = populated_price_store(tmp_path)
+    stored = YfinanceDataService.indicator_store(price_store).load(["AAA"], dates[0], dates[-1] + timedelta(days=1))["AAA"]
+    prices = price_store.load(["AAA"], dates[0], dates[60])["AAA"]
+    indicators = indicators_from_store(stored, prices['date'], prices['close'])
+    np.testing.assert_array_equal(indicators['rsi'], stored['rsi'][:60])
+    revised_close = prices['close'].copy()
+    revised_close[5] += 0.01
+    assert indicators_from_store(stored, prices['date'], revised_close) is None
+    later_dates = prices['date'] + np.timedelta64(365, 'D')
+    assert indicators_from_store(stored, later_dates, prices['close']) is None
+    assert indicators_from_store(None, prices['date'], prices['close']) is None
+    # indicators of a warmup starting after the stored seed differ, they are computed instead
+    assert indicators_from_store(stored, prices['date'][40:], prices['close'][40:]) is None
+
+def price_store_from_warmup(directory, today, open_positions, strategy):
+    """ Price store holding the prices from the warmup dates of a trade-today run (stored indicators seeded at the same bar) """
+    window = StockComputeService(",".join(tickers), str(today), open_positions, strategy=strategy, calculate_dates_only=True)
+    price_store = PriceStoreRepository(str(directory / f"price_store_{today}"))
+    for ticker in tickers:
+        with open(os.path.join(directory, f"yfinance_data_{ticker}.csv")) as file:
+            prices = YfinanceDataService.parse_yfinance_csv(file.read())
+        warmup_date = np.datetime64(window.ticker_warmup_dates[ticker], 'D')
+        price_store.save(ticker, {column: values[prices['date'] >= warmup_date] for column, values in prices.items()})
+    YfinanceDataService.materialise_indicators(price_store, tickers)
+    return price_store
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_stock_compute_service_reads_stored_indicators(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=3)
+    open_positions = [OpenPosition(date=dates[240], ticker="AAA", size=10, price=100.0, currency='USD')]
+    num_actions = 0
+    num_crossovers = 0
+    for today in dates[250:350:7]:
+        price_store = price_store_from_warmup(tmp_path, today, open_positions, strategy)
+        computed_svc = StockComputeService(",".join(tickers), str(today), open_positions, strategy=strategy,
+                                           data_directory=str(tmp_path), engine='vectorized')
+        stored_svc = StockComputeService(",".join(tickers), str(today), open_positions, strategy=strategy,
+                                         price_store=price_store, engine='vectorized')
+        assert stored_svc.indicator_data is not None and sorted(stored_svc.indicator_data.keys()) == sorted(tickers)
+        for ticker in tickers:
+            # indicators were read rather than computed, with the values of the run's own warmup
+            np.testing.assert_array_equal(stored_svc.get_strategy().rsi[ticker].values, stored_svc.indicator_data[ticker]['rsi'])
+            np.testing.assert_array_equal(stored_svc.get_strategy().rsi[ticker].values, computed_svc.get_strategy().rsi[ticker].values)
+            np.testing.assert_array_equal(stored_svc.get_strategy().rsi_ma[ticker].values, computed_svc.get_strategy().rsi_ma[ticker].values)
+            stats = stored_svc.get_stock_daily_stats_list(ticker, num_lines=1000)
+            assert [s.as_text() for s in stats] == [s.as_text() for s in computed_svc.get_stock_daily_stats_list(ticker, num_lines=1000)]
+            num_crossovers += len([s for s in stats if s.rsi_crossover_signal])
+        assert [a.as_text() for a in stored_svc.get_strategy().trade_actions] == [a.as_text() for a in computed_svc.get_strategy().trade_actions]
+        assert [a.as_text() for a in stored_svc.trades_today()] == [a.as_text() for a in computed_svc.trades_today()]
+        num_actions += len(stored_svc.get_strategy().trade_actions)
+    assert num_actions > 0 and num_crossovers > 0
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_stock_compute_service_computes_indicators_of_another_warmup(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=3)
+    # indicators seeded from the first stored bar, a year before the run's warmup
+    price_store = populated_price_store(tmp_path)
+    for today in dates[300:350:7]:
+        computed_svc = StockComputeService(",".join(tickers), str(today), strategy=strategy, data_directory=str(tmp_path),
+                                           engine='vectorized')
+        stored_svc = StockComputeService(",".join(tickers), str(today), strategy=strategy, price_store=price_store,
+                                         engine='vectorized')
+        for ticker in tickers:
+            np.testing.assert_array_equal(stored_svc.get_strategy().rsi[ticker].values, computed_svc.get_strategy().rsi[ticker].values)
+        assert [a.as_text() for a in stored_svc.get_strategy().trade_actions] == [a.as_text() for a in computed_svc.get_strategy().trade_actions]
@@ -0,0 +1,55 @@
+import os
+from datetime import timedelta
+import pytest
+from repositories.price_store_repository import PriceStoreRepository
+from services.stock_compute_service import StockComputeService
+from services.yfinance_data_service import YfinanceDataService
+from test.utils import *
+
+tickers = ["AAA", "BBB", "BRK-B"]
+
+def populate_price_store(price_store, directory):
+    for ticker in tickers:
+        with open(os.path.join(directory, f"yfinance_data_{ticker}.csv")) as file:
+            price_store.save(ticker, YfinanceDataService.parse_yfinance_csv(file.read()))
+
+def test_price_store_range_query(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=50)
+    price_store = PriceStoreRepository(str(tmp_path / "price_store"))
+    populate_price_store(price_store, tmp_path)
+    assert price_store.tickers() == sorted(tickers)
+    expected = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), dates[10], dates[20])
+    actual = price_store.load(["BRK-B", "AAA"], dates[10], dates[20])
+    assert list(actual.keys()) == ["BRK-B", "AAA"]
+    for ticker in ["BRK-B", "AAA"]:
+        assert len(actual[ticker]['date']) == 10
+        for column in ['date'] + PriceStoreRepository.COLUMNS:
+            assert (actual[ticker][column] == expected[ticker][column]).all()
+
+def test_price_store_save_replaces_partition(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=50)
+    price_store = PriceStoreRepository(str(tmp_path / "price_store"))
+    populate_price_store(price_store, tmp_path)
+    prices = price_store.load(["AAA"], dates[0], dates[-1] + timedelta(days=1))["AAA"]
+    price_store.save("AAA", {column: values[:5] for column, values in prices.items()})
+    assert len(price_store.load(["AAA"], dates[0], dates[-1])["AAA"]['date']) == 5
+    assert price_store.last_modified("AAA") is not None
+    assert price_store.last_modified("ZZZ") is None
+
+def test_price_store_missing_ticker(tmp_path):
+    price_store = PriceStoreRepository(str(tmp_path / "price_store"))
+    with pytest.raises(Exception, match="Missing tickers in price store"):
+        price_store.load(["ZZZ"], parse_date("2024-01-01"), parse_date("2024-02-01"))
+
+@pytest.mark.parametrize("engine", StockComputeService.ENGINES)
+def test_stock_compute_service_from_price_store(tmp_path, engine):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=3)
+    price_store = PriceStoreRepository(str(tmp_path / "price_store"))
+    populate_price_store(price_store, tmp_path)
+    for today in dates[250:350:7]:
+        csv_svc = StockComputeService(",".join(tickers), str(today), data_directory=str(tmp_path), engine=engine)
+        store_svc = StockComputeService(",".join(tickers), str(today), price_store=price_store, engine=engine)
+        for ticker in tickers:
+            assert [s.as_text() for s in store_svc.get_stock_daily_stats_list(ticker)] == \
+                [s.as_text() for s in csv_svc.get_stock_daily_stats_list(ticker)]
+        assert [a.as_text() for a in store_svc.trades_today()] == [a.as_text() for a in csv_svc.trades_today()]
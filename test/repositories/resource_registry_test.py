@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from repositories.resource_registry import ResourceRegistry
+
+class FakeSession:
+    num_clients = 0
+
+    def client(self, service_name, **kwargs):
+        FakeSession.num_clients += 1
+        return {'service_name': service_name, 'max_pool_connections': kwargs['config'].max_pool_connections}
+
+def test_s3_client_created_once(monkeypatch):
+    monkeypatch.setattr(boto3.session, 'Session', FakeSession)
+    monkeypatch.setattr(ResourceRegistry, 's3', None)
+    FakeSession.num_clients = 0
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: ResourceRegistry.s3_client(), range(32)))
+    assert FakeSession.num_clients == 1
+    assert all([client is clients[0] for client in clients])
+    assert clients[0]['max_pool_connections'] == ResourceRegistry.S3_MAX_POOL_CONNECTIONS
+    # forked process
+    monkeypatch.setattr(ResourceRegistry, 'pid', -1)
+    assert ResourceRegistry.s3_client() is not clients[0]
+    assert FakeSession.num_clients == 2
+
+def test_duckdb_connections_share_database_with_private_temp_tables():
+    first = ResourceRegistry.duckdb_connection()
+    second = ResourceRegistry.duckdb_connection()
+    database = ResourceRegistry.database
+    assert first is not second
+    first.execute("CREATE TEMP TABLE csv_data AS SELECT 1 AS value")
+    second.execute("CREATE TEMP TABLE csv_data AS SELECT 2 AS value")
+    assert first.execute("SELECT value FROM csv_data").fetchall() == [(1,)]
+    assert second.execute("SELECT value FROM csv_data").fetchall() == [(2,)]
+    assert ResourceRegistry.database is database
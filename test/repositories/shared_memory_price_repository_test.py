@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pytest
+from repositories.shared_memory_price_repository import SharedMemoryPriceRepository
+from services.stock_compute_service import StockComputeService
+from services.yfinance_data_service import YfinanceDataService
+from test.utils import *
+
+tickers = ["AAA", "BBB", "BRK-B"]
+
+def load_price_data(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=60)
+    # tickers with different number of rows
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), dates[0], dates[-1])
+    price_data["AAA"] = {column: values[5:] for column, values in price_data["AAA"].items()}
+    return dates, price_data
+
+def test_load(tmp_path):
+    dates, price_data = load_price_data(tmp_path)
+    with SharedMemoryPriceRepository.create(price_data) as shared_prices:
+        assert shared_prices.tickers() == tickers
+        assert list(shared_prices.load(["BRK-B", "AAA"]).keys()) == ["BRK-B", "AAA"]
+        loaded = shared_prices.load(tickers)
+        expected = StockComputeService.slice_price_data(price_data, tickers, dates[10], dates[20])
+        sliced = shared_prices.load(tickers, dates[10], dates[20])
+        for ticker in tickers:
+            for column in SharedMemoryPriceRepository.COLUMNS:
+                assert (loaded[ticker][column] == price_data[ticker][column]).all()
+                assert (sliced[ticker][column] == expected[ticker][column]).all()
+                assert loaded[ticker][column].dtype == price_data[ticker][column].dtype
+        with pytest.raises(ValueError):
+            loaded["AAA"]["close"][0] = 0
+        with pytest.raises(Exception, match="Missing tickers"):
+            shared_prices.load(["ZZZ"])
+        # views must be released before the block is closed
+        del loaded, sliced
+
+def test_attach_is_zero_copy(tmp_path):
+    dates, price_data = load_price_data(tmp_path)
+    with SharedMemoryPriceRepository.create(price_data) as shared_prices:
+        attached = SharedMemoryPriceRepository.attach(shared_prices.descriptor)
+        attached_close = attached.load(["BBB"])["BBB"]["close"]
+        assert not attached_close.flags.owndata
+        start, end = shared_prices.descriptor['tickers']["BBB"]
+        shared_prices.columns["close"][start] = -1.0
+        assert attached_close[0] == -1.0
+        with pytest.raises(Exception, match="Only the process which created"):
+            attached.unlink()
+        del attached_close
+        attached.close()
+
+def test_close_with_referenced_views(tmp_path):
+    dates, price_data = load_price_data(tmp_path)
+    shared_prices = SharedMemoryPriceRepository.create(price_data)
+    close = shared_prices.load(["BBB"])["BBB"]["close"]
+    with pytest.raises(BufferError):
+        with shared_prices:
+            pass
+    # the block is unlinked even though this process mapping could not be closed
+    with pytest.raises(FileNotFoundError):
+        SharedMemoryPriceRepository.attach(shared_prices.descriptor)
+    copied_close = close.copy()
+    del close
+    shared_prices.close()
+    assert copied_close[0] == price_data["BBB"]["close"][0]
+
+def worker_checksum(descriptor):
+    shared_prices = SharedMemoryPriceRepository.attach(descriptor)
+    price_data = shared_prices.load(tickers)
+    owns_data = any([values.flags.owndata for prices in price_data.values() for values in prices.values()])
+    return os.getpid(), owns_data, sum([float(prices['close'].sum()) for prices in price_data.values()])
+
+def test_attach_from_worker_processes(tmp_path):
+    dates, price_data = load_price_data(tmp_path)
+    expected_checksum = sum([float(price_data[ticker]['close'].sum()) for ticker in tickers])
+    with SharedMemoryPriceRepository.create(price_data) as shared_prices, ProcessPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(worker_checksum, [shared_prices.descriptor] * 4))
+    for pid, owns_data, checksum in results:
+        assert pid != os.getpid()
+        assert not owns_data
+        assert checksum == pytest.approx(expected_checksum)
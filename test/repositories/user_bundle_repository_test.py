@@ -0,0 +1,79 @@
+import datetime
+import boto3
+import botocore
+from repositories.closed_position_repository import ClosedPositionRepository
+from repositories.open_position_repository import OpenPositionRepository
+from repositories.resource_registry import ResourceRegistry
+from repositories.selected_tickers_repository import SelectedTickersRepository
+from repositories.user_bundle_repository import UserBundleRepository
+from repositories.user_repository import UserRepository
+
+class FakeS3Client:
+    """ Serves objects from a dictionary (bucket/key -> bytes), counting downloads """
+    objects = {}
+    num_downloads = 0
+
+    def download_fileobj(self, bucket, key, fileobj):
+        FakeS3Client.num_downloads += 1
+        if f"{bucket}/{key}" not in FakeS3Client.objects:
+            raise botocore.exceptions.ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+        fileobj.write(FakeS3Client.objects[f"{bucket}/{key}"])
+
+class FakeSession:
+    def client(self, service_name, **kwargs):
+        return FakeS3Client()
+
+def create_user_directory(tmp_path):
+    user_directory = tmp_path / "alice"
+    user_directory.mkdir()
+    (tmp_path / "users.csv").write_text("id,email,mobile\nalice,alice@example.com,123\nbob,bob@example.com,456\n")
+    (user_directory / "open_positions.csv").write_text("date,ticker,size,price,currency\n2024-07-18,AMZN,2.5,185.9,USD\n")
+    (user_directory / "selected_tickers.csv").write_text("ticker\nMSFT\nNVDA\n")
+    (user_directory / "closed_positions.csv").write_text(
+        "date,ticker,size,price,currency,closed_date,closed_price,commission\n2024-01-02,META,1.0,350.0,USD,2024-03-04,490.0,1.5\n")
+    return user_directory
+
+def test_bundle_holds_user_data(tmp_path):
+    user_directory = create_user_directory(tmp_path)
+    users_repository = UserRepository(str(tmp_path / "users.csv"))
+    path = UserBundleRepository.create(str(user_directory), 'alice', users_repository)
+    bundle = UserBundleRepository(path)
+    assert bundle.exists()
+    # same records as the CSV files
+    assert [repr(user) for user in UserRepository("unused.csv", bundle).get_all()] == [repr(users_repository.get_by_id('alice'))]
+    for repository_class, file_name in [(OpenPositionRepository, "open_positions.csv"),
+                                        (SelectedTickersRepository, "selected_tickers.csv"),
+                                        (ClosedPositionRepository, "closed_positions.csv")]:
+        assert [repr(record) for record in repository_class("unused.csv", bundle).get_all()] == \
+            [repr(record) for record in repository_class(str(user_directory / file_name)).get_all()]
+    assert OpenPositionRepository("unused.csv", bundle).get_all()[0].date == datetime.date(2024, 7, 18)
+
+def test_bundle_read_with_single_s3_get(tmp_path, monkeypatch):
+    monkeypatch.setattr(boto3.session, 'Session', FakeSession)
+    monkeypatch.setattr(ResourceRegistry, 's3', None)
+    user_directory = create_user_directory(tmp_path)
+    path = UserBundleRepository.create(str(user_directory), 'alice', UserRepository(str(tmp_path / "users.csv")))
+    with open(path, 'rb') as f:
+        FakeS3Client.objects = {"bucket/users/alice/bundle.duckdb": f.read()}
+    FakeS3Client.num_downloads = 0
+    bundle = UserBundleRepository("s3://bucket/users/alice/bundle.duckdb")
+    assert UserRepository("s3://bucket/users/users.csv", bundle).get_by_id('alice').email == 'alice@example.com'
+    assert SelectedTickersRepository("s3://bucket/users/alice/selected_tickers.csv", bundle).get_all_as_list() == ['MSFT', 'NVDA']
+    assert len(OpenPositionRepository("s3://bucket/users/alice/open_positions.csv", bundle).get_all()) == 1
+    assert len(ClosedPositionRepository("s3://bucket/users/alice/closed_positions.csv", bundle).get_all()) == 1
+    assert FakeS3Client.num_downloads == 1
+
+def test_missing_bundle_falls_back_to_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(boto3.session, 'Session', FakeSession)
+    monkeypatch.setattr(ResourceRegistry, 's3', None)
+    FakeS3Client.objects = {"bucket/users/bob/selected_tickers.csv": b"ticker\nAMZN\n"}
+    bundle = UserBundleRepository("s3://bucket/users/bob/bundle.duckdb")
+    assert not bundle.exists()
+    assert SelectedTickersRepository("s3://bucket/users/bob/selected_tickers.csv", bundle).get_all_as_list() == ['AMZN']
+    # bundle without a table (e.g. no closed positions) reads the table CSV file
+    user_directory = create_user_directory(tmp_path)
+    (user_directory / "closed_positions.csv").unlink()
+    bundle = UserBundleRepository(UserBundleRepository.create(str(user_directory), 'alice'))
+    assert not bundle.has_table(ClosedPositionRepository.BUNDLE_TABLE)
+    (user_directory / "closed_positions.csv").write_text("date,ticker,size,price,currency,closed_date,closed_price,commission\n")
+    assert ClosedPositionRepository(str(user_directory / "closed_positions.csv"), bundle).get_all() == []
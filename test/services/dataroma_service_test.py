@@ -1,7 +1,125 @@
+import json
+import threading
+import time
+from bs4 import BeautifulSoup
+import pandas as pd
+from services import dataroma_service
 from services.dataroma_service import DataromaService
 
+GRID_PAGE = """
+<html><body>
+<table id="menu"><tr><td>Symbol</td></tr></table>
+<table id="grid">
+  <thead><tr><td>Symbol</td><td>Stock</td><td>Buys<span>&#9660;</span></td></tr></thead>
+  <tbody>
+    <tr><td><a href="/m/s.php?s=AMZN">AMZN</a></td><td>Amazon.com Inc.</td><td> 12 </td></tr>
+    <tr><td><a href="/m/s.php?s=BRK.B">BRK.B<div class="sub">Berkshire &amp; co</div></a></td><td>Berkshire</td><td>3</td></tr>
+  </tbody>
+</table>
+</body></html>
+"""
+
 def test_dataroma_service():
     dataroma = DataromaService()
     assert len(dataroma.symbol_6months_buys_dict) > 0
     assert len(dataroma.symbol_ownership_dict) > 0
-    assert len(dataroma.symbol_quarter_buys_dict) > 0
\ No newline at end of file
+    assert len(dataroma.symbol_quarter_buys_dict) > 0
+
+def beautiful_soup_parse_grid(html_content, num_columns, column_label):
+    """ Previous BeautifulSoup and pandas parser """
+    table = BeautifulSoup(html_content, "html.parser").find("table", {"id": "grid"})
+    headers = [header.get_text(strip=True) for header in table.find_all("td")][:num_columns]
+    rows = [[cell.get_text(strip=True) for cell in row.find_all("td")] for row in table.find("tbody").find_all("tr")]
+    return pd.DataFrame(rows, columns=headers).set_index('Symbol')[column_label].to_dict()
+
+def test_parse_grid():
+    symbols = DataromaService.parse_grid(GRID_PAGE, 3, "Buys▼")
+    assert symbols == {"AMZN": "12", "BRK.BBerkshire & co": "3"}
+    assert symbols == beautiful_soup_parse_grid(GRID_PAGE, 3, "Buys▼")
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers={}):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+def fake_dataroma(monkeypatch, status_code=200):
+    """ Serves GRID_PAGE for all pages (or status_code), returns the list of request headers """
+    requests_headers = []
+    lock = threading.Lock()
+    def get(url, headers):
+        time.sleep(0.1)
+        with lock:
+            requests_headers.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(304)
+        if status_code != 200:
+            return FakeResponse(status_code)
+        page = GRID_PAGE.replace("<td>Buys", "<td>Ownership<b>count</b>") if "portfolio.php" in url else GRID_PAGE
+        return FakeResponse(200, page, {'ETag': '"v1"', 'Last-Modified': 'Thu, 02 Jan 2025 04:00:00 GMT'})
+    monkeypatch.setattr(dataroma_service.requests, 'get', get)
+    return requests_headers
+
+def test_pages_are_fetched_concurrently(monkeypatch):
+    requests_headers = fake_dataroma(monkeypatch)
+    started = time.perf_counter()
+    dataroma = DataromaService()
+    assert time.perf_counter() - started < 0.25
+    assert len(requests_headers) == 3
+    assert dataroma.num_quarter_buys_by_ticker("AMZN") == 12
+    assert dataroma.num_6month_buys_by_ticker("AMZN") == 12
+    assert dataroma.num_owners_by_ticker("AMZN") == 12
+    assert dataroma.num_owners_by_ticker("MSFT") == 0
+
+def test_snapshot_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "dataroma_cache.json")
+    requests_headers = fake_dataroma(monkeypatch)
+    DataromaService(path=path, today_date_str="2025-01-02").save_cache()
+    # same day: served from the snapshot
+    dataroma = DataromaService(path=path, today_date_str="2025-01-02")
+    assert len(requests_headers) == 3
+    assert dataroma.num_quarter_buys_by_ticker("AMZN") == 12
+    # next day: conditional requests, unmodified pages are not downloaded again
+    dataroma = DataromaService(path=path, today_date_str="2025-01-03")
+    assert len(requests_headers) == 6
+    assert all([headers["If-None-Match"] == '"v1"' for headers in requests_headers[3:]])
+    assert dataroma.num_quarter_buys_by_ticker("AMZN") == 12
+    dataroma.save_cache()
+    with open(path, 'r') as file:
+        cache = json.load(file)
+    assert {page['fetched_date'] for page in cache.values()} == {"2025-01-03"}
+    assert cache['quarter_buys']['etag'] == '"v1"'
+
+def test_failed_refresh_keeps_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "dataroma_cache.json")
+    cache = {name: {'fetched_date': "2025-01-01", 'symbols': {"AMZN": "7"}} for name in DataromaService.PAGES}
+    with open(path, 'w') as file:
+        json.dump(cache, file)
+    fake_dataroma(monkeypatch, status_code=503)
+    dataroma = DataromaService(path=path, today_date_str="2025-01-02")
+    assert dataroma.num_quarter_buys_by_ticker("AMZN") == 7
+    assert dataroma.cache['quarter_buys']['fetched_date'] == "2025-01-01"
+
+def test_failed_refresh_without_snapshot_is_not_cached(tmp_path, monkeypatch):
+    path = str(tmp_path / "dataroma_cache.json")
+    fake_dataroma(monkeypatch, status_code=503)
+    dataroma = DataromaService(path=path, today_date_str="2025-01-02")
+    assert dataroma.num_quarter_buys_by_ticker("AMZN") == 0
+    dataroma.save_cache()
+    # the next run of the day fetches the pages again
+    requests_headers = fake_dataroma(monkeypatch)
+    dataroma = DataromaService(path=path, today_date_str="2025-01-02")
+    assert len(requests_headers) == 3
+    assert dataroma.num_quarter_buys_by_ticker("AMZN") == 12
+
+def test_request_error_keeps_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "dataroma_cache.json")
+    with open(path, 'w') as file:
+        json.dump({'quarter_buys': {'fetched_date': "2025-01-01", 'symbols': {"AMZN": "7"}}}, file)
+    def get(url, headers):
+        raise dataroma_service.requests.exceptions.ConnectionError("Connection refused")
+    monkeypatch.setattr(dataroma_service.requests, 'get', get)
+    dataroma = DataromaService(path=path, today_date_str="2025-01-02")
+    assert dataroma.num_quarter_buys_by_ticker("AMZN") == 7
+    assert dataroma.num_owners_by_ticker("AMZN") == 0
+    assert list(dataroma.cache.keys()) == ['quarter_buys']
@@ -1,7 +1,14 @@
 import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
 import os
+import threading
+import time
+from time import sleep
+from urllib.parse import parse_qs, urlparse
 from dotenv import load_dotenv
 import pytest
+from repositories.exchange_rate_store_repository import ExchangeRateStoreRepository
 from services.exchange_rate_service import ExchangeRateService
 from services.utils_service import parse_date
 
@@ -102,4 +109,117 @@ def test_get_rate_using_eur_base():
     chf_to_eur = round(E_CHF * (1 / E_EUR), 5)
     assert svc.get_rate(from_currency='USD', date=datetime.date(2025, 1, 1)) == us_to_eur
     assert svc.get_rate(from_currency='CHF', date=datetime.date(2025, 1, 1)) == chf_to_eur
-    assert svc.get_rate(from_currency='EUR', date=datetime.date(2025, 1, 1)) == 1.0
\ No newline at end of file
+    assert svc.get_rate(from_currency='EUR', date=datetime.date(2025, 1, 1)) == 1.0
+
+class StubOpenExchangeHandler(BaseHTTPRequestHandler):
+    """ historical and time-series endpoints stub, rates derived from the date, answering after a fixed latency """
+    latency_in_seconds = 0.2
+    time_series_status = 200
+    requests = []
+
+    @staticmethod
+    def rates(date_str):
+        return {'EUR': 0.9 + int(date_str[-2:]) / 1000, 'CHF': 0.8}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        StubOpenExchangeHandler.requests.append(url.path)
+        sleep(StubOpenExchangeHandler.latency_in_seconds)
+        if url.path.startswith('/historical/'):
+            date_str = url.path.split('/')[-1].replace('.json', '')
+            status, body = 200, {'rates': StubOpenExchangeHandler.rates(date_str)}
+        elif StubOpenExchangeHandler.time_series_status != 200:
+            status, body = StubOpenExchangeHandler.time_series_status, {'error': True}
+        else:
+            start, end = parse_date(params['start']), parse_date(params['end'])
+            dates_str = [str(start + datetime.timedelta(days=i)) for i in range((end - start).days + 1)]
+            status, body = 200, {'rates': {date_str: StubOpenExchangeHandler.rates(date_str) for date_str in dates_str}}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_open_exchange_api(monkeypatch):
+    StubOpenExchangeHandler.requests = []
+    StubOpenExchangeHandler.time_series_status = 200
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOpenExchangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('OPEN_EXCHANGE_API_URL', f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv('OPEN_EXCHANGE_APP_ID', 'test')
+    yield StubOpenExchangeHandler
+    server.shutdown()
+    server.server_close()
+
+YEAR_END_DATES = [datetime.date(year, month, day) for year in range(2017, 2025) for month, day in [(11, 30), (12, 31)]]
+
+def test_prefetch_rates_concurrently(tmp_path, stub_open_exchange_api):
+    path = str(tmp_path / "exchange_rate_cache.json")
+    svc = ExchangeRateService(path=path, today_date_str='2025-01-12')
+    started = time.perf_counter()
+    svc.prefetch_rates(YEAR_END_DATES + YEAR_END_DATES[:2])
+    elapsed = time.perf_counter() - started
+    # 16 requests of 0.2s, MAX_CONCURRENT_REQUESTS in flight at a time
+    assert len(stub_open_exchange_api.requests) == 16
+    assert elapsed < 16 * StubOpenExchangeHandler.latency_in_seconds * 0.5
+    # rates are then read from the cache
+    assert svc.get_rate('USD', datetime.date(2020, 11, 30)) == round(1 / 0.93, 5)
+    assert svc.cache['2020-11-30'].read_count == 1
+    svc.prefetch_rates(YEAR_END_DATES)
+    assert len(stub_open_exchange_api.requests) == 16
+    # and saved once
+    svc.save_exchange_rate_cache()
+    svc = ExchangeRateService(path=path, today_date_str='2025-01-12')
+    assert len(svc.cache) == 16
+
+def test_prefetch_rates_using_time_series(tmp_path, stub_open_exchange_api):
+    svc = ExchangeRateService(path=str(tmp_path / "exchange_rate_cache.json"), time_series=True)
+    svc.prefetch_rates(YEAR_END_DATES)
+    # a request per year (November 30 to December 31)
+    assert stub_open_exchange_api.requests == ['/time-series.json'] * 8
+    assert sorted(svc.cache.keys()) == sorted([str(date) for date in YEAR_END_DATES])
+    assert svc.get_rate('USD', datetime.date(2024, 12, 31)) == round(1 / 0.931, 5)
+
+def test_prefetch_rates_without_time_series_plan(tmp_path, stub_open_exchange_api):
+    stub_open_exchange_api.time_series_status = 403
+    svc = ExchangeRateService(path=str(tmp_path / "exchange_rate_cache.json"), time_series=True)
+    svc.prefetch_rates(YEAR_END_DATES)
+    assert stub_open_exchange_api.requests.count('/time-series.json') == 1
+    assert len(stub_open_exchange_api.requests) == 1 + 16
+    assert len(svc.cache) == 16
+
+@pytest.mark.parametrize("status", [429, 500])
+def test_prefetch_rates_time_series_error(tmp_path, stub_open_exchange_api, status):
+    stub_open_exchange_api.time_series_status = status
+    svc = ExchangeRateService(path=str(tmp_path / "exchange_rate_cache.json"), time_series=True)
+    with pytest.raises(Exception, match=f"\\({status}\\)"):
+        svc.prefetch_rates(YEAR_END_DATES)
+    # not masked by historical requests
+    assert stub_open_exchange_api.requests == ['/time-series.json']
+
+def test_rate_store(tmp_path, stub_open_exchange_api):
+    store_path = str(tmp_path / "rate_store")
+    svc = ExchangeRateService(store=ExchangeRateStoreRepository(store_path), today_date_str='2025-01-12')
+    svc.prefetch_rates(YEAR_END_DATES)
+    assert svc.get_rate('USD', datetime.date(2020, 11, 30)) == round(1 / 0.93, 5)
+    svc.save_exchange_rate_cache()
+    assert len(stub_open_exchange_api.requests) == 16
+    # tax history is read from the store on the next runs, regardless of when it was last read
+    svc = ExchangeRateService(store=ExchangeRateStoreRepository(store_path), today_date_str='2025-06-30')
+    svc.prefetch_rates(YEAR_END_DATES)
+    assert svc.get_rate('USD', datetime.date(2020, 11, 30)) == round(1 / 0.93, 5)
+    assert svc.get_rate('USD', datetime.date(2019, 12, 31)) == round(1 / 0.931, 5)
+    assert len(stub_open_exchange_api.requests) == 16
+    # only new dates are fetched and appended
+    svc.get_rate('USD', datetime.date(2025, 1, 2))
+    svc.save_exchange_rate_cache()
+    assert len(stub_open_exchange_api.requests) == 17
+    store = ExchangeRateStoreRepository(store_path)
+    assert len(store.dates()) == 17
+    assert len(store.delta_files()) == 2
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from services.indicator_service import INDICATOR_NAMES, INDICATOR_STATE_TAIL_SIZE, advance_indicator_state, compute_indicators, indicator_state
+from services.indicator_state_service import IndicatorStateService
+from services.stock_compute_service import StockComputeService
+from test.utils import *
+
+def synthetic_prices(num_days=300, seed=3):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + num_days).astype('datetime64[D]')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, num_days)))
+    return {'date': dates, 'close': close}
+
+def assert_same_indicators(actual, expected, from_index):
+    for name in INDICATOR_NAMES:
+        assert actual[name][from_index:] == pytest.approx(expected[name][from_index:], abs=1e-8, nan_ok=True)
+
+def test_advanced_state_matches_replay():
+    prices = synthetic_prices()
+    state = indicator_state(prices['date'][:150], prices['close'][:150])
+    state = advance_indicator_state(state, prices['date'][150:], prices['close'][150:])
+    expected = compute_indicators(prices['close'])
+    assert state.last_date == str(prices['date'][-1])
+    assert len(state.tail_dates) == INDICATOR_STATE_TAIL_SIZE
+    for name in INDICATOR_NAMES:
+        assert state.tail[name] == pytest.approx(list(expected[name][-INDICATOR_STATE_TAIL_SIZE:]), abs=1e-8)
+    # not enough bars for all indicators
+    assert indicator_state(prices['date'][:20], prices['close'][:20]) is None
+
+def test_daily_runs_advance_state(tmp_path):
+    prices = synthetic_prices()
+    svc = IndicatorStateService(str(tmp_path))
+    window = lambda end: {column: values[:end] for column, values in prices.items()}
+    svc.indicators('AAA', window(200), prices['date'][190])
+    assert (svc.num_replays, svc.num_advanced_bars) == (1, 0)
+    for end in range(201, 206):
+        indicators = svc.indicators('AAA', window(end), prices['date'][end - 10])
+        assert_same_indicators(indicators, compute_indicators(prices['close'][:end]), end - 10)
+        # bars before the state tail are not computed
+        assert np.isnan(indicators['rsi'][0])
+    assert (svc.num_replays, svc.num_advanced_bars) == (1, 5)
+    # warmup window moving with today (same values as the replay from the first window)
+    moved_window = {column: values[5:206] for column, values in prices.items()}
+    svc.indicators('AAA', moved_window, prices['date'][196])
+    assert (svc.num_replays, svc.num_advanced_bars) == (1, 6)
+
+def test_stale_state_is_replayed(tmp_path):
+    prices = synthetic_prices()
+    svc = IndicatorStateService(str(tmp_path))
+    svc.indicators('AAA', {column: values[:200] for column, values in prices.items()}, prices['date'][190])
+    # bars evaluated before the tail (e.g. old open position)
+    svc.indicators('AAA', {column: values[:201] for column, values in prices.items()}, prices['date'][100])
+    assert svc.num_replays == 2
+    # revised close
+    revised = {'date': prices['date'][:202], 'close': prices['close'][:202].copy()}
+    revised['close'][200] += 1
+    indicators = svc.indicators('AAA', revised, prices['date'][195])
+    assert svc.num_replays == 3
+    assert_same_indicators(indicators, compute_indicators(revised['close']), 0)
+    # past window does not rewind the state
+    svc.indicators('AAA', {column: values[:150] for column, values in prices.items()}, prices['date'][140])
+    assert svc.num_replays == 4
+    assert svc.load_state('AAA').last_date == str(prices['date'][201])
+
+def test_vectorized_engine_with_indicator_state(tmp_path):
+    tickers = ["AAA", "BBB"]
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    svc = IndicatorStateService(str(tmp_path / "indicator_state"))
+    for today in dates[250:256]:
+        replayed = StockComputeService(",".join(tickers), str(today), data_directory=str(tmp_path), engine='vectorized')
+        advanced = StockComputeService(",".join(tickers), str(today), data_directory=str(tmp_path), engine='vectorized',
+                                       indicator_state_service=svc)
+        for ticker in tickers:
+            expected = replayed.get_stock_daily_stats_list(ticker, num_lines=1000)
+            actual = advanced.get_stock_daily_stats_list(ticker, num_lines=1000)
+            assert [s.date for s in actual] == [s.date for s in expected]
+            for e, a in zip(expected, actual):
+                assert a.rsi == pytest.approx(e.rsi, abs=0.5)
+                assert a.rsi_ma == pytest.approx(e.rsi_ma, abs=0.5)
+                assert a.bb_mid == pytest.approx(e.bb_mid)
+    assert svc.num_replays == len(tickers)
+    assert svc.num_advanced_bars == 5 * len(tickers)
@@ -0,0 +1,108 @@
+import os
+import pytest
+from repositories.file_repository import FileRepository
+from repositories.price_store_repository import PriceStoreRepository
+from services.dataroma_service import DataromaService
+from services.exchange_rate_service import ExchangeRateService
+from services.multi_user_trade_today_service import MultiUserTradeTodayService
+from services.stock_compute_service import StockComputeService
+from services.trade_today_reporting_service import TradeTodayReportingService
+from services.yfinance_data_service import YfinanceDataService
+from test.utils import *
+
+tickers = ["AAA", "BBB", "CCC", "DDD"]
+
+def exchange_rate_stub():
+    return ExchangeRateService(stub=ExchangeRateService.WILCARD_DATE_STUB_EXAMPLE)
+
+@pytest.fixture
+def local_s3(tmp_path, monkeypatch):
+    """ Local folder in place of the S3 bucket, with 3 users (one of them excluded) and a price store """
+    monkeypatch.setenv('TRADE_ADVISOR_S3_BUCKET', str(tmp_path))
+    monkeypatch.setattr(DataromaService, 'web_scrape', lambda self, url, num_columns, column_label: {})
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    price_store = PriceStoreRepository(str(tmp_path / "price_store"))
+    for ticker in tickers:
+        with open(os.path.join(tmp_path, f"yfinance_data_{ticker}.csv")) as file:
+            price_store.save(ticker, YfinanceDataService.parse_yfinance_csv(file.read()))
+    users = {'alice': ["AAA", "BBB"], 'bob': ["BBB", "CCC"], 'test': ["AAA"]}
+    os.makedirs(tmp_path / 'users')
+    FileRepository(str(tmp_path / 'users' / 'users.csv')).save(
+        "id,email,mobile\n" + "\n".join([f"{user},{user}@example.com,123" for user in users]))
+    for user, selected_tickers in users.items():
+        os.makedirs(tmp_path / 'users' / user)
+        FileRepository(str(tmp_path / 'users' / user / 'selected_tickers.csv')).save("ticker\n" + "\n".join(selected_tickers))
+        FileRepository(str(tmp_path / 'users' / user / 'closed_positions.csv')).save(
+            "date,ticker,size,price,currency,closed_date,closed_price,commission\n2024-01-02,AAA,10.0,100.0,USD,2024-02-01,110.0,1")
+        open_positions = "date,ticker,size,price,currency\n"
+        if user == 'bob':
+            # open position on a ticker bob did not select
+            open_positions += f"{dates[300]},DDD,10.0,100.0,USD"
+        FileRepository(str(tmp_path / 'users' / user / 'open_positions.csv')).save(open_positions)
+    return tmp_path, dates, price_store
+
+@pytest.mark.parametrize("today_index", [311, 330])
+def test_trade_today_all_users(local_s3, today_index):
+    tmp_path, dates, price_store = local_s3
+    today = str(dates[today_index])
+    svc = MultiUserTradeTodayService(today, rapid=True, price_store=price_store, exchange_rate_service=exchange_rate_stub())
+    reports = svc.run()
+    assert sorted(reports.keys()) == ['alice', 'bob']
+    assert [stats.ticker for stats in sorted(reports['bob'].stock_stats_today, key=lambda stats: stats.ticker)] == ["BBB", "CCC", "DDD"]
+    # Same results as a trade-today run per user
+    for user, report in reports.items():
+        user_data = svc.load_user_data([u for u in svc.get_users() if u.id == user][0])
+        expected = StockComputeService(user_data['tickers'], today, user_data['open_positions'],
+                                       data_directory=str(tmp_path))
+        assert [trade.as_text() for trade in report.trades_today] == [trade.as_text() for trade in expected.trades_today()]
+        expected_stats = [expected.get_stock_daily_stats_list(ticker, 1)[0] for ticker in user_data['tickers'].split(',')]
+        assert [stats.as_text() for stats in report.stock_stats_today] == \
+               [stats.as_text() for stats in sorted(expected_stats, key=lambda stock: stock.rsi)]
+    # BBB selected by both users
+    if today_index == 311:
+        assert len(reports['alice'].trades_today) == 1 and len(reports['bob'].trades_today) == 1
+
+def test_trade_today_selected_users(local_s3):
+    tmp_path, dates, price_store = local_s3
+    svc = MultiUserTradeTodayService(str(dates[330]), users=['test'], rapid=True, price_store=price_store,
+                                     exchange_rate_service=exchange_rate_stub())
+    assert list(svc.run().keys()) == ['test']
+    with pytest.raises(Exception, match="not found"):
+        MultiUserTradeTodayService(str(dates[330]), users=['carol'], price_store=price_store).run()
+
+def test_trade_today_all_users_report_failure(local_s3, monkeypatch):
+    tmp_path, dates, price_store = local_s3
+    def send_report(self, output, email_receiver=None, report_file=None):
+        if self.user == 'alice':
+            raise Exception("email not sent")
+    monkeypatch.setattr("services.trade_today_reporting_service.TradeTodayReportingService.send_report", send_report)
+    svc = MultiUserTradeTodayService(str(dates[330]), rapid=True, price_store=price_store, exchange_rate_service=exchange_rate_stub())
+    with pytest.raises(Exception, match=r"users \['alice'\]"):
+        svc.run()
+
+def test_trade_today_all_users_file_output(local_s3, monkeypatch):
+    tmp_path, dates, price_store = local_s3
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / 'temp')
+    svc = MultiUserTradeTodayService(str(dates[330]), rapid=True, price_store=price_store, exchange_rate_service=exchange_rate_stub())
+    svc.run(output='file')
+    # each user report is written to its own file
+    for user in ['alice', 'bob']:
+        with open(MultiUserTradeTodayService.report_file(user)) as file:
+            assert f"Report for {user.capitalize()}" in file.read()
+    assert not os.path.exists(TradeTodayReportingService.REPORT_FILE)
+
+def test_trade_today_all_users_fetch_exchange_rates_once(local_s3, monkeypatch):
+    tmp_path, dates, price_store = local_s3
+    monkeypatch.setenv('OPEN_EXCHANGE_APP_ID', 'test')
+    fetched_dates = []
+    def fetch_historical_rates(self, date_str):
+        fetched_dates.append(date_str)
+        return {'USD': 1.0, 'EUR': 0.9}
+    monkeypatch.setattr(ExchangeRateService, 'fetch_historical_rates', fetch_historical_rates)
+    exchange_rate_service = ExchangeRateService(path=str(tmp_path / 'exchange_rates.json'))
+    svc = MultiUserTradeTodayService(str(dates[330]), rapid=True, price_store=price_store, exchange_rate_service=exchange_rate_service)
+    reports = svc.run()
+    # all users closed a position in 2024: rates at the end of the Jan-Nov tax payment window
+    assert fetched_dates == ["2024-11-30"]
+    assert exchange_rate_service.cache["2024-11-30"].read_count == len(reports)
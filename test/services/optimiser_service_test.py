@@ -0,0 +1,110 @@
+import gc
+import pytest
+from repositories.optimisation_result_repository import OptimisationResultRepository
+from services import optimiser_service
+from services.optimiser_service import OptimiserService, run_backtest
+from services.yfinance_data_service import YfinanceDataService
+from test.utils import *
+
+tickers = ["AAA", "BBB", "CCC"]
+
+def create_optimiser(tmp_path, dates, max_workers=2):
+    return OptimiserService("bbrsi", ",".join(tickers), dates[150], dates[-1],
+                            OptimisationResultRepository(str(tmp_path / "results.duckdb")), max_workers=max_workers)
+
+def test_optimise(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=11)
+    svc = create_optimiser(tmp_path, dates)
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), svc.warmup_date, svc.end_date)
+    param_values = {'lower_rsi': [40, 50], 'bb_low_crossover_loss_tolerance': [3, 100]}
+    results = svc.optimise(param_values, price_data)
+    assert len(results) == 4
+    assert [r.final_value for r in results] == sorted([r.final_value for r in results], reverse=True)
+    assert sum([r.num_trade_actions for r in results]) > 0
+    # Same as an in-process backtest
+    best = results[0]
+    backtest = run_backtest(svc.strategy, best.params, price_data, tickers, svc.start_date, svc.initial_cash)
+    assert backtest['final_value'] == pytest.approx(best.final_value)
+    assert backtest['num_trade_actions'] == best.num_trade_actions
+
+def test_optimise_skips_computed_params(tmp_path, monkeypatch):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=11)
+    svc = create_optimiser(tmp_path, dates)
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), svc.warmup_date, svc.end_date)
+    first_results = svc.optimise({'lower_rsi': [40, 50]}, price_data)
+    # Rerun with the same ticker set (different order) and an extra value, only the new value is computed
+    computed = []
+    original_run_worker_backtest = optimiser_service._run_worker_backtest
+    monkeypatch.setattr(optimiser_service, 'ProcessPoolExecutor', SerialExecutor)
+    monkeypatch.setattr(optimiser_service, '_run_worker_backtest',
+                        lambda strategy, params, *args: computed.append(params) or original_run_worker_backtest(strategy, params, *args))
+    svc = OptimiserService("bbrsi", ",".join(reversed(tickers)), dates[150], dates[-1],
+                           OptimisationResultRepository(str(tmp_path / "results.duckdb")))
+    results = svc.optimise({'lower_rsi': [40, 50, 60]}, price_data)
+    assert computed == [{'lower_rsi': 60}]
+    assert len(results) == 3
+    assert {r.params_hash for r in first_results} < {r.params_hash for r in results}
+    # A different window is not computed yet
+    computed.clear()
+    svc = create_optimiser(tmp_path, dates)
+    svc.start_date = dates[160]
+    svc.optimise({'lower_rsi': [40]}, price_data)
+    assert computed == [{'lower_rsi': 40}]
+
+def test_params_hash(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    svc = create_optimiser(tmp_path, dates)
+    assert svc.params_hash({'lower_rsi': 40, 'loss_pct_threshold': 5}) == svc.params_hash({'loss_pct_threshold': 5, 'lower_rsi': 40})
+    assert svc.params_hash({'lower_rsi': 40}) != svc.params_hash({'lower_rsi': 41})
+    # CLI grids parse values as int or float
+    assert svc.params_hash({'lower_rsi': 40}) == svc.params_hash({'lower_rsi': 40.0})
+    assert svc.params_hash({'lower_rsi': 40}, "2024-01-02:abc") != svc.params_hash({'lower_rsi': 40}, "2024-01-03:abc")
+
+def test_optimise_recomputes_params_of_other_prices(tmp_path, monkeypatch):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=11)
+    svc = create_optimiser(tmp_path, dates)
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), svc.warmup_date, svc.end_date)
+    svc.optimise({'lower_rsi': [40]}, price_data)
+    computed = []
+    original_run_worker_backtest = optimiser_service._run_worker_backtest
+    monkeypatch.setattr(optimiser_service, 'ProcessPoolExecutor', SerialExecutor)
+    monkeypatch.setattr(optimiser_service, '_run_worker_backtest',
+                        lambda strategy, params, *args: computed.append(params) or original_run_worker_backtest(strategy, params, *args))
+    # same value as a float
+    results = svc.optimise({'lower_rsi': [40.0]}, price_data)
+    assert computed == [] and len(results) == 1
+    # revised prices (e.g. another data directory or price store)
+    revised_price_data = {ticker: dict(prices) for ticker, prices in price_data.items()}
+    revised_price_data["AAA"]['close'] = price_data["AAA"]['close'] * 1.01
+    results = svc.optimise({'lower_rsi': [40]}, revised_price_data)
+    assert computed == [{'lower_rsi': 40}] and len(results) == 1
+
+def test_invalid_params(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    svc = create_optimiser(tmp_path, dates)
+    with pytest.raises(Exception, match="Unknown bbrsi params"):
+        svc.param_grid({'upper_bound': [1, 2]})
+    with pytest.raises(Exception, match="Unknown bbrsi params"):
+        svc.param_grid({'start_date': [dates[0]]})
+    with pytest.raises(Exception, match="Unknown strategy"):
+        OptimiserService("macd", "AAA", dates[0], dates[-1], None)
+
+class SerialExecutor:
+    """ Runs tasks in this process (so that they can be monkeypatched) """
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        # release prices attached by _init_worker in this process (including views kept by backtests reference cycles)
+        optimiser_service._worker_price_data = None
+        gc.collect()
+        optimiser_service._worker_prices.close()
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(fn(*args))
+        return future
@@ -0,0 +1,83 @@
+import os
+import time
+import pytest
+from test.utils import *
+from models.open_position import OpenPosition
+from repositories.price_store_repository import PriceStoreRepository
+from services.portfolio_valuation_service import PortfolioValuationService
+from services.stock_compute_service import StockComputeService
+from services.yfinance_data_service import YfinanceDataService
+
+tickers = ["AAA", "BBB"]
+
+def multiple_positions(dates):
+    return [
+        OpenPosition(date=dates[200], ticker="AAA", size=10, price=100.0, currency='USD'),
+        OpenPosition(date=dates[200], ticker="BBB", size=20, price=50.0, currency='USD'),
+        OpenPosition(date=dates[210], ticker="AAA", size=5, price=120.0, currency='USD'),
+    ]
+
+def populated_price_store(directory, tickers_list):
+    price_store = PriceStoreRepository(str(directory / "price_store"))
+    for ticker in tickers_list:
+        with open(os.path.join(directory, f"yfinance_data_{ticker}.csv")) as file:
+            price_store.save(ticker, YfinanceDataService.parse_yfinance_csv(file.read()))
+    return price_store
+
+def test_valuation_matches_stock_compute_service(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    open_positions = multiple_positions(dates)
+    expected = StockComputeService(",".join(tickers), str(dates[250]), open_positions, data_directory=str(tmp_path)).portfolio_stats()
+    valuation_svc = PortfolioValuationService(open_positions, str(dates[250]), data_directory=str(tmp_path))
+    assert valuation_svc.latest_closes["AAA"][0] == dates[249]
+    for actual in [valuation_svc.portfolio_stats(),
+                   PortfolioValuationService(open_positions, str(dates[250]), price_store=populated_price_store(tmp_path, tickers)).portfolio_stats()]:
+        # strategy stats closes are rounded, valuation uses the stored close
+        assert actual.total_invested == pytest.approx(expected.total_invested)
+        assert actual.portfolio_value == pytest.approx(expected.portfolio_value, rel=1e-3)
+        assert actual.pnl == pytest.approx(expected.pnl, abs=1.0)
+        assert [(p.ticker, p.date, p.units, p.value) for p in actual.position_stats_list] == \
+               [(p.ticker, p.date, p.units, pytest.approx(p.value, rel=1e-3)) for p in expected.position_stats_list]
+        assert [(a.ticker, a.num_positions, a.units, a.amount) for a in actual.asset_stats_list] == \
+               [(a.ticker, a.num_positions, a.units, a.amount) for a in expected.asset_stats_list]
+
+def test_valuation_aggregates_positions_per_ticker():
+    positions = multiple_positions([parse_date("2024-01-02")] * 300)
+    portfolio_stats = PortfolioValuationService(positions, "2024-06-01",
+                                                latest_closes={"AAA": (parse_date("2024-05-31"), 110.0),
+                                                               "BBB": (parse_date("2024-05-31"), 40.0)}).portfolio_stats()
+    assets = {asset.ticker: asset for asset in portfolio_stats.asset_stats_list}
+    assert assets["AAA"].num_positions == 2
+    assert assets["AAA"].units == 15
+    assert assets["AAA"].amount == pytest.approx(1600.0)
+    assert assets["AAA"].value == pytest.approx(1650.0)
+    assert assets["AAA"].pnl == pytest.approx(50.0)
+    assert [p.pnl for p in portfolio_stats.position_stats_list] == [pytest.approx(100.0), pytest.approx(-50.0), pytest.approx(-200.0)]
+    assert portfolio_stats.total_invested == pytest.approx(2600.0)
+    assert portfolio_stats.portfolio_value == pytest.approx(2450.0)
+    assert portfolio_stats.pnl_pct == pytest.approx(-150.0 / 2600.0 * 100)
+    with pytest.raises(Exception, match="Missing prices for BBB"):
+        PortfolioValuationService(positions, "2024-06-01", latest_closes={"AAA": (parse_date("2024-05-31"), 110.0)}).portfolio_stats()
+
+def test_price_store_latest_closes_reads_deltas(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=50)
+    price_store = populated_price_store(tmp_path, tickers)
+    prices = price_store.load(["AAA"], dates[45], dates[46])["AAA"]
+    price_store.append("AAA", {**prices, 'close': prices['close'] + 1})
+    latest_closes = price_store.latest_closes(tickers, dates[46])
+    assert latest_closes["AAA"] == (dates[45], pytest.approx(float(prices['close'][0]) + 1))
+    assert latest_closes["BBB"][0] == dates[45]
+
+def test_valuation_of_large_portfolio(tmp_path):
+    large_tickers = [f"T{i:03d}" for i in range(300)]
+    dates = write_synthetic_yfinance_data(tmp_path, large_tickers, num_days=300)
+    price_store = populated_price_store(tmp_path, large_tickers)
+    open_positions = [OpenPosition(date=dates[i % 200], ticker=ticker, size=1 + i % 3, price=100.0, currency='USD')
+                      for i, ticker in enumerate(large_tickers * 2)]
+    start = time.perf_counter()
+    portfolio_stats = PortfolioValuationService(open_positions, str(dates[-1]), price_store=price_store).portfolio_stats()
+    elapsed = time.perf_counter() - start
+    print(f"Valued {len(open_positions)} positions on {len(large_tickers)} tickers in {elapsed * 1000:.0f} ms")
+    assert len(portfolio_stats.asset_stats_list) == len(large_tickers)
+    assert all([asset.num_positions == 2 for asset in portfolio_stats.asset_stats_list])
+    assert elapsed < 1.0
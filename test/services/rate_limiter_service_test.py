@@ -0,0 +1,70 @@
+import pytest
+from services.rate_limiter_service import TokenBucketRateLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_acquire_within_capacity_does_not_wait():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(8, clock=clock.time, sleep=clock.sleep)
+    assert limiter.acquire(7) == 0
+    assert limiter.acquire(1) == 0
+    assert clock.now == 0
+
+def test_acquire_waits_for_refill():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(60, capacity=8, clock=clock.time, sleep=clock.sleep)
+    limiter.acquire(7)
+    # 1 credit left, 6 more credits refill in 6 seconds (1 credit per second)
+    assert limiter.acquire(7) == pytest.approx(6)
+    assert clock.now == pytest.approx(6)
+    # Early return of a request does not waste the budget accrued while waiting
+    clock.now += 3
+    assert limiter.acquire(3) == 0
+    assert limiter.acquire(7) == pytest.approx(7)
+
+def test_acquire_waits_for_window():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(8, clock=clock.time, sleep=clock.sleep)
+    limiter.acquire(7)
+    # the bucket refills 6 credits in 45 seconds, but the 7 credits spent remain within the minute until 60 seconds
+    assert limiter.acquire(7) == pytest.approx(60)
+    clock.now += 30
+    assert limiter.acquire(1) == 0
+    assert limiter.acquire(4) == pytest.approx(30)
+
+def test_sustained_rate():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(60, capacity=10, clock=clock.time, sleep=clock.sleep)
+    for _ in range(110):
+        limiter.acquire(1)
+    # 10 credits burst, then 1 credit per second
+    assert clock.now == pytest.approx(100)
+
+def test_acquire_more_than_capacity():
+    limiter = TokenBucketRateLimiter(8)
+    with pytest.raises(Exception, match="capacity"):
+        limiter.acquire(9)
+
+@pytest.mark.parametrize("capacity", [None, 3])
+def test_no_60_second_window_exceeds_limit(capacity):
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(8, capacity=capacity, clock=clock.time, sleep=clock.sleep)
+    acquired = []
+    for i in range(200):
+        credits = 1 + i % 3
+        limiter.acquire(credits)
+        acquired.append((clock.now, credits))
+        # idle periods refill the bucket
+        clock.now += 20 if i % 25 == 0 else 0.5
+    for start, _ in acquired:
+        assert sum([credits for time, credits in acquired if start <= time < start + 60 - 1e-9]) <= 8
+    # the limit is used rather than leaving the window idle (400 credits take 50 minutes at 8 credits per minute)
+    assert clock.now < 50 * 60 * 1.4
@@ -0,0 +1,65 @@
+import pytest
+from test.utils import *
+import datetime
+from models.open_position import OpenPosition
+from services.replay_service import ReplayService
+from services.stock_compute_service import StockComputeService
+from strategies.bbrsi_strategy import BbRsiStrategy
+from strategies.rsi_strategy import RsiStrategy
+
+tickers = ["AAA", "BBB", "CCC"]
+
+def assert_same_as_trade_today(replay_svc, tmp_path, strategy, open_positions, engine):
+    for today, day in replay_svc.days.items():
+        trade_today_svc = StockComputeService(",".join(tickers), today, open_positions, strategy=strategy,
+                                              data_directory=str(tmp_path), engine=engine)
+        expected = trade_today_svc.trades_today()
+        assert [(a.date, a.action, a.ticker) for a in day.trades_today()] == [(a.date, a.action, a.ticker) for a in expected]
+        for ticker in tickers:
+            expected_stats = trade_today_svc.get_stock_daily_stats_list(ticker)
+            actual_stats = day.get_stock_daily_stats_list(ticker)
+            assert [s.date for s in actual_stats] == [s.date for s in expected_stats]
+            for e, a in zip(expected_stats, actual_stats):
+                assert a.close == pytest.approx(e.close)
+                assert a.rsi == pytest.approx(e.rsi, abs=0.5)
+                assert a.position == pytest.approx(e.position)
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+@pytest.mark.parametrize("engine", StockComputeService.ENGINES)
+def test_replay_matches_trade_today_runs(tmp_path, strategy, engine):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    replay_svc = ReplayService(",".join(tickers), str(dates[250]), str(dates[310]), strategy=strategy,
+                               data_directory=str(tmp_path), engine=engine)
+    # one replayed date per bar, the day after it
+    one_day = datetime.timedelta(days=1)
+    assert list(replay_svc.days.keys()) == [str(date + one_day) for date in dates if dates[250] - one_day <= date <= dates[310] - one_day]
+    assert replay_svc.num_trades() > 0
+    assert_same_as_trade_today(replay_svc, tmp_path, strategy, None, engine)
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_replay_with_open_positions(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    open_positions = [
+        OpenPosition(date=dates[240], ticker="AAA", size=10, price=100.0, currency='USD'),
+        OpenPosition(date=dates[262], ticker="BBB", size=20, price=100.0, currency='USD'),
+    ]
+    replay_svc = ReplayService(",".join(tickers), str(dates[250]), str(dates[290]), open_positions, strategy=strategy,
+                               data_directory=str(tmp_path))
+    # positions are the recorded ones (advised trades are not executed)
+    one_day = datetime.timedelta(days=1)
+    assert [s.position for s in replay_svc.days[str(dates[255] + one_day)].get_stock_daily_stats_list("BBB", 1)] == [0]
+    assert [s.position for s in replay_svc.days[str(dates[280] + one_day)].get_stock_daily_stats_list("CCC", 1)] == [0]
+    assert replay_svc.days[str(dates[280] + one_day)].get_stock_daily_stats_list("BBB", 1)[0].position > 0
+    assert_same_as_trade_today(replay_svc, tmp_path, strategy, open_positions, 'backtrader')
+
+def test_replay_console_report(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    replay_svc = ReplayService(",".join(tickers), str(dates[250]), str(dates[260]), data_directory=str(tmp_path))
+    report = replay_svc.console_report()
+    for today in replay_svc.days:
+        assert f"Replay of {today}" in report
+    assert f"{replay_svc.num_trades()} trades over {len(replay_svc.days)} replayed dates" in report
+
+def test_replay_invalid_range():
+    with pytest.raises(Exception):
+        ReplayService("AAA", "2024-02-01", "2024-01-01")
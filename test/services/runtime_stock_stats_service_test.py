@@ -0,0 +1,85 @@
+import datetime
+import json
+import threading
+import time
+import pytest
+from services.runtime_stock_stats_service import FundamentalsCacheEntry, RuntimeStockStatsService
+from services.utils_service import todays_date
+
+tickers = ["AAA", "BBB", "CCC"]
+
+@pytest.fixture
+def fake_yfinance(monkeypatch):
+    """ Replaces yfinance calls, returns the list of fetched tickers """
+    fetched = []
+    lock = threading.Lock()
+    next_earnings = str(todays_date() + datetime.timedelta(days=5))
+    def fetch_fundamentals(self, ticker):
+        time.sleep(0.1)
+        with lock:
+            fetched.append(ticker)
+        eps_ttm = None if ticker == "CCC" else 5.0
+        return FundamentalsCacheEntry(fetched_date=self.today_date_str, close=100.0, eps_ttm=eps_ttm,
+                                      earnings_dates=[next_earnings, "2020-01-01"])
+    monkeypatch.setattr(RuntimeStockStatsService, 'fetch_fundamentals', fetch_fundamentals)
+    return fetched
+
+def test_fundamentals_are_prefetched_concurrently(fake_yfinance):
+    started = time.perf_counter()
+    svc = RuntimeStockStatsService(tickers)
+    assert time.perf_counter() - started < 0.25
+    assert sorted(fake_yfinance) == tickers
+    assert svc.pe_ratio("AAA") == 20.0
+    assert svc.next_earnings_call_in_days("AAA") == 5
+    with pytest.raises(Exception, match="EPS data not available for CCC"):
+        svc.pe_ratio("CCC")
+    with pytest.raises(Exception, match="ZZZ not in ticker list"):
+        svc.pe_ratio("ZZZ")
+    # no further yfinance calls
+    assert len(fake_yfinance) == 3
+
+def test_rapid_skips_yfinance(fake_yfinance):
+    svc = RuntimeStockStatsService(tickers, rapid=True)
+    assert svc.pe_ratio("AAA") == 42
+    assert svc.next_earnings_call_in_days("AAA") == 42
+    assert fake_yfinance == []
+
+def test_persistent_cache(tmp_path, fake_yfinance):
+    path = str(tmp_path / "fundamentals_cache.json")
+    today_str = str(todays_date())
+    yesterday_str = str(todays_date() - datetime.timedelta(days=1))
+    stale_str = str(todays_date() - datetime.timedelta(days=RuntimeStockStatsService.STALE_CACHE_ENTRY_IN_DAYS))
+    cache = {
+        "AAA": {"fetched_date": today_str, "close": 50.0, "eps_ttm": 5.0, "earnings_dates": []},
+        "BBB": {"fetched_date": yesterday_str, "close": 50.0, "eps_ttm": 5.0, "earnings_dates": []},
+        "ZZZ": {"fetched_date": stale_str, "close": 50.0, "eps_ttm": 5.0, "earnings_dates": []},
+    }
+    with open(path, 'w') as file:
+        json.dump(cache, file)
+    svc = RuntimeStockStatsService(tickers, path=path, today_date_str=today_str)
+    # fetched today: read from cache, fetched yesterday: refreshed
+    assert sorted(fake_yfinance) == ["BBB", "CCC"]
+    assert svc.pe_ratio("AAA") == 10.0
+    assert svc.pe_ratio("BBB") == 20.0
+    svc.save_cache()
+    with open(path, 'r') as file:
+        saved = json.load(file)
+    assert sorted(saved.keys()) == tickers
+    assert saved["BBB"]["fetched_date"] == today_str
+    # a second run the same day is served from the cache
+    fake_yfinance.clear()
+    svc = RuntimeStockStatsService(tickers, path=path, today_date_str=today_str)
+    assert svc.pe_ratio("BBB") == 20.0
+    assert fake_yfinance == []
+
+def test_prefetch_failures_are_retried_on_use(monkeypatch):
+    calls = []
+    def fetch_fundamentals(self, ticker):
+        calls.append(ticker)
+        if len(calls) == 1:
+            raise Exception("yfinance unavailable")
+        return FundamentalsCacheEntry(fetched_date=self.today_date_str, close=30.0, eps_ttm=3.0, earnings_dates=[])
+    monkeypatch.setattr(RuntimeStockStatsService, 'fetch_fundamentals', fetch_fundamentals)
+    svc = RuntimeStockStatsService(["AAA"])
+    assert svc.pe_ratio("AAA") == 10.0
+    assert calls == ["AAA", "AAA"]
@@ -81,4 +81,25 @@ def test_download_multi_ticker_yahoo_finance_csv_data():
         print(f"Saved {filename}")
     
     
-    
\ No newline at end of file
+    
+def test_portfolio_stats_multiple_positions_per_ticker(tmp_path):
+    from models.open_position import OpenPosition
+    dates = write_synthetic_yfinance_data(tmp_path, ["AAA", "BBB"])
+    open_positions = [
+        OpenPosition(date=dates[200], ticker="AAA", size=10, price=100.0, currency='USD'),
+        OpenPosition(date=dates[200], ticker="BBB", size=20, price=50.0, currency='USD'),
+        OpenPosition(date=dates[210], ticker="AAA", size=5, price=120.0, currency='USD'),
+    ]
+    svc = StockComputeService("AAA,BBB", str(dates[250]), open_positions, data_directory=str(tmp_path))
+    portfolio_stats = svc.portfolio_stats()
+    assert len(portfolio_stats.position_stats_list) == 3
+    assets = {asset.ticker: asset for asset in portfolio_stats.asset_stats_list}
+    close = svc.get_stock_daily_stats_list("AAA", 1)[-1].close
+    assert assets["AAA"].num_positions == 2
+    assert assets["AAA"].units == 15
+    assert assets["AAA"].amount == pytest.approx(1600.0)
+    assert assets["AAA"].value == pytest.approx(15 * close)
+    assert assets["AAA"].pnl == pytest.approx(15 * close - 1600.0)
+    assert assets["BBB"].num_positions == 1
+    assert portfolio_stats.total_invested == pytest.approx(2600.0)
+    assert portfolio_stats.portfolio_value == pytest.approx(sum([asset.value for asset in assets.values()]))
@@ -53,6 +53,27 @@ def test_tax_year_creation():
     assert len(tax_years[2022].closed_positions) == 1
     assert len(tax_years[2023].closed_positions) == 2
     
+def test_exchange_rates_are_prefetched():
+    closed_positions_csv = [
+        "2022-12-01,SPOT,1000,1,USD,2022-12-31,0.5,0",
+        "2023-08-01,BRK-B,1000,1,USD,2023-09-02,5,0",
+        "2023-08-01,AMZN,1000,1,USD,2023-10-02,5,0",
+    ]
+    closed_positions = [closed_position_builder(p) for p in closed_positions_csv]
+    exchange_rate_service = exchange_rate_service_with_multi_date_stub()
+    prefetched_dates = []
+    exchange_rate_service.prefetch_rates = lambda dates: prefetched_dates.extend(dates)
+    read_dates = []
+    get_rate = exchange_rate_service.get_rate
+    def recorded_get_rate(from_currency, date):
+        read_dates.append(date)
+        return get_rate(from_currency, date)
+    exchange_rate_service.get_rate = recorded_get_rate
+    TaxCalculatorService(closed_positions=closed_positions, exchange_rate_service=exchange_rate_service)
+    assert sorted(prefetched_dates) == [utils.parse_date("2022-12-31"), utils.parse_date("2023-11-30")]
+    # tax payment windows read the prefetched dates only
+    assert sorted(set(read_dates)) == sorted(prefetched_dates)
+
 def test_tax_payment_window():
     closed_positions_csv = [
         "2022-12-01,SPOT,1000,1,USD,2022-12-31,0.5", # cost: 1000, loss: 500
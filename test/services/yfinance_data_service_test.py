@@ -1,11 +1,19 @@
 import datetime
+import json
 import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from time import sleep
+from urllib.parse import parse_qs, urlparse
 from dotenv import load_dotenv
 import pytest
 from repositories.file_repository import FileRepository
+from services.rate_limiter_service import TokenBucketRateLimiter
+from services import yfinance_data_service
 from services.yfinance_data_service import YfinanceDataService
 from services.utils_service import parse_date
+from repositories.price_store_repository import PriceStoreRepository
 
 TEST_PATH = './test/data/twelve_data_sample_response.json'
 
@@ -57,3 +65,198 @@ def test_download_required_yfinance_data_to_filesystem():
 
 
    
+
+def twelve_data_response(tickers, start_date, end_date):
+    """ TwelveData time_series response with one bar per business day in [start_date, end_date) """
+    response = {}
+    for ticker in tickers.split(','):
+        values = []
+        date = parse_date(str(start_date))
+        while date < parse_date(str(end_date)):
+            if date.weekday() < 5:
+                price = f"{100 + date.toordinal() % 50}.5"
+                values.append({"datetime": str(date), "open": price, "high": price, "low": price, "close": price, "volume": "1000"})
+            date += datetime.timedelta(days=1)
+        values.reverse()
+        response[ticker] = {"meta": {"symbol": ticker}, "values": values, "status": "ok"}
+    if len(response) == 1:
+        return json.dumps(list(response.values())[0])
+    return json.dumps(response)
+
+@pytest.fixture
+def local_s3(tmp_path, monkeypatch):
+    """ Uses a local folder in place of the S3 bucket, with a single user selecting 3 tickers """
+    monkeypatch.setenv('TRADE_ADVISOR_S3_BUCKET', str(tmp_path))
+    monkeypatch.setenv('TWELVEDATA_API_KEY', 'test')
+    monkeypatch.setenv('TRADE_ADVISOR_PRICE_STORE', str(tmp_path / 'price_store'))
+    monkeypatch.setenv('TWELVEDATA_CREDITS_PER_MINUTE', '6000')
+    os.makedirs(tmp_path / 'users' / 'alice')
+    os.makedirs(tmp_path / 'services' / 'yfinance')
+    FileRepository(str(tmp_path / 'users' / 'users.csv')).save("id,email,mobile\nalice,alice@example.com,123")
+    FileRepository(str(tmp_path / 'users' / 'alice' / 'selected_tickers.csv')).save("ticker\nAAA\nBBB\nBRK-B")
+    return tmp_path
+
+def test_transform_single_symbol_and_no_data_responses(local_s3):
+    svc = YfinanceDataService()
+    csv_map = svc._transform_api_data_format_to_csv_map(twelve_data_response("BRK.B", "2025-01-06", "2025-01-08"))
+    assert list(csv_map.keys()) == ["yfinance_data_BRK-B.csv"]
+    assert csv_map["yfinance_data_BRK-B.csv"].split('\n')[0].startswith("2025-01-06,")
+    no_data = json.dumps({"code": 400, "message": "No data is available on the specified dates", "status": "error"})
+    assert svc._transform_api_data_format_to_csv_map(no_data) == {}
+    with pytest.raises(Exception, match="Failed to download data from TwelveData API"):
+        svc._transform_api_data_format_to_csv_map(json.dumps({"code": 429, "message": "Run out of credits", "status": "error"}))
+
+def test_incremental_download(local_s3, monkeypatch):
+    requests_made = []
+    def download_next_batch(self, start_date, end_date, tickers):
+        requests_made.append((str(start_date), tickers))
+        return twelve_data_response(tickers, start_date, end_date)
+    monkeypatch.setattr(YfinanceDataService, '_download_next_batch_of_data_from_api', download_next_batch)
+    svc = YfinanceDataService()
+    # Initial download retrieves the whole window
+    svc.download_data_from_api("2025-01-01", "2025-03-03", incremental=True)
+    assert requests_made == [("2025-01-01", "AAA,BBB,BRK-B")]
+    # Daily refresh only retrieves missing days
+    for end_date in ["2025-03-04", "2025-03-05", "2025-03-06", "2025-03-07", "2025-03-08"]:
+        svc.download_data_from_api("2025-01-01", end_date, incremental=True)
+    assert requests_made[1:] == [("2025-03-01", "AAA,BBB,BRK-B"), ("2025-03-04", "AAA,BBB,BRK-B"),
+                                 ("2025-03-05", "AAA,BBB,BRK-B"), ("2025-03-06", "AAA,BBB,BRK-B"),
+                                 ("2025-03-07", "AAA,BBB,BRK-B")]
+    # Up to date tickers are not retrieved again
+    svc.download_data_from_api("2025-01-01", "2025-03-08", incremental=True)
+    assert len(requests_made) == 6
+    price_store = YfinanceDataService.price_store()
+    assert price_store.last_dates() == {"AAA": parse_date("2025-03-07"), "BBB": parse_date("2025-03-07"), "BRK-B": parse_date("2025-03-07")}
+    # deltas are compacted periodically
+    assert len(price_store.delta_files("AAA")) < YfinanceDataService.INCREMENTAL_COMPACTION_THRESHOLD
+    # S3 yfinance file holds the whole window
+    csv_data = FileRepository(f"{local_s3}/services/yfinance/yfinance_data_BRK-B.csv").load()
+    expected = YfinanceDataService().parse_yfinance_csv(
+        svc._transform_api_data_format_to_csv_map(twelve_data_response("BRK.B", "2025-01-01", "2025-03-08"))["yfinance_data_BRK-B.csv"], has_header=False)
+    actual = YfinanceDataService.parse_yfinance_csv(csv_data, has_header=False)
+    for column in actual:
+        assert (actual[column] == expected[column]).all()
+
+class StubTwelveDataHandler(BaseHTTPRequestHandler):
+    """ time_series endpoint stub, answering after a fixed latency """
+    latency_in_seconds = 0.3
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        sleep(StubTwelveDataHandler.latency_in_seconds)
+        body = twelve_data_response(params['symbol'], params['start_date'], params['end_date']).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_twelve_data_api(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubTwelveDataHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('TWELVEDATA_API_URL', f"http://127.0.0.1:{server.server_address[1]}/time_series")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_download_pipeline_throughput(local_s3, stub_twelve_data_api, monkeypatch):
+    monkeypatch.setenv('TWELVEDATA_MAX_CONCURRENT_REQUESTS', '4')
+    tickers = [f"T{i:02d}" for i in range(15)] + ["BRK-B"]
+    batch_size = 2
+    started = time.perf_counter()
+    YfinanceDataService().download_data_from_api("2025-01-01", "2025-03-01", tickers=",".join(tickers), batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    batches = len(tickers) // batch_size
+    print(f"{batches} batches ({len(tickers)} tickers) in {elapsed:.2f}s, {len(tickers) / elapsed:.1f} tickers/s")
+    # 8 requests of 0.3s, 4 in flight at a time
+    assert elapsed < batches * StubTwelveDataHandler.latency_in_seconds * 0.75
+    for ticker in tickers:
+        csv_data = FileRepository(f"{local_s3}/services/yfinance/yfinance_data_{ticker}.csv").load()
+        price_data = YfinanceDataService.parse_yfinance_csv(csv_data, has_header=False)
+        assert str(price_data['date'][0]) == "2025-01-01"
+        assert str(price_data['date'][-1]) == "2025-02-28"
+
+def test_download_pipeline_is_rate_limited(local_s3, stub_twelve_data_api, monkeypatch):
+    # 2 credits per second, with an initial burst of 2 credits
+    monkeypatch.setenv('TWELVEDATA_CREDITS_PER_MINUTE', '120')
+    monkeypatch.setattr(StubTwelveDataHandler, 'latency_in_seconds', 0)
+    monkeypatch.setattr(yfinance_data_service, 'TokenBucketRateLimiter', lambda credits_per_minute: TokenBucketRateLimiter(credits_per_minute, capacity=2))
+    tickers = [f"T{i:02d}" for i in range(6)]
+    started = time.perf_counter()
+    YfinanceDataService().download_data_from_api("2025-01-01", "2025-01-10", tickers=",".join(tickers), batch_size=2)
+    # first batch uses the burst, the other 2 batches wait 1 second each
+    assert 1.9 < time.perf_counter() - started < 3
+
+def test_download_pipeline_error(local_s3, monkeypatch):
+    def download_next_batch(self, start_date, end_date, tickers):
+        return json.dumps({"code": 401, "message": "apikey parameter is incorrect", "status": "error"})
+    monkeypatch.setattr(YfinanceDataService, '_download_next_batch_of_data_from_api', download_next_batch)
+    with pytest.raises(Exception, match="apikey parameter is incorrect"):
+        YfinanceDataService().download_data_from_api("2025-01-01", "2025-01-10", tickers="AAA,BBB", batch_size=1)
+
+def test_manifest_written_with_uploads(local_s3, stub_twelve_data_api, monkeypatch):
+    monkeypatch.setattr(StubTwelveDataHandler, 'latency_in_seconds', 0)
+    svc = YfinanceDataService()
+    svc.download_data_from_api("2025-01-01", "2025-01-10", tickers="AAA,BBB", batch_size=2)
+    svc.download_data_from_api("2025-01-01", "2025-01-13", tickers="BRK-B", batch_size=2)
+    manifest = svc.load_manifest()
+    assert sorted(manifest.keys()) == ["yfinance_data_AAA.csv", "yfinance_data_BBB.csv", "yfinance_data_BRK-B.csv"]
+    assert manifest["yfinance_data_AAA.csv"]['last_date'] == "2025-01-09"
+    assert manifest["yfinance_data_AAA.csv"]['rows'] == 7
+    assert manifest["yfinance_data_BRK-B.csv"]['last_date'] == "2025-01-10"
+    csv_data = FileRepository(f"{local_s3}/services/yfinance/yfinance_data_AAA.csv").load()
+    assert manifest["yfinance_data_AAA.csv"] == {**YfinanceDataService.manifest_entry(csv_data),
+                                                 'last_modified': manifest["yfinance_data_AAA.csv"]['last_modified']}
+
+def test_download_from_s3_uses_manifest_and_concurrent_downloads(local_s3, stub_twelve_data_api, monkeypatch, tmp_path):
+    monkeypatch.setattr(StubTwelveDataHandler, 'latency_in_seconds', 0)
+    monkeypatch.setenv('TRADE_ADVISOR_S3_MAX_CONCURRENT_DOWNLOADS', '8')
+    tickers = [f"T{i:02d}" for i in range(16)]
+    svc = YfinanceDataService()
+    svc.download_data_from_api("2025-01-01", "2025-01-10", tickers=",".join(tickers), batch_size=4)
+    loaded_paths = []
+    load = FileRepository.load
+    def slow_load(self):
+        loaded_paths.append(self.path)
+        if 'yfinance_data_' in self.path:
+            time.sleep(0.1)
+        return load(self)
+    monkeypatch.setattr(FileRepository, 'load', slow_load)
+    download_directory = tmp_path / 'download'
+    download_directory.mkdir()
+    started = time.perf_counter()
+    svc.download_required_yfinance_data_to_filesystem(",".join(tickers), str(download_directory))
+    # 16 downloads of 0.1s, 8 at a time
+    assert time.perf_counter() - started < 0.1 * len(tickers) / 2
+    # manifest read once
+    assert loaded_paths.count(svc.manifest_path) == 1
+    assert sorted(os.listdir(download_directory)) == [f"yfinance_data_{ticker}.csv" for ticker in tickers]
+    with pytest.raises(Exception, match="Missing yfinance data files in S3"):
+        svc._check_all_yfinance_data_is_in_s3("T00,MISSING")
+    # files not refreshed today
+    manifest = svc.load_manifest()
+    manifest["yfinance_data_T00.csv"]['last_modified'] = "2025-01-02T09:33:42+00:00"
+    FileRepository(svc.manifest_path).save(json.dumps(manifest))
+    with pytest.raises(Exception, match="not up to date"):
+        svc._check_all_yfinance_data_is_in_s3("T00,T01")
+
+def test_update_price_store_downloads_changed_tickers_only(local_s3, stub_twelve_data_api, monkeypatch):
+    monkeypatch.setattr(StubTwelveDataHandler, 'latency_in_seconds', 0)
+    monkeypatch.delenv('TRADE_ADVISOR_PRICE_STORE')
+    svc = YfinanceDataService()
+    svc.download_data_from_api("2025-01-01", "2025-01-10", tickers="AAA,BBB", batch_size=2)
+    price_store = PriceStoreRepository(str(local_s3 / 'price_store'))
+    downloaded = []
+    download = YfinanceDataService._download_yfinance_files_from_s3
+    def record_download(self, s3_files_entries):
+        downloaded.append([entry['Key'] for entry in s3_files_entries])
+        return download(self, s3_files_entries)
+    monkeypatch.setattr(YfinanceDataService, '_download_yfinance_files_from_s3', record_download)
+    svc.update_price_store_from_s3("AAA,BBB", price_store)
+    svc.update_price_store_from_s3("AAA,BBB", price_store)
+    assert downloaded == [["services/yfinance/yfinance_data_AAA.csv", "services/yfinance/yfinance_data_BBB.csv"], []]
+    assert str(price_store.last_dates()["BBB"]) == "2025-01-09"
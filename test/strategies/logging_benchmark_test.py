@@ -0,0 +1,39 @@
+import os
+import time
+import pytest
+from services.yfinance_data_service import YfinanceDataService
+from strategies.rsi_strategy import RsiStrategy
+from strategies.vectorized_strategy import VectorizedStrategy
+from test.utils import *
+
+tickers = [f"T{i:03d}" for i in range(500)]
+
+class EagerLogRsiStrategy(RsiStrategy):
+    """ RsiStrategy with the previous logging, formatting every message (e.g. each bar stats) whether logged or not """
+    def log(self, txt, *args, dt=None, do_print=False):
+        if callable(txt):
+            txt = txt()
+        elif args:
+            txt = txt % args
+        RsiStrategy.log(self, txt, dt=dt, do_print=do_print)
+
+def run(strategy, price_data, start_date, last_date, indicator_cache):
+    started = time.perf_counter()
+    strategy_run = VectorizedStrategy(strategy, price_data, 30000, indicator_cache=indicator_cache,
+                                      start_date=start_date, single_date_to_trade=str(last_date))
+    return time.perf_counter() - started, [action.as_text() for action in strategy_run.trade_actions]
+
+@pytest.mark.skipif(os.environ.get('TRADE_ADVISOR_RUN_BENCHMARKS') is None, reason="Benchmark - set TRADE_ADVISOR_RUN_BENCHMARKS to run it")
+def test_lazy_logging_benchmark(tmp_path):
+    """ 500 tickers feed: lazy logging gives the same trades as eager logging, without formatting discarded messages """
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=180, seed=3)
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), dates[0], dates[-1])
+    # indicators computed once beforehand, so that runs only time the per-bar loop
+    indicator_cache = {}
+    run(RsiStrategy, price_data, dates[120], dates[-1], indicator_cache)
+    eager_seconds, eager_actions = run(EagerLogRsiStrategy, price_data, dates[120], dates[-1], indicator_cache)
+    lazy_seconds, lazy_actions = run(RsiStrategy, price_data, dates[120], dates[-1], indicator_cache)
+    num_bars = (len(dates) - 120) * len(tickers)
+    print(f"{len(dates) - 120} bars x {len(tickers)} tickers, {len(lazy_actions)} trade actions: "
+          f"eager logging {eager_seconds / num_bars * 1e6:.1f}us per bar, lazy logging {lazy_seconds / num_bars * 1e6:.1f}us per bar")
+    assert lazy_actions == eager_actions
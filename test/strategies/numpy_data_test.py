@@ -0,0 +1,51 @@
+from test.utils import *
+import datetime
+import os
+import backtrader as bt
+import pytest
+from services.stock_compute_service import StockComputeService
+from services.yfinance_data_service import YfinanceDataService
+from strategies.bbrsi_strategy import BbRsiStrategy
+from strategies.numpy_data import NumpyData
+
+class RecordingStrategy(bt.Strategy):
+    def __init__(self):
+        self.bars = []
+
+    def next(self):
+        self.bars.append((self.data.datetime.date(0), self.data.open[0], self.data.high[0], self.data.low[0],
+                          self.data.close[0], self.data.volume[0]))
+
+def recorded_bars(data):
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.addstrategy(RecordingStrategy)
+    cerebro.adddata(data)
+    return cerebro.run()[0].bars
+
+def test_same_bars_as_csv_feed(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, ["AAA"], num_days=60)
+    filename = os.path.join(tmp_path, "yfinance_data_AAA.csv")
+    from_date, to_date = dates[10], dates[50]
+    csv_feed = bt.feeds.GenericCSVData(dataname=filename,
+                                       fromdate=datetime.datetime.combine(from_date, datetime.datetime.min.time()),
+                                       todate=datetime.datetime.combine(to_date, datetime.datetime.min.time()),
+                                       nullvalue=0.0, dtformat=('%Y-%m-%d'), openinterest=None, **YfinanceDataService.CSV_COLUMNS)
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(["AAA"], str(tmp_path), from_date, to_date)["AAA"]
+    assert recorded_bars(NumpyData(dataname=price_data)) == recorded_bars(csv_feed)
+    assert NumpyData.date2num_column(price_data['date'])[0] == bt.date2num(datetime.datetime.combine(from_date, datetime.time()))
+
+def test_price_columns_reused_across_runs(tmp_path):
+    tickers = ["AAA", "BBB"]
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    svc = StockComputeService(",".join(tickers), str(dates[300]), data_directory=str(tmp_path))
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), svc.warmup_date, svc.end_date)
+    results = []
+    for _ in range(2):
+        cerebro = bt.Cerebro(stdstats=False)
+        cerebro.addstrategy(BbRsiStrategy, **svc.strategy_params)
+        for ticker in tickers:
+            cerebro.adddata(StockComputeService.price_data_feed(price_data[ticker]), name=ticker)
+        strategy = cerebro.run()[0]
+        results.append([stats.as_text() for stats in strategy.stock_daily_stats_list["AAA"]])
+    assert results[0] == results[1]
+    assert results[0] == [stats.as_text() for stats in svc.get_stock_daily_stats_list("AAA", num_lines=1000)]
@@ -0,0 +1,47 @@
+import os
+import time
+import backtrader as bt
+import pytest
+from services.stock_compute_service import StockComputeService
+from services.yfinance_data_service import YfinanceDataService
+from strategies.rsi_strategy import RsiStrategy
+from test.utils import *
+
+tickers = ["AAA", "BBB", "CCC", "DDD"]
+
+class WalkBackRsiStrategy(RsiStrategy):
+    """ RsiStrategy with the previous peak_price_since_bought, walking back to the bought date on every call """
+    def peak_price_since_bought(self, data):
+        index = 0
+        j = 0
+        peak_price = self.getposition(data).price
+        order_date = self.last_bought_order_date[data._name]
+        while order_date != data.datetime.date(index) and j < self.days_in_buffer():
+            index -= 1
+            j += 1
+        for k in range(index, 1):
+            peak_price = max(peak_price, data.close[k])
+        return peak_price
+
+def backtest(strategy, price_data, start_date):
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.addstrategy(strategy, start_date=start_date, profit_protection_pct_threshold=30, loss_pct_threshold=15)
+    for ticker in tickers:
+        cerebro.adddata(data=StockComputeService.price_data_feed(price_data[ticker]), name=ticker)
+    cerebro.broker.setcash(30000)
+    started = time.perf_counter()
+    strategy_run = cerebro.run()[0]
+    return time.perf_counter() - started, cerebro.broker.getvalue(), [action.as_text() for action in strategy_run.trade_actions]
+
+@pytest.mark.skipif(os.environ.get('TRADE_ADVISOR_RUN_BENCHMARKS') is None, reason="Benchmark - set TRADE_ADVISOR_RUN_BENCHMARKS to run it")
+def test_peak_price_long_horizon_benchmark(tmp_path):
+    """ 6 years backtest: running peak tracker gives the same trades as the walk back, without its quadratic cost """
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, num_days=1560, seed=5)
+    price_data = YfinanceDataService.load_yfinance_data_from_filesystem(tickers, str(tmp_path), dates[0], dates[-1])
+    walk_back_seconds, walk_back_value, walk_back_actions = backtest(WalkBackRsiStrategy, price_data, dates[120])
+    running_peak_seconds, running_peak_value, running_peak_actions = backtest(RsiStrategy, price_data, dates[120])
+    print(f"{len(dates)} bars x {len(tickers)} tickers, {len(running_peak_actions)} trade actions: "
+          f"walk back {walk_back_seconds:.2f}s, running peak {running_peak_seconds:.2f}s")
+    assert any(["Maximum profit loss tolerance" in action for action in running_peak_actions])
+    assert running_peak_actions == walk_back_actions
+    assert running_peak_value == walk_back_value
@@ -0,0 +1,161 @@
+import datetime
+import os
+from datetime import timedelta
+import pytest
+from models.open_position import OpenPosition
+from services.stock_compute_service import StockComputeService
+from strategies.bbrsi_strategy import BbRsiStrategy
+from strategies.rsi_strategy import RsiStrategy
+from test.utils import *
+
+tickers = ["AAA", "BBB", "CCC"]
+
+def assert_same_results(backtrader_svc, vectorized_svc):
+    for ticker in tickers:
+        expected = backtrader_svc.get_stock_daily_stats_list(ticker, num_lines=1000)
+        actual = vectorized_svc.get_stock_daily_stats_list(ticker, num_lines=1000)
+        assert [s.date for s in actual] == [s.date for s in expected]
+        for e, a in zip(expected, actual):
+            assert a.close == pytest.approx(e.close, abs=0.011)
+            assert a.rsi == pytest.approx(e.rsi, abs=0.011)
+            assert a.rsi_ma == pytest.approx(e.rsi_ma, abs=0.011)
+            assert a.rsi_crossover_signal == e.rsi_crossover_signal
+            assert a.bb_top == pytest.approx(e.bb_top)
+            assert a.bb_mid == pytest.approx(e.bb_mid)
+            assert a.bb_bot == pytest.approx(e.bb_bot)
+            assert a.position == pytest.approx(e.position)
+            assert a.pnl_pct == pytest.approx(e.pnl_pct)
+    expected_actions = backtrader_svc.trades_today()
+    actual_actions = vectorized_svc.trades_today()
+    assert [(a.date, a.action, a.ticker, a.reason) for a in actual_actions] == \
+        [(a.date, a.action, a.ticker, a.reason) for a in expected_actions]
+    assert [a.context for a in actual_actions] == [a.context for a in expected_actions]
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_vectorized_engine_parity_without_open_positions(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers)
+    num_actions = 0
+    for today in dates[200::7]:
+        today_str = str(today)
+        backtrader_svc = StockComputeService(",".join(tickers), today_str, strategy=strategy, data_directory=str(tmp_path))
+        vectorized_svc = StockComputeService(",".join(tickers), today_str, strategy=strategy, data_directory=str(tmp_path),
+                                             engine='vectorized')
+        assert_same_results(backtrader_svc, vectorized_svc)
+        num_actions += len(backtrader_svc.trades_today())
+    # ensure scenarios covered trade actions
+    assert num_actions > 0
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_vectorized_engine_parity_with_open_positions(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    num_actions = 0
+    for position_index in range(200, 300, 20):
+        open_positions = [
+            OpenPosition(date=dates[position_index], ticker="AAA", size=10, price=100.0, currency='USD'),
+            OpenPosition(date=dates[position_index + 2], ticker="BBB", size=20, price=100.0, currency='USD'),
+        ]
+        for today in dates[position_index + 5:position_index + 60:3]:
+            today_str = str(today)
+            backtrader_svc = StockComputeService(",".join(tickers), today_str, open_positions, strategy=strategy,
+                                                 data_directory=str(tmp_path))
+            vectorized_svc = StockComputeService(",".join(tickers), today_str, open_positions, strategy=strategy,
+                                                 data_directory=str(tmp_path), engine='vectorized')
+            assert_same_results(backtrader_svc, vectorized_svc)
+            num_actions += len(backtrader_svc.trades_today())
+    assert num_actions > 0
+
+def test_vectorized_engine_requires_known_engine():
+    with pytest.raises(Exception, match="Unknown engine"):
+        StockComputeService("AAA", "2024-01-01", engine='unknown', calculate_dates_only=True)
+
+def test_vectorized_engine_parity_when_positions_exceed_cash(tmp_path):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    # BBB recorded position exceeds the remaining broker cash and is rejected by backtrader
+    open_positions = [
+        OpenPosition(date=dates[200], ticker="AAA", size=200, price=100.0, currency='USD'),
+        OpenPosition(date=dates[200], ticker="BBB", size=200, price=100.0, currency='USD'),
+        OpenPosition(date=dates[201], ticker="CCC", size=100, price=100.0, currency='USD'),
+    ]
+    today_str = str(dates[260])
+    backtrader_svc = StockComputeService(",".join(tickers), today_str, open_positions, data_directory=str(tmp_path))
+    vectorized_svc = StockComputeService(",".join(tickers), today_str, open_positions, data_directory=str(tmp_path),
+                                         engine='vectorized')
+    assert_same_results(backtrader_svc, vectorized_svc)
+    assert vectorized_svc.get_stock_daily_stats_list("BBB", 1)[0].position == 0
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_per_ticker_windows(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    # an old AAA position does not widen the BBB and CCC windows
+    open_positions = [
+        OpenPosition(date=dates[280], ticker="BBB", size=20, price=100.0, currency='USD'),
+        OpenPosition(date=dates[150], ticker="AAA", size=10, price=100.0, currency='USD'),
+    ]
+    today_str = str(dates[330])
+    backtrader_svc = StockComputeService(",".join(tickers), today_str, open_positions, strategy=strategy, data_directory=str(tmp_path))
+    vectorized_svc = StockComputeService(",".join(tickers), today_str, open_positions, strategy=strategy, data_directory=str(tmp_path),
+                                         engine='vectorized')
+    observed_weeks = timedelta(weeks=2)
+    assert backtrader_svc.ticker_start_dates == {"AAA": dates[150] - observed_weeks, "BBB": dates[280] - observed_weeks,
+                                                 "CCC": backtrader_svc.end_date - observed_weeks}
+    assert backtrader_svc.warmup_date == backtrader_svc.ticker_warmup_dates["AAA"]
+    for ticker in tickers:
+        stats = backtrader_svc.get_stock_daily_stats_list(ticker, num_lines=1000)
+        assert stats[0].date >= backtrader_svc.ticker_start_dates[ticker]
+        assert stats[0].date - backtrader_svc.ticker_start_dates[ticker] < timedelta(days=5)
+    assert backtrader_svc.get_stock_daily_stats_list("AAA", 1)[0].position > 0
+    assert_same_results(backtrader_svc, vectorized_svc)
+    # watched tickers get the same results as when run on their own
+    watched_svc = StockComputeService("CCC", today_str, strategy=strategy, data_directory=str(tmp_path))
+    assert [(s.date, s.close, s.rsi, s.bb_mid) for s in watched_svc.get_stock_daily_stats_list("CCC", num_lines=1000)] == \
+        [(s.date, s.close, s.rsi, s.bb_mid) for s in backtrader_svc.get_stock_daily_stats_list("CCC", num_lines=1000)]
+
+def remove_bars(directory, ticker, removed_dates):
+    file_name = os.path.join(directory, f"yfinance_data_{ticker}.csv")
+    with open(file_name) as file:
+        lines = file.read().splitlines()
+    with open(file_name, "w") as file:
+        file.write("\n".join([line for line in lines if line.split(',')[0] not in [str(date) for date in removed_dates]]))
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_vectorized_engine_parity_with_missing_bars(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    # BBB misses bars within the evaluated window (including the day after its recorded position)
+    remove_bars(tmp_path, "BBB", [dates[203], dates[251], dates[262], dates[263]])
+    open_positions = [
+        OpenPosition(date=dates[240], ticker="AAA", size=10, price=100.0, currency='USD'),
+        OpenPosition(date=dates[250], ticker="BBB", size=20, price=100.0, currency='USD'),
+    ]
+    num_actions = 0
+    for positions in [None, open_positions]:
+        for today in dates[245:300:4]:
+            today_str = str(today)
+            backtrader_svc = StockComputeService(",".join(tickers), today_str, positions, strategy=strategy,
+                                                 data_directory=str(tmp_path))
+            vectorized_svc = StockComputeService(",".join(tickers), today_str, positions, strategy=strategy,
+                                                 data_directory=str(tmp_path), engine='vectorized')
+            assert_same_results(backtrader_svc, vectorized_svc)
+            num_actions += len(backtrader_svc.trades_today())
+    assert num_actions > 0
+
+@pytest.mark.parametrize("strategy", [RsiStrategy, BbRsiStrategy])
+def test_per_ticker_windows_with_missing_bars(tmp_path, strategy):
+    dates = write_synthetic_yfinance_data(tmp_path, tickers, seed=7)
+    open_positions = [
+        OpenPosition(date=dates[280], ticker="BBB", size=20, price=100.0, currency='USD'),
+        OpenPosition(date=dates[150], ticker="AAA", size=10, price=100.0, currency='USD'),
+    ]
+    today_str = str(dates[330])
+    backtrader_svc = StockComputeService(",".join(tickers), today_str, open_positions, strategy=strategy, data_directory=str(tmp_path))
+    # BBB misses the bars around its start date, CCC is listed after the AAA window starts
+    missing_dates = [date for date in dates[260:300] if abs(date - backtrader_svc.ticker_start_dates["BBB"]) <= timedelta(days=1)]
+    remove_bars(tmp_path, "BBB", missing_dates + [dates[300]])
+    remove_bars(tmp_path, "CCC", dates[:200])
+    backtrader_svc = StockComputeService(",".join(tickers), today_str, open_positions, strategy=strategy, data_directory=str(tmp_path))
+    vectorized_svc = StockComputeService(",".join(tickers), today_str, open_positions, strategy=strategy, data_directory=str(tmp_path),
+                                         engine='vectorized')
+    assert len(missing_dates) > 0
+    # BBB is evaluated from its start date on its previous bar
+    stats = backtrader_svc.get_stock_daily_stats_list("BBB", num_lines=1000)
+    assert stats[0].date in missing_dates and stats[0].close == stats[1].close
+    assert_same_results(backtrader_svc, vectorized_svc)
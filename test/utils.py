@@ -1,8 +1,31 @@
 
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
+import numpy as np
 
 def parse_date(date_string):
     return (datetime.strptime(date_string, "%Y-%m-%d")).date()
 
 def today_as_str():
-    return str(datetime.today().date())
\ No newline at end of file
+    return str(datetime.today().date())
+
+def write_synthetic_yfinance_data(directory, tickers, first_date="2023-01-02", num_days=400, seed=42):
+    """ Writes random walk yfinance_data_{ticker}.csv files (business days only) and returns the list of dates """
+    rng = np.random.default_rng(seed)
+    dates = []
+    date = parse_date(first_date)
+    while len(dates) < num_days:
+        if date.weekday() < 5:
+            dates.append(date)
+        date += timedelta(days=1)
+    for ticker in tickers:
+        # alternating up/down regimes so that RSI and Bollinger crossovers happen
+        drift = np.repeat(rng.choice([-0.004, 0.004], size=num_days // 20 + 1), 20)[:num_days]
+        close = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.02, num_days)))
+        open_ = close * (1 + rng.normal(0, 0.005, num_days))
+        rows = ["Date,Close,High,Low,Open,Volume"]
+        for i, date in enumerate(dates):
+            rows.append(f"{date},{close[i]},{max(close[i], open_[i])},{min(close[i], open_[i])},{open_[i]},{1000000 + i}")
+        with open(os.path.join(directory, f"yfinance_data_{ticker}.csv"), "w") as file:
+            file.write("\n".join(rows))
+    return dates